@@ -0,0 +1 @@
+"""Local benchmark suite for the API handlers"""
@@ -0,0 +1,182 @@
+"""Drive the service's route handlers in-process, without the Nitric runtime.
+
+The service module is imported with Nitric's `api()` swapped for LocalApi,
+which records each route and composes it with the API middleware using
+Nitric's own compose_middleware. Requests are then dispatched to the
+recorded handlers with real HttpContext objects, so handler, middleware and
+serialisation costs are measured exactly as they run in production. Storage
+comes from a local TaskStore backend (see common/storage.py).
+
+Nothing from `common` is imported at module level: its settings are read
+from the environment on first import, after load_service has chosen the
+backend.
+"""
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Optional
+
+from nitric.context import HttpContext, HttpRequest, compose_middleware
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class LocalRoute:
+    """A recorded route, exposing `path` like nitric.resources.apis.Route"""
+
+    def __init__(self, method: str, path: str, handler: Any):
+        self.method = method
+        self.path = path
+        self.handler = handler
+
+
+class LocalApi:
+    """Stands in for nitric.resources.api, recording routes instead of serving them"""
+
+    def __init__(self, name: str, opts: Any = None):
+        self.name = name
+        middleware = getattr(opts, "middleware", None) or []
+        self.middleware = middleware if isinstance(middleware, list) else [middleware]
+        self.routes: list[LocalRoute] = []
+
+    def _method(self, method: str, match: str):
+        def decorator(function):
+            self.routes.append(LocalRoute(method, match, compose_middleware(*self.middleware, function)))
+
+        return decorator
+
+    def get(self, match: str, opts: Any = None):
+        return self._method("GET", match)
+
+    def post(self, match: str, opts: Any = None):
+        return self._method("POST", match)
+
+    def put(self, match: str, opts: Any = None):
+        return self._method("PUT", match)
+
+    def patch(self, match: str, opts: Any = None):
+        return self._method("PATCH", match)
+
+    def delete(self, match: str, opts: Any = None):
+        return self._method("DELETE", match)
+
+
+class DelayedStore:
+    """Wraps a TaskStore and adds a fixed delay to every call, to model network round trips"""
+
+    def __init__(self, store, delay_ms: float):
+        self._store = store
+        self._delay = delay_ms / 1000
+        self.name = store.name
+
+    async def get(self, key):
+        await asyncio.sleep(self._delay)
+        return await self._store.get(key)
+
+    async def set(self, key, value):
+        await asyncio.sleep(self._delay)
+        await self._store.set(key, value)
+
+    async def delete(self, key):
+        await asyncio.sleep(self._delay)
+        await self._store.delete(key)
+
+    async def keys(self, prefix=""):
+        await asyncio.sleep(self._delay)
+        async for key in self._store.keys(prefix):
+            yield key
+
+    async def get_many(self, keys, concurrency=None):
+        from common.batch import run_bounded
+
+        return await run_bounded(keys, self.get, concurrency)
+
+    async def set_many(self, items, concurrency=None):
+        from common.batch import run_bounded
+
+        return await run_bounded(items, lambda item: self.set(*item), concurrency)
+
+
+def load_service(path: str = "services/api.py", backend: str = "memory", kv_latency_ms: float = 0.0):
+    """Import a service module against a local storage backend and return it.
+
+    With kv_latency_ms set, every store call is delayed by that long, so that
+    round-trip-bound code paths (like N+1 reads) show up in the numbers.
+    """
+    # Settings are read when common.config is first imported, so set them first
+    os.environ["TASKS_STORE_BACKEND"] = backend
+    # Per-request and startup log lines would drown out the results
+    os.environ.setdefault("TASKS_REQUEST_LOG", "0")
+    os.environ.setdefault("TASKS_STARTUP_LOG", "0")
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+    import nitric.resources
+    from nitric.application import Nitric
+
+    from common import storage
+
+    original_api, original_run, original_open = nitric.resources.api, Nitric.run, storage.open_store
+    nitric.resources.api = LocalApi
+    Nitric.run = classmethod(lambda cls: None)
+    if kv_latency_ms > 0:
+        storage.open_store = lambda *args, **kwargs: DelayedStore(original_open(*args, **kwargs), kv_latency_ms)
+    try:
+        spec = importlib.util.spec_from_file_location("bench_service", ROOT / path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        nitric.resources.api, Nitric.run, storage.open_store = original_api, original_run, original_open
+    return module
+
+
+class LocalClient:
+    """Dispatches requests to the routes recorded by a LocalApi"""
+
+    def __init__(self, local_api: LocalApi):
+        from common.http import RouteTable
+
+        self._handlers = {(route.method, route.path): route.handler for route in local_api.routes}
+        self._tables = {
+            method: RouteTable(path for route_method, path in self._handlers if route_method == method)
+            for method in {route.method for route in local_api.routes}
+        }
+
+    def _resolve(self, method: str, path: str):
+        table = self._tables.get(method)
+        matched = table.match(path) if table is not None else None
+        if matched is None:
+            raise LookupError(f"No route for {method} {path}")
+        template, params = matched
+        return self._handlers[(method, template)], params
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: Any = None,
+        query: Optional[dict[str, str]] = None,
+        headers: Optional[dict[str, str]] = None,
+    ) -> HttpContext:
+        """Run one request through the matching route and return its context"""
+        handler, params = self._resolve(method, path)
+        if body is None:
+            data = b""
+        elif isinstance(body, bytes):
+            data = body
+        else:
+            data = json.dumps(body).encode("utf-8")
+        ctx = HttpContext(
+            HttpRequest(
+                data=data,
+                method=method,
+                path=path,
+                params=params,
+                query={key: [value] for key, value in (query or {}).items()},
+                headers={key.lower(): [value] for key, value in (headers or {}).items()},
+            )
+        )
+        return await handler(ctx) or ctx
@@ -0,0 +1,221 @@
+"""Benchmark every API route against a local storage backend.
+
+Usage:
+    python -m bench.run --sizes 100,10000 --concurrency 1,32 --requests 500
+
+For each dataset size the store is reseeded, then every scenario runs at
+every concurrency level. Results are printed (or written with --output) as
+JSON with throughput and p50/p95/p99 latency per route.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Optional
+
+from bench.harness import LocalClient, load_service
+from common import clock
+
+OK_STATUSES = {200, 201, 207, 304}
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Scenario:
+    """One route exercised with generated requests"""
+
+    def __init__(self, name: str, method: str, make_request: Callable[[random.Random, "Dataset"], dict]):
+        self.name = name
+        self.method = method
+        self.make_request = make_request
+
+
+class Dataset:
+    """Task IDs seeded into the store for one benchmark run"""
+
+    def __init__(self, ids: list[str], spare_ids: list[str]):
+        self.ids = ids
+        # Tasks reserved for the delete scenario, each deleted exactly once
+        self.spare_ids = spare_ids
+
+
+def task_payload(index: int) -> dict:
+    """A representative TaskInput body"""
+    return {
+        "title": f"Benchmark task {index}",
+        "description": "Seeded by bench.run to exercise the task routes",
+        "completed": index % 3 == 0,
+        "created_at": "2026-01-01T00:00:00Z",
+    }
+
+
+SCENARIOS = [
+    Scenario("GET /health", "GET", lambda rng, data: {"path": "/health"}),
+    Scenario("GET /", "GET", lambda rng, data: {"path": "/"}),
+    Scenario("GET /swagger.json", "GET", lambda rng, data: {"path": "/swagger.json"}),
+    Scenario("GET /tasks", "GET", lambda rng, data: {"path": "/tasks"}),
+    Scenario("GET /tasks/export", "GET", lambda rng, data: {"path": "/tasks/export"}),
+    Scenario("GET /tasks/:id", "GET", lambda rng, data: {"path": f"/tasks/{rng.choice(data.ids)}"}),
+    Scenario("POST /tasks", "POST", lambda rng, data: {"path": "/tasks", "body": task_payload(rng.randrange(10**6))}),
+    Scenario(
+        "PUT /tasks/:id",
+        "PUT",
+        lambda rng, data: {"path": f"/tasks/{rng.choice(data.ids)}", "body": {"completed": rng.random() < 0.5}},
+    ),
+    Scenario("DELETE /tasks/:id", "DELETE", lambda rng, data: {"path": f"/tasks/{data.spare_ids.pop()}"}),
+]
+
+
+async def seed(service, size: int, spare: int) -> Dataset:
+    """Empty the task store and fill it with `size` tasks plus `spare` delete targets"""
+    store = service.tasks_store
+    stale = [key async for key in store.keys()]
+    for key in stale:
+        await store.delete(key)
+    service.task_cache.clear()
+
+    tasks = [service.Task.from_input(f"bench-{index:07d}", task_payload(index), clock.now()).with_version()
+             for index in range(size + spare)]
+    records = [(task.id, task.to_record()) for task in tasks]
+    result = await store.set_many(records)
+    if not result.ok:
+        raise RuntimeError(f"Seeding failed for {len(result.errors)} tasks")
+    ids = [key for key, _ in records]
+    return Dataset(ids[:size], ids[size:])
+
+
+async def run_scenario(client: LocalClient, scenario: Scenario, data: Dataset,
+                       requests: int, concurrency: int, rng: random.Random) -> dict[str, Any]:
+    """Issue `requests` requests with `concurrency` in flight and summarise latency"""
+    plans = [scenario.make_request(rng, data) for _ in range(requests)]
+    latencies: list[float] = []
+    errors = 0
+    statuses: dict[int, int] = {}
+    queue = iter(plans)
+
+    async def worker():
+        nonlocal errors
+        for plan in queue:
+            started = time.perf_counter()
+            try:
+                ctx = await client.request(scenario.method, plan["path"], body=plan.get("body"))
+                status = ctx.res.status
+            except Exception:
+                status = 599
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status not in OK_STATUSES:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "route": scenario.name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50), 4),
+            "p95": round(percentile(latencies, 0.95), 4),
+            "p99": round(percentile(latencies, 0.99), 4),
+            "max": round(latencies[-1], 4) if latencies else 0.0,
+        },
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    service = load_service(backend=args.backend, kv_latency_ms=args.kv_latency_ms)
+    client = LocalClient(service.main_api)
+    selected = [s for s in SCENARIOS if not args.routes or s.name in args.routes]
+    results = []
+
+    for size in args.sizes:
+        for concurrency in args.concurrency:
+            deletes = args.requests if any(s.method == "DELETE" for s in selected) else 0
+            data = await seed(service, size, deletes)
+            # The same seed per (size, concurrency) keeps runs comparable
+            rng = random.Random(f"{args.seed}:{size}:{concurrency}")
+            for scenario in selected:
+                result = await run_scenario(client, scenario, data, args.requests, concurrency, rng)
+                result["dataset_size"] = size
+                results.append(result)
+                if not args.quiet:
+                    print(
+                        f"{scenario.name:<22} size={size:<7} c={concurrency:<4} "
+                        f"{result['throughput_rps']:>10} req/s  p50={result['latency_ms']['p50']:.3f}ms "
+                        f"p99={result['latency_ms']['p99']:.3f}ms errors={result['errors']}",
+                        file=sys.stderr,
+                    )
+
+    return {
+        "benchmark": "api-routes",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "kv_latency_ms": args.kv_latency_ms,
+        },
+        "config": {
+            "sizes": args.sizes,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def int_list(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the API routes against a local storage backend")
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--kv-latency-ms", type=float, default=0.0,
+                        help="Simulated round-trip time added to every store call")
+    parser.add_argument("--sizes", type=int_list, default=[100, 1000, 10000],
+                        help="Comma-separated dataset sizes, e.g. 100,10000,100000")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 16],
+                        help="Comma-separated numbers of requests in flight")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--routes", nargs="*", help="Only run these scenarios, e.g. 'GET /tasks'")
+    parser.add_argument("--seed", default="bench", help="Seed for request generation")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--quiet", action="store_true", help="Do not print progress to stderr")
+    args = parser.parse_args(argv)
+
+    if args.backend == "sqlite" and "TASKS_SQLITE_PATH" not in os.environ:
+        # A fresh database per run keeps results reproducible
+        os.environ["TASKS_SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="tasks-bench-"), "tasks.db")
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
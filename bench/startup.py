@@ -0,0 +1,98 @@
+"""Measure service cold starts and check them against a time budget.
+
+Usage:
+    python -m bench.startup --runs 5 --budget-ms 400 --imports 15
+
+Every run imports the service in a fresh interpreter, as a new Lambda
+container would, and reports the wall time until the routes are registered,
+the service's own startup phases (see common/startup.py) and the time of a
+first GET /health. With --budget-ms the command exits with status 1 when the
+median import time is over budget, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Runs in the child interpreter; the clock starts before anything is imported
+CHILD = """
+import time
+started = time.perf_counter()
+import asyncio, json
+from bench.harness import LocalClient, load_service
+service = load_service()
+ready = time.perf_counter()
+asyncio.run(LocalClient(service.main_api).request("GET", "/health"))
+served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (ready - started) * 1000,
+    "first_request_ms": (served - ready) * 1000,
+    "startup": service.startup.report(),
+}))
+"""
+
+
+def run_child(import_times: bool) -> tuple[dict[str, Any], str]:
+    """Start the service in a fresh interpreter and return its report and -X importtime output"""
+    env = {**os.environ, "TASKS_STARTUP_LOG": "0", "TASKS_REQUEST_LOG": "0", "PYTHONPATH": str(ROOT)}
+    command = [sys.executable] + (["-X", "importtime"] if import_times else []) + ["-c", CHILD]
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def slowest_imports(importtime_output: str, count: int) -> list[dict[str, Any]]:
+    """Top-level modules by cumulative import time, from -X importtime output"""
+    modules = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented; only keep the ones the service asked for directly
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue
+        modules.append({"module": name.strip(), "cumulative_ms": int(cumulative) / 1000})
+    modules.sort(key=lambda module: module["cumulative_ms"], reverse=True)
+    return modules[:count]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure service cold-start time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--budget-ms", type=float, help="Fail if the median import time exceeds this")
+    parser.add_argument("--imports", type=int, default=0, help="Also list the N slowest top-level imports")
+    args = parser.parse_args(argv)
+
+    runs = [run_child(False)[0] for _ in range(args.runs)]
+    phases = sorted({phase for run in runs for phase in run["startup"]["phases_ms"]},
+                    key=lambda phase: list(runs[0]["startup"]["phases_ms"]).index(phase))
+    report: dict[str, Any] = {
+        "benchmark": "startup",
+        "runs": args.runs,
+        "import_ms": round(statistics.median(run["import_ms"] for run in runs), 3),
+        "first_request_ms": round(statistics.median(run["first_request_ms"] for run in runs), 3),
+        "phases_ms": {
+            phase: round(statistics.median(run["startup"]["phases_ms"].get(phase, 0.0) for run in runs), 3)
+            for phase in phases
+        },
+    }
+    if args.imports:
+        report["slowest_imports"] = slowest_imports(run_child(True)[1], args.imports)
+    if args.budget_ms is not None:
+        report["budget_ms"] = args.budget_ms
+        report["within_budget"] = report["import_ms"] <= args.budget_ms
+    print(json.dumps(report, indent=2))
+
+    if args.budget_ms is not None and not report["within_budget"]:
+        print(f"Cold-start import took {report['import_ms']}ms, over the {args.budget_ms}ms budget",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
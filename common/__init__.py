@@ -0,0 +1 @@
+"""Shared building blocks for the task management services"""
@@ -0,0 +1,164 @@
+"""Maintenance commands for the tasks store and the data derived from it.
+
+Usage:
+    python -m common.admin reconcile-stats
+    python -m common.admin rebuild-search
+    python -m common.admin rebuild-list-index
+    python -m common.admin rebuild-list-snapshot
+    python -m common.admin export --output tasks.ndjson
+    python -m common.admin import tasks.ndjson --checkpoint tasks.import.json
+
+Commands open the stores on the backend selected by TASKS_STORE_BACKEND, so
+they run against the deployed KV store under `nitric start` or against a
+local memory/SQLite store. Each prints its result as JSON.
+
+Nitric only allows resources to be declared outside the event loop, so each
+command opens its stores first and returns the coroutine that does the work.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Awaitable, Optional
+from uuid import uuid4
+
+from common.indexes import LIST_INDEX_STORE, TaskListIndex
+from common.changes import CHANGES_STORE, ChangeLog
+from common.importer import import_ndjson, stable_ids
+from common.models import Task
+from common.search import SEARCH_STORE, SearchIndex
+from common.snapshot import SHARDS as SNAPSHOT_SHARDS, SNAPSHOT_STORE, ListSnapshot
+from common.stats import STATS_STORE, TaskStats
+from common.storage import open_store, scan_items
+
+
+def reconcile_stats(args: argparse.Namespace) -> Awaitable[dict[str, Any]]:
+    """Rebuild the task counters from a full scan of the tasks store"""
+    stats = TaskStats(open_store(STATS_STORE, "get", "set"))
+    return stats.reconcile(open_store("tasks", "get"))
+
+
+def rebuild_search(args: argparse.Namespace) -> Awaitable[dict[str, Any]]:
+    """Regenerate the search index from a full scan of the tasks store"""
+    index = SearchIndex(open_store(SEARCH_STORE, "get", "set", "delete"))
+    return index.rebuild(open_store("tasks", "get"))
+
+
+def rebuild_list_index(args: argparse.Namespace) -> Awaitable[dict[str, Any]]:
+    """Regenerate the index behind filtered GET /tasks from a full scan of the tasks store"""
+    index = TaskListIndex(open_store(LIST_INDEX_STORE, "get", "set", "delete"))
+    return index.rebuild(open_store("tasks", "get"))
+
+
+def rebuild_list_snapshot(args: argparse.Namespace) -> Awaitable[dict[str, Any]]:
+    """Regenerate the materialised task list from a full scan of the tasks store"""
+    shards = args.shards or SNAPSHOT_SHARDS
+    if not shards:
+        raise SystemExit("Set TASKS_LIST_SNAPSHOT_SHARDS or pass --shards")
+    snapshot = ListSnapshot(open_store(SNAPSHOT_STORE, "get", "set"), shards)
+    return snapshot.rebuild(open_store("tasks", "get"))
+
+
+def export(args: argparse.Namespace) -> Awaitable[dict[str, Any]]:
+    """Write every task as NDJSON, streaming from the key scan"""
+    tasks = open_store("tasks", "get")
+
+    async def run():
+        count = 0
+        handle = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        try:
+            async for task_id, record in scan_items(tasks):
+                handle.write(Task.from_record(task_id, record).to_json() + "\n")
+                count += 1
+        finally:
+            if handle is not sys.stdout:
+                handle.close()
+        return {"exported": count, "output": args.output or "-"}
+    return run()
+
+
+def import_tasks(args: argparse.Namespace) -> Awaitable[dict[str, Any]]:
+    """Import an NDJSON file, resuming from its checkpoint file if one exists"""
+    tasks = open_store("tasks", "get", "set")
+    stats = TaskStats(open_store(STATS_STORE, "get", "set"))
+    changes = ChangeLog(open_store(CHANGES_STORE, "get", "set", "delete"))
+    derived = {
+        "search": SearchIndex(open_store(SEARCH_STORE, "get", "set", "delete")),
+        "list_index": TaskListIndex(open_store(LIST_INDEX_STORE, "get", "set", "delete")),
+    }
+    if SNAPSHOT_SHARDS:
+        derived["list_snapshot"] = ListSnapshot(open_store(SNAPSHOT_STORE, "get", "set"))
+    checkpoint_path = args.checkpoint or args.file + ".import.json"
+
+    # The import ID keeps generated task IDs stable when a resumed run rewrites lines
+    state = {"file": os.path.abspath(args.file), "import_id": str(uuid4()), "line": 0}
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, encoding="utf-8") as handle:
+            saved = json.load(handle)
+        if saved.get("file") != state["file"]:
+            raise SystemExit(f"{checkpoint_path} belongs to an import of {saved.get('file')}")
+        state.update(saved)
+
+    async def save_checkpoint(line: int):
+        state["line"] = line
+        # Write then rename, so a crash never leaves a truncated checkpoint
+        with open(checkpoint_path + ".tmp", "w", encoding="utf-8") as handle:
+            json.dump(state, handle)
+        os.replace(checkpoint_path + ".tmp", checkpoint_path)
+
+    async def run():
+        resumed_after = state["line"]
+        with open(args.file, encoding="utf-8") as lines:
+            result = await import_ndjson(
+                lines,
+                tasks,
+                make_id=stable_ids(state["import_id"]),
+                start_after=resumed_after,
+                concurrency=args.concurrency,
+                on_checkpoint=save_checkpoint,
+            )
+        report = {"resumed_after": resumed_after, "checkpoint_file": checkpoint_path, **result.to_dict()}
+        if result.imported:
+            # The imported tasks are not in the change log, so syncing clients must start over
+            report["changes"] = await changes.require_resync()
+        if not args.no_reconcile:
+            # Imported tasks may overwrite existing ones, so recount rather than adjust
+            report["stats"] = await stats.reconcile(tasks)
+            for name, index in derived.items():
+                report[name] = await index.rebuild(tasks)
+        return report
+    return run()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Maintain the tasks store and the data derived from it")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("reconcile-stats", help=reconcile_stats.__doc__).set_defaults(run=reconcile_stats)
+    commands.add_parser("rebuild-search", help=rebuild_search.__doc__).set_defaults(run=rebuild_search)
+    commands.add_parser("rebuild-list-index", help=rebuild_list_index.__doc__).set_defaults(run=rebuild_list_index)
+
+    command = commands.add_parser("rebuild-list-snapshot", help=rebuild_list_snapshot.__doc__)
+    command.add_argument("--shards", type=int, help="Shard documents to write (TASKS_LIST_SNAPSHOT_SHARDS)")
+    command.set_defaults(run=rebuild_list_snapshot)
+
+    command = commands.add_parser("export", help=export.__doc__)
+    command.add_argument("--output", help="File to write; defaults to stdout")
+    command.set_defaults(run=export)
+
+    command = commands.add_parser("import", help=import_tasks.__doc__)
+    command.add_argument("file", help="NDJSON file, one TaskInput or exported Task per line")
+    command.add_argument("--checkpoint", help="Progress file; defaults to FILE.import.json")
+    command.add_argument("--concurrency", type=int, help="Concurrent store writes (TASKS_IMPORT_CONCURRENCY)")
+    command.add_argument("--no-reconcile", action="store_true", help="Do not recount /tasks/stats or rebuild the indexes afterwards")
+    command.set_defaults(run=import_tasks)
+
+    args = parser.parse_args(argv)
+    result = asyncio.run(args.run(args))
+    # Keep stdout clean for the data when it is being exported there
+    print(json.dumps(result, indent=2), file=sys.stderr if args.command == "export" else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
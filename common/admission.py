@@ -0,0 +1,191 @@
+"""Admission control: per-client token buckets and a cap on requests in flight.
+
+Each client has a bucket of TASKS_RATE_LIMIT_BURST tokens that refills at
+TASKS_RATE_LIMIT_PER_SECOND tokens a second. A request takes one token, or
+TASKS_RATE_LIMIT_HEAVY_COST for the routes that fan out into many store
+calls (listing, export, search, batch and import), and a request that finds
+too few tokens is answered with 429 and a Retry-After header saying when
+there will be enough. Separately, TASKS_MAX_IN_FLIGHT caps the requests this
+instance serves at once; requests beyond it get 429 straight away.
+
+Clients are told apart by the last address in X-Forwarded-For, the one added
+by the API gateway (earlier ones are client-supplied), or by the header named
+in TASKS_RATE_LIMIT_CLIENT_HEADER, such as an API key header. The health
+check, metrics and documentation routes are never limited.
+
+Buckets live in memory, so each instance limits on its own. With
+TASKS_RATE_LIMIT_SHARED set, they are kept in the `rate-limits` key-value
+store instead and shared by every instance, at the cost of a read and a write
+per request. The KV store has no atomic update, so concurrent requests from
+one client can occasionally both spend the same tokens; if the store cannot
+be reached, the in-memory bucket decides instead.
+"""
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from urllib.parse import quote
+
+from nitric.context import HttpContext
+
+from common.config import env_int
+from common.http import header, json_response
+from common.storage import TaskStore
+
+# Name of the key-value store holding shared buckets
+RATE_LIMIT_STORE = "rate-limits"
+
+# Tokens a client's bucket gains per second; 0 disables rate limiting
+RATE_LIMIT_PER_SECOND = env_int("TASKS_RATE_LIMIT_PER_SECOND", 0, minimum=0)
+
+# Tokens of a full bucket: the largest burst a client can send at once
+RATE_LIMIT_BURST = env_int("TASKS_RATE_LIMIT_BURST", max(2 * RATE_LIMIT_PER_SECOND, 20))
+
+# Tokens taken by a request to a route that fans out into many store calls
+RATE_LIMIT_HEAVY_COST = env_int("TASKS_RATE_LIMIT_HEAVY_COST", 10)
+
+# Keep buckets in the key-value store so every instance shares them
+RATE_LIMIT_SHARED = env_int("TASKS_RATE_LIMIT_SHARED", 0, minimum=0) > 0
+
+# Header identifying the client
+RATE_LIMIT_CLIENT_HEADER = os.environ.get("TASKS_RATE_LIMIT_CLIENT_HEADER", "X-Forwarded-For").strip()
+
+# Requests this instance serves at once; 0 means no cap
+MAX_IN_FLIGHT = env_int("TASKS_MAX_IN_FLIGHT", 0, minimum=0)
+
+# In-memory buckets kept; the least recently used are dropped first
+MAX_TRACKED_CLIENTS = 10000
+
+logger = logging.getLogger("tasks.admission")
+
+
+def client_id(ctx: HttpContext, header_name: str = RATE_LIMIT_CLIENT_HEADER) -> str:
+    """The identity a request is rate limited under"""
+    value = header(ctx, header_name)
+    if not value:
+        return "anonymous"
+    if header_name.lower() == "x-forwarded-for":
+        # Proxies append, so only the last address was not chosen by the client
+        value = value.split(",")[-1]
+    return value.strip() or "anonymous"
+
+
+class TokenBuckets:
+    """Per-client token buckets, in memory or shared through a key-value store"""
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_PER_SECOND,
+        burst: float = RATE_LIMIT_BURST,
+        store: Optional[TaskStore] = None,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self._store = store
+        # Client to (tokens, time of the last refill)
+        self._local: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _take(self, bucket: Optional[tuple[float, float]], cost: float, now: float) -> tuple[tuple[float, float], float]:
+        """Refill a bucket and try to take cost tokens: the new bucket and the seconds to wait (0 if admitted)"""
+        tokens, updated = bucket if bucket is not None else (self.burst, now)
+        tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+        # A request costing more than a full bucket could never pass; let it through with an empty bucket
+        cost = min(cost, self.burst)
+        if tokens >= cost:
+            return (tokens - cost, now), 0.0
+        return (tokens, now), (cost - tokens) / self.rate
+
+    def _take_local(self, client: str, cost: float, now: float) -> float:
+        bucket, wait = self._take(self._local.pop(client, None), cost, now)
+        self._local[client] = bucket
+        if len(self._local) > MAX_TRACKED_CLIENTS:
+            # A dropped bucket comes back full, which is where an idle one would be anyway
+            self._local.popitem(last=False)
+        return wait
+
+    async def take(self, client: str, cost: float) -> float:
+        """Take cost tokens from a client's bucket; return 0 if admitted, else the seconds until it could be"""
+        now = time.time()
+        if self._store is None:
+            return self._take_local(client, cost, now)
+        key = quote(client, safe="")
+        try:
+            record = await self._store.get(key)
+            bucket, wait = self._take((record["tokens"], record["updated"]) if record else None, cost, now)
+            if not wait:
+                await self._store.set(key, {"tokens": bucket[0], "updated": bucket[1]})
+            return wait
+        except Exception as e:
+            logger.warning("Failed to use the shared rate limit of %s, limiting locally: %s", client, e)
+            return self._take_local(client, cost, now)
+
+
+class Admission:
+    """Decides which requests are served, and counts the ones turned away"""
+
+    def __init__(
+        self,
+        buckets: TokenBuckets,
+        heavy_routes: set[tuple[str, str]],
+        exempt_paths: set[str],
+        heavy_cost: float = RATE_LIMIT_HEAVY_COST,
+        max_in_flight: int = MAX_IN_FLIGHT,
+    ):
+        self.buckets = buckets
+        self._heavy = heavy_routes
+        self._exempt = exempt_paths
+        self._heavy_cost = heavy_cost
+        self._max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.rejected = {"rate_limit": 0, "in_flight": 0}
+
+    def cost(self, method: str, path: str) -> float:
+        return self._heavy_cost if (method, path) in self._heavy else 1
+
+    def stats(self) -> dict[str, Any]:
+        return {"in_flight": self.in_flight, "rejected": dict(self.rejected)}
+
+    def _reject(self, ctx: HttpContext, reason: str, retry_after: float, message: str) -> HttpContext:
+        self.rejected[reason] += 1
+        ctx.res.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        json_response(ctx, {"success": False, "error": message}, 429)
+        return ctx
+
+    def middleware(self):
+        """Build the API middleware that admits or rejects each request"""
+
+        async def middleware(ctx: HttpContext, nxt) -> HttpContext:
+            path = "/" + ctx.req.path.split("?", 1)[0].strip("/")
+            if path in self._exempt:
+                return await nxt(ctx) if nxt else ctx
+            if self._max_in_flight and self.in_flight >= self._max_in_flight:
+                return self._reject(ctx, "in_flight", 1, "Too many requests in progress; retry shortly")
+            if self.buckets.enabled:
+                client = client_id(ctx)
+                wait = await self.buckets.take(client, self.cost(ctx.req.method, path))
+                if wait:
+                    return self._reject(ctx, "rate_limit", wait,
+                                        "Rate limit exceeded; retry after the delay in the Retry-After header")
+            self.in_flight += 1
+            try:
+                return await nxt(ctx) if nxt else ctx
+            finally:
+                self.in_flight -= 1
+
+        return middleware
+
+    def metrics(self):
+        """Expose requests in flight and rejections on /metrics"""
+        yield "# HELP http_requests_in_flight Requests this instance is serving"
+        yield "# TYPE http_requests_in_flight gauge"
+        yield f"http_requests_in_flight {self.in_flight}"
+        yield "# HELP http_requests_rejected_total Requests refused by admission control, by reason"
+        yield "# TYPE http_requests_rejected_total counter"
+        for reason, count in self.rejected.items():
+            yield f'http_requests_rejected_total{{reason="{reason}"}} {count}'
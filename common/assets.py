@@ -0,0 +1,116 @@
+"""Pre-rendered static responses with compressed variants and strong ETags"""
+import gzip
+import hashlib
+from typing import Callable, Optional
+
+from nitric.context import HttpContext
+
+from common.http import etag_matches, header
+
+# Preferred order when a client accepts several encodings equally
+_ENCODING_PREFERENCE = ("br", "gzip", "identity")
+
+_brotli_module = False
+
+
+def _brotli():
+    """Return the optional brotli module, imported on first use, or None if it is not installed"""
+    global _brotli_module
+    if _brotli_module is False:
+        try:
+            import brotli
+        except ImportError:  # brotli is optional; gzip is always available
+            brotli = None
+        _brotli_module = brotli
+    return _brotli_module
+
+
+def parse_accept_encoding(value: Optional[str]) -> dict[str, float]:
+    """Parse an Accept-Encoding header into a mapping of coding to q-value"""
+    accepted: dict[str, float] = {}
+    if not value:
+        return accepted
+    for part in value.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+class StaticAsset:
+    """A response body rendered once, with gzip/brotli variants and a strong ETag"""
+
+    def __init__(self, body: bytes, content_type: str, max_age: int = 300):
+        self.content_type = content_type
+        self.cache_control = f"public, max-age={max_age}"
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.variants = {"identity": body}
+        # mtime=0 keeps the gzip bytes identical across instances
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            self.variants["gzip"] = compressed
+        brotli = _brotli()
+        if brotli is not None:
+            compressed = brotli.compress(body)
+            if len(compressed) < len(body):
+                self.variants["br"] = compressed
+
+    def choose_encoding(self, accept_encoding: Optional[str]) -> str:
+        """Pick the best available encoding the client accepts"""
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*")
+        best, best_q = "identity", 0.0
+        for coding in _ENCODING_PREFERENCE:
+            if coding not in self.variants:
+                continue
+            q = accepted.get(coding, wildcard if wildcard is not None else (1.0 if coding == "identity" else 0.0))
+            if q > best_q:
+                best, best_q = coding, q
+        return best
+
+    def serve(self, ctx: HttpContext) -> None:
+        """Write the asset to the response, answering 304 when the client's copy is current"""
+        ctx.res.headers["ETag"] = self.etag
+        ctx.res.headers["Cache-Control"] = self.cache_control
+        ctx.res.headers["Vary"] = "Accept-Encoding"
+        if etag_matches(header(ctx, "If-None-Match"), self.etag):
+            ctx.res.status = 304
+            ctx.res.body = b""
+            return
+        encoding = self.choose_encoding(header(ctx, "Accept-Encoding"))
+        ctx.res.headers["Content-Type"] = self.content_type
+        if encoding != "identity":
+            ctx.res.headers["Content-Encoding"] = encoding
+        ctx.res.body = self.variants[encoding]
+
+
+class LazyAsset:
+    """A StaticAsset rendered and compressed on its first request instead of at import.
+
+    Cold starts then only pay for the documents a container actually serves.
+    """
+
+    def __init__(self, render: Callable[[], bytes], content_type: str, max_age: int = 300):
+        self._render = render
+        self._content_type = content_type
+        self._max_age = max_age
+        self._asset: Optional[StaticAsset] = None
+
+    @property
+    def asset(self) -> StaticAsset:
+        if self._asset is None:
+            self._asset = StaticAsset(self._render(), self._content_type, self._max_age)
+        return self._asset
+
+    def serve(self, ctx: HttpContext) -> None:
+        """Render the asset if needed, then serve it like StaticAsset.serve"""
+        self.asset.serve(ctx)
@@ -0,0 +1,58 @@
+"""Bounded-concurrency fan-out for key-value store calls"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Optional, Union
+
+from common.config import KV_CONCURRENCY
+
+
+@dataclass
+class BatchResult:
+    """Ordered results of a batched operation, with failures reported per item"""
+
+    results: list = field(default_factory=list)
+    errors: dict = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """True when every item in the batch succeeded"""
+        return not self.errors
+
+
+async def run_bounded(
+    items: Iterable[Any],
+    operation: Callable[[Any], Awaitable[Any]],
+    concurrency: Optional[int] = None,
+) -> BatchResult:
+    """Run operation over items with at most `concurrency` calls in flight.
+
+    Results keep the order of items. A failing item leaves None in its slot and
+    its exception is recorded under the item's index in `errors`, so one bad
+    call never aborts the rest of the batch.
+    """
+    items = list(items)
+    limit = max(1, min(concurrency or KV_CONCURRENCY, len(items) or 1))
+    batch = BatchResult(results=[None] * len(items))
+    positions = iter(range(len(items)))
+
+    async def worker():
+        # Workers pull the next index from a shared iterator, so only `limit`
+        # coroutines exist no matter how large the batch is.
+        for index in positions:
+            try:
+                batch.results[index] = await operation(items[index])
+            except Exception as e:
+                batch.errors[index] = e
+
+    await asyncio.gather(*(worker() for _ in range(limit)))
+    return batch
+
+
+async def aiterate(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    """Iterate over a plain or an async iterable with `async for`"""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
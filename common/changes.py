@@ -0,0 +1,171 @@
+"""A time-ordered log of task changes, for incremental sync.
+
+Every write appends one entry per changed task to its own key-value store:
+an upsert carrying the new copy of the task, or a tombstone for a deletion.
+An entry's key is its position: the server timestamp of the change followed
+by a random suffix (`2024-05-01T12:00:00.000000Z-3f9a1c2b7d4e`). Keys sort in
+time order, and no two instances can pick the same one, so appends need no
+shared counter and concurrent writers cannot overwrite each other's entries.
+
+A client reads the entries after its position, `since`. That is a scan of the
+keys sharing the longest common prefix of `since` and the current time, so a
+sync costs about the churn since its position rather than a full listing. An
+entry is stamped as its own write starts and becomes visible only
+TASKS_CHANGE_SETTLE_MS after that: its write has then either landed or timed
+out, so a reader that moves past a position never misses an entry that lands
+behind it later.
+
+Entries older than TASKS_CHANGE_RETENTION_HOURS are compacted away by an
+hourly schedule of the API service, off the write path, and a
+position older than that must resync: re-read the full list and continue
+from the `resync_from` position. The same happens when an append fails, or
+when tasks were changed without being logged (an admin import): a resync
+marker then makes every position before it invalid.
+"""
+import logging
+import os
+import re
+import time
+from typing import Any, Iterable, Optional
+
+from common import clock
+from common.batch import run_bounded
+from common.config import KV_TIMEOUT_MS, env_int
+from common.models import Task
+from common.storage import TaskStore, common_prefix, scan_keys
+
+# Name of the key-value store holding the log
+CHANGES_STORE = "task-changes"
+
+# Key of the record holding the resync marker; positions start with a digit, so it never matches a scan
+META_KEY = "meta"
+
+# Hours an entry is kept; clients further behind must resync
+RETENTION_HOURS = env_int("TASKS_CHANGE_RETENTION_HOURS", 24)
+
+# Milliseconds before an entry is served: longer than the write of one entry may take before it times out
+SETTLE_MS = env_int("TASKS_CHANGE_SETTLE_MS", KV_TIMEOUT_MS + 1000)
+
+# Entries are deleted this long after leaving the retention window, so no reader still within it looks for one
+COMPACT_GRACE_SECONDS = 3600
+
+# A timestamp, optionally followed by an entry's suffix
+POSITION = re.compile(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}Z(-[0-9a-f]+)?")
+
+logger = logging.getLogger("tasks.changes")
+
+
+class ResyncRequired(Exception):
+    """The requested position is no longer covered by the log"""
+
+    def __init__(self, resync_from: str):
+        super().__init__("The change log no longer covers this position; re-read GET /tasks and continue from resync_from")
+        self.resync_from = resync_from
+
+
+def _position(seconds_ago: float = 0) -> str:
+    """The position of the current time, less seconds_ago"""
+    return clock.format_timestamp(time.time_ns() // 1000 - int(seconds_ago * 1_000_000))
+
+
+class ChangeLog:
+    """Appends task changes under time-ordered keys and reads them back in order"""
+
+    def __init__(self, store: TaskStore):
+        self._store = store
+        # Set when entries or a resync marker could not be written, until a marker is
+        self._lost = False
+
+    async def append(self, changes: Iterable[tuple[str, Optional[Task]]]) -> None:
+        """Log (task ID, current copy) changes; a current copy of None is a deletion.
+
+        Failures are logged rather than raised; clients are made to resync instead.
+        """
+        changes = list(changes)
+        if not changes:
+            return
+
+        async def write(change: tuple[str, Optional[Task]]) -> None:
+            task_id, current = change
+            # Stamped as its own write starts, so it lands within one store deadline of its position
+            at = clock.now()
+            entry: dict[str, Any] = {"id": task_id, "op": "delete" if current is None else "upsert", "at": at}
+            if current is not None:
+                entry["task"] = current.to_record()
+            await self._store.set(f"{at}-{os.urandom(6).hex()}", entry)
+
+        batch = await run_bounded(changes, write)
+        failed, error = len(batch.errors), next(iter(batch.errors.values()), None)
+        if failed or self._lost:
+            if failed:
+                # A failed write may still land later, behind readers that moved on, so nobody can trust the log
+                logger.warning("Failed to log %d task changes; clients must resync: %s", failed, error)
+            try:
+                await self.require_resync()
+            except Exception as e:
+                self._lost = True
+                logger.warning("Failed to mark the change log for resync: %s", e)
+
+    async def compact(self) -> None:
+        """Delete the entries past the retention window; failures are logged, and the next run retries"""
+        cutoff = _position(RETENTION_HOURS * 3600 + COMPACT_GRACE_SECONDS)
+        # Earlier compactions removed older entries, so only this month and the last hold any
+        month = cutoff[:7]
+        previous = _position(RETENTION_HOURS * 3600 + COMPACT_GRACE_SECONDS + 31 * 86400)[:7]
+        stale = []
+        try:
+            for prefix in sorted({previous, month}):
+                stale += [key for key in await self._scan(prefix) if key < cutoff]
+        except Exception as e:
+            logger.warning("Failed to scan the change log for compaction: %s", e)
+            return
+        deleted = await run_bounded(stale, self._store.delete)
+        if deleted.errors:
+            logger.warning("Failed to compact %d change log entries", len(deleted.errors))
+
+    async def _scan(self, prefix: str) -> list[str]:
+        return [key for key in await scan_keys(self._store, prefix) if key != META_KEY]
+
+    async def position(self) -> str:
+        """The position a client should sync from after a full listing that starts now"""
+        meta = await self._store.get(META_KEY) or {}
+        return max(_position(SETTLE_MS / 1000), meta.get("resync_before") or "")
+
+    async def read(self, since: str, limit: int) -> tuple[list[dict[str, Any]], str, bool]:
+        """Return up to limit entries after since, in order, the position to continue from and whether more follow.
+
+        Raises ResyncRequired when since is outside the kept window.
+        """
+        upper = _position(SETTLE_MS / 1000)
+        meta = await self._store.get(META_KEY) or {}
+        resync_before = meta.get("resync_before")
+        if since < _position(RETENTION_HOURS * 3600) or (resync_before and since < resync_before):
+            # Continuing from before the marker would fail again, so start at the later of the two
+            raise ResyncRequired(max(upper, resync_before or ""))
+        if since >= upper:
+            # Nothing after since has settled yet
+            return [], since, False
+
+        keys = sorted(key for key in await self._scan(common_prefix(since, upper)) if since < key <= upper)
+        selected = keys[:limit]
+        has_more = len(keys) > limit
+        batch = await self._store.get_many(selected)
+        if batch.errors:
+            raise next(iter(batch.errors.values()))
+        entries = []
+        for key, entry in zip(selected, batch.results):
+            # A missing entry was compacted during the read; the client is past the window and will resync
+            if not entry:
+                continue
+            entry["position"] = key
+            if "task" in entry:
+                entry["task"] = Task.from_record(entry["id"], entry["task"])
+            entries.append(entry)
+        return entries, selected[-1] if has_more else upper, has_more
+
+    async def require_resync(self) -> dict[str, str]:
+        """Make every client resync, after tasks were changed without being logged"""
+        marker = clock.now()
+        await self._store.set(META_KEY, {"resync_before": marker})
+        self._lost = False
+        return {"resync_from": marker}
@@ -0,0 +1,61 @@
+"""Server timestamps and time-ordered task IDs.
+
+Timestamps are UTC ISO 8601 strings of fixed width
+(`2024-05-01T12:00:00.000000Z`), so comparing them as strings, as the list
+index does, orders them in time. Within a process each one is strictly later
+than the last, even if the system clock steps back.
+
+Task IDs are UUIDv7 (RFC 9562): a 48-bit millisecond timestamp, then a 12-bit
+counter that keeps IDs from the same millisecond in order, then random bits.
+Their string form sorts in creation order, so the materialised list, which
+is in ID order, returns new tasks after old ones; key scans come in whatever
+order the store keeps, which the Nitric KV store does not define. Records
+with older uuid4 IDs are unaffected; only new tasks get UUIDv7 IDs.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from uuid import UUID
+
+# Characters of a timestamp up to and including the minute, hour, day, month and year
+TIME_PREFIXES = (16, 13, 10, 7, 4)
+
+_lock = threading.Lock()
+_last_micros = 0
+_last_millis = 0
+_counter = 0
+
+
+def format_timestamp(micros: int) -> str:
+    """Format microseconds since the epoch as a fixed-width UTC timestamp"""
+    moment = datetime.fromtimestamp(micros // 1_000_000, tz=timezone.utc)
+    return f"{moment:%Y-%m-%dT%H:%M:%S}.{micros % 1_000_000:06d}Z"
+
+
+def now() -> str:
+    """The current time as a server timestamp, later than any returned before by this process"""
+    global _last_micros
+    with _lock:
+        _last_micros = max(time.time_ns() // 1000, _last_micros + 1)
+        micros = _last_micros
+    return format_timestamp(micros)
+
+
+def new_task_id() -> str:
+    """A new UUIDv7 task ID, later in sort order than any returned before by this process"""
+    global _last_millis, _counter
+    with _lock:
+        millis = time.time_ns() // 1_000_000
+        if millis > _last_millis:
+            # Start each millisecond at a random point in the lower half, leaving room to count up
+            _last_millis, _counter = millis, int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            _counter += 1
+            if _counter > 0xFFF:
+                # Out of counter values for this millisecond: borrow the next one
+                _last_millis, _counter = _last_millis + 1, 0
+        millis, counter = _last_millis, _counter
+    random_bits = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (millis << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | random_bits
+    return str(UUID(int=value))
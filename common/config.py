@@ -0,0 +1,57 @@
+"""Runtime configuration read from environment variables"""
+import os
+
+
+def env_int(name: str, default: int, minimum: int = 1) -> int:
+    """Read an integer setting from the environment, falling back to the default"""
+    raw = os.environ.get(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        return default
+    return max(value, minimum)
+
+
+# Maximum number of key-value store calls a single request keeps in flight
+KV_CONCURRENCY = env_int("TASKS_KV_CONCURRENCY", 64)
+
+# Largest number of items accepted by the batch endpoints
+MAX_BATCH_SIZE = env_int("TASKS_MAX_BATCH_SIZE", 500)
+
+# Number of tasks kept in the in-process read-through cache (0 disables it)
+TASK_CACHE_SIZE = env_int("TASKS_CACHE_SIZE", 1024, minimum=0)
+
+# Seconds a cached task is served before it is read from the store again
+TASK_CACHE_TTL_SECONDS = env_int("TASKS_CACHE_TTL_SECONDS", 30, minimum=0)
+
+# Storage backend for tasks: "nitric" (the deployed KV store), "memory" or "sqlite"
+STORE_BACKEND = os.environ.get("TASKS_STORE_BACKEND", "nitric").strip().lower()
+
+# Database file used by the "sqlite" backend
+SQLITE_PATH = os.environ.get("TASKS_SQLITE_PATH", "tasks.db")
+
+# Concurrent store writes kept in flight by a bulk import
+IMPORT_CONCURRENCY = env_int("TASKS_IMPORT_CONCURRENCY", 32)
+
+# Lines between the progress checkpoints of a bulk import
+IMPORT_CHECKPOINT_EVERY = env_int("TASKS_IMPORT_CHECKPOINT_EVERY", 1000)
+
+# Milliseconds a single key-value store call may take before it fails with a timeout
+KV_TIMEOUT_MS = env_int("TASKS_KV_TIMEOUT_MS", 2000)
+
+# Extra attempts made for a key-value read that fails or times out (writes are never retried)
+KV_READ_RETRIES = env_int("TASKS_KV_READ_RETRIES", 2, minimum=0)
+
+# Base delay of the jittered exponential backoff between read attempts, in milliseconds
+KV_RETRY_BASE_MS = env_int("TASKS_KV_RETRY_BASE_MS", 25)
+
+# Milliseconds after which a slow read is raced against a second one (0 disables hedging)
+KV_HEDGE_MS = env_int("TASKS_KV_HEDGE_MS", 0, minimum=0)
+
+# Consecutive failed calls that open a store's circuit breaker
+KV_BREAKER_FAILURES = env_int("TASKS_KV_BREAKER_FAILURES", 5)
+
+# Seconds an open circuit breaker rejects calls before letting a probe through
+KV_BREAKER_RESET_SECONDS = env_int("TASKS_KV_BREAKER_RESET_SECONDS", 10)
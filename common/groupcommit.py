@@ -0,0 +1,51 @@
+"""Group commit of changes to shared key-value records within one process.
+
+The KV store has no atomic update, so changing a shared record (the task
+counters, a shard of the list snapshot) means reading it, changing it and
+writing it back. Done once per change, concurrent changes would overwrite
+each other and every one would pay a full round trip. Instead each change is
+queued under its record's key, and whoever holds the key's lock writes every
+change queued so far in one read-modify-write; callers that arrive while a
+write is in flight find their changes written by the next lock holder. A
+burst of changes then costs about two writes however large it is.
+
+This only serialises writers within the process: instances still race one
+another, so the records need their own way to detect or repair drift.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class GroupCommit(Generic[T]):
+    """Writes the changes queued for a key together, one write per key at a time"""
+
+    def __init__(self, write: Callable[[Hashable, T], Awaitable[None]], merge: Callable[[T, T], T]):
+        # write applies merged changes to the record under a key; merge folds later changes into earlier ones
+        self._write = write
+        self._merge = merge
+        self._pending: dict[Hashable, T] = {}
+        self._locks: defaultdict[Hashable, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    def add(self, key: Hashable, changes: T) -> None:
+        """Queue changes for the next write of key, without starting one"""
+        self._pending[key] = self._merge(self._pending[key], changes) if key in self._pending else changes
+
+    async def commit(self, key: Hashable, changes: T) -> None:
+        """Queue changes and return once they are written, together with any queued meanwhile"""
+        self.add(key, changes)
+        async with self._locks[key]:
+            if key not in self._pending:
+                # An earlier lock holder already wrote these changes
+                return
+            await self._write(key, self._pending.pop(key))
+
+    def lock(self, key: Hashable) -> asyncio.Lock:
+        """The lock held while key is written, for callers that overwrite the record outright"""
+        return self._locks[key]
+
+    def discard(self, key: Hashable) -> Optional[T]:
+        """Drop the changes queued for key and return them, e.g. once the record has been rebuilt"""
+        return self._pending.pop(key, None)
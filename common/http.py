@@ -0,0 +1,128 @@
+"""Helpers for reading Nitric HTTP requests and writing JSON responses"""
+import json
+import math
+from typing import Any, Iterable, Optional
+
+from nitric.context import HttpContext
+
+from common.resilience import StoreUnavailable
+
+
+def query_param(ctx: HttpContext, name: str) -> Optional[str]:
+    """Return the first value of a query string parameter, or None when absent"""
+    value = ctx.req.query.get(name)
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def header(ctx: HttpContext, name: str) -> Optional[str]:
+    """Return the first value of a request header, matched case-insensitively"""
+    name = name.lower()
+    for key, value in ctx.req.headers.items():
+        if key.lower() == name:
+            if isinstance(value, list):
+                return value[0] if value else None
+            return value
+    return None
+
+
+def query_flag(ctx: HttpContext, name: str) -> bool:
+    """Return True if a boolean query string parameter is set to a truthy value"""
+    value = query_param(ctx, name)
+    return value is not None and value.lower() in ("1", "true", "yes")
+
+
+def etag_matches(header_value: Optional[str], etag: str, weak: bool = True) -> bool:
+    """Return True if an If-None-Match/If-Match header value matches the given ETag.
+
+    If-None-Match uses weak comparison; pass weak=False for If-Match, where
+    weak validators never match.
+    """
+    if not header_value:
+        return False
+    if header_value.strip() == "*":
+        return True
+    if not weak and etag.startswith("W/"):
+        return False
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header_value.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+class RouteTable:
+    """Matches concrete request paths against route templates such as /tasks/:id"""
+
+    def __init__(self, templates: Iterable[str]):
+        # Static segments win over parameters, as with API Gateway routing
+        self._routes = sorted(
+            {template: template.strip("/").split("/") for template in templates}.items(),
+            key=lambda route: (sum(segment.startswith(":") for segment in route[1]), route[0]),
+        )
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def match(self, path: str) -> Optional[tuple[str, dict[str, str]]]:
+        """Return the matching template and its path parameters, or None"""
+        segments = path.split("?", 1)[0].strip("/").split("/")
+        for template, pattern in self._routes:
+            if len(pattern) != len(segments):
+                continue
+            params = {}
+            for expected, actual in zip(pattern, segments):
+                if expected.startswith(":"):
+                    params[expected[1:]] = actual
+                elif expected != actual:
+                    break
+            else:
+                return template, params
+        return None
+
+
+def dump_json(value: Any) -> str:
+    """Encode a response value as compact JSON.
+
+    Objects with a to_json() method (such as Task) write their own encoding,
+    so pre-serialised items are embedded without being converted to dicts.
+    """
+    if hasattr(value, "to_json"):
+        return value.to_json()
+    if isinstance(value, dict):
+        return "{" + ",".join(json.dumps(str(key)) + ":" + dump_json(item) for key, item in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(dump_json(item) for item in value) + "]"
+    return json.dumps(value, separators=(",", ":"))
+
+
+def json_response(ctx: HttpContext, body: dict, status: Optional[int] = None) -> None:
+    """Write a JSON response body that may contain objects with to_json()"""
+    if status is not None:
+        ctx.res.status = status
+    ctx.res.headers["Content-Type"] = "application/json"
+    ctx.res.body = dump_json(body).encode("utf-8")
+
+
+def failure(ctx: HttpContext, message: str, error: Exception) -> None:
+    """Write the error response of a failed request.
+
+    A key-value store that timed out or whose circuit breaker is open is
+    reported as 503 with a Retry-After header, so clients back off instead of
+    retrying at once; anything else is a 500.
+    """
+    if isinstance(error, StoreUnavailable):
+        ctx.res.status = 503
+        ctx.res.headers["Retry-After"] = str(math.ceil(error.retry_after))
+    else:
+        ctx.res.status = 500
+    ctx.res.body = {
+        "success": False,
+        "error": f"{message}: {str(error)}"
+    }
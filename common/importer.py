@@ -0,0 +1,190 @@
+"""Bulk import of NDJSON tasks into the tasks store.
+
+Lines are read one at a time and validated against the OpenAPI schemas, then
+written by a fixed pool of concurrent store writers. The queue between the
+reader and the writers is bounded, so reading pauses whenever the writers
+fall behind and memory stays flat for any file size.
+
+Progress is tracked as a checkpoint: the line number up to which every line
+has been handled (imported, or rejected as invalid). A failed write holds the
+checkpoint back, so resuming after a failure with `start_after=checkpoint`
+retries it. Lines between the checkpoint and the failure may be written
+twice, which is harmless when task IDs are stable: an `id` in the line is
+kept, and lines without one get IDs derived from an import ID and their line
+number (see stable_ids).
+"""
+import asyncio
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable, Optional, Union
+from uuid import NAMESPACE_URL, uuid5
+
+from common import clock
+from common.batch import aiterate
+from common.config import IMPORT_CHECKPOINT_EVERY, IMPORT_CONCURRENCY
+from common.models import Task
+from common.openapi import validate_task_input, validate_task_update
+from common.storage import TaskStore
+from common.validation import ITEM
+
+# Errors listed in an ImportResult; later ones are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+@dataclass
+class ImportResult:
+    """Counts and progress of a bulk import"""
+
+    read: int = 0
+    imported: int = 0
+    invalid: int = 0
+    failed: int = 0
+    # Every line up to and including this one has been handled
+    checkpoint: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """True when every line read was imported"""
+        return not self.invalid and not self.failed
+
+    def add_error(self, line: int, error: str) -> None:
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def random_ids(line: int) -> str:
+    """IDs for lines without one: a new time-ordered UUID each time"""
+    return clock.new_task_id()
+
+
+def stable_ids(import_id: str) -> Callable[[int], str]:
+    """IDs for lines without one, derived from the import ID and line number so reruns overwrite"""
+    return lambda line: str(uuid5(NAMESPACE_URL, f"tasks-import:{import_id}:{line}"))
+
+
+def parse_task(text: Union[str, bytes], task_id: str) -> tuple[Task, bool]:
+    """Decode and validate one NDJSON line.
+
+    Returns the versioned task and whether its ID was generated (task_id) rather
+    than taken from the line. Raises ValueError with a message for invalid lines.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        raise ValueError("Line is not valid JSON") from None
+    error = validate_task_input(data, ITEM) or validate_task_update(data, ITEM)
+    if error:
+        raise ValueError(error)
+    line_id = data.get("id")
+    if line_id is not None and (not isinstance(line_id, str) or not line_id):
+        raise ValueError("id must be a non-empty string")
+    # Exported lines carry every field; plain TaskInput lines get the usual defaults
+    record = {"description": "", "completed": False}
+    record.update((key, value) for key, value in data.items() if key not in ("id", "version"))
+    # Lines without timestamps are stamped as they are imported
+    record["created_at"] = record.get("created_at") or clock.now()
+    record["updated_at"] = record.get("updated_at") or record["created_at"]
+    return Task.from_record(line_id or task_id, record).with_version(), line_id is None
+
+
+async def import_ndjson(
+    lines: Union[Iterable[Union[str, bytes]], AsyncIterable[Union[str, bytes]]],
+    store: TaskStore,
+    make_id: Callable[[int], str] = random_ids,
+    start_after: int = 0,
+    concurrency: Optional[int] = None,
+    checkpoint_every: int = IMPORT_CHECKPOINT_EVERY,
+    on_checkpoint: Optional[Callable[[int], Awaitable[None]]] = None,
+    on_imported: Optional[Callable[[Task, Optional[Task]], Awaitable[None]]] = None,
+) -> ImportResult:
+    """Import NDJSON lines into store, skipping the first start_after lines.
+
+    on_checkpoint is awaited with the checkpoint every checkpoint_every lines
+    and once at the end; on_imported is awaited with each written task and
+    the copy it replaced, or None for a new task. To find that copy, tasks
+    are read before they are written, except those given a fresh random ID.
+    """
+    limit = max(1, concurrency or IMPORT_CONCURRENCY)
+    result = ImportResult(checkpoint=start_after)
+    # Room for one task per writer plus one waiting each, then the reader blocks
+    queue: asyncio.Queue = asyncio.Queue(maxsize=limit * 2)
+    handled: set[int] = set()
+    first_failure: Optional[int] = None
+    reported = start_after
+    checkpoint_lock = asyncio.Lock()
+
+    async def finish(line: int, written: bool = True) -> None:
+        nonlocal first_failure, reported
+        if not written and (first_failure is None or line < first_failure):
+            first_failure = line
+        if first_failure is not None and line >= first_failure:
+            # The checkpoint cannot move past the failure, so there is nothing to track
+            return
+        handled.add(line)
+        while result.checkpoint + 1 in handled:
+            handled.remove(result.checkpoint + 1)
+            result.checkpoint += 1
+        if on_checkpoint is not None and result.checkpoint - reported >= checkpoint_every:
+            async with checkpoint_lock:
+                if result.checkpoint > reported:
+                    reported = result.checkpoint
+                    await on_checkpoint(reported)
+
+    async def writer() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            line, task, generated = item
+            try:
+                previous = None
+                if on_imported is not None and not (generated and make_id is random_ids):
+                    # A kept or stable ID may overwrite a task; imports are not latency-critical, so read it
+                    record = await store.get(task.id)
+                    previous = Task.from_record(task.id, record) if record is not None else None
+                await store.set(task.id, task.to_record())
+                if on_imported is not None:
+                    await on_imported(task, previous)
+            except Exception as e:
+                result.failed += 1
+                result.add_error(line, f"Failed to write task '{task.id}': {e}")
+                await finish(line, written=False)
+                continue
+            result.imported += 1
+            await finish(line)
+
+    writers = [asyncio.ensure_future(writer()) for _ in range(limit)]
+    try:
+        line = 0
+        async for text in aiterate(lines):
+            line += 1
+            if line <= start_after:
+                continue
+            text = text.strip()
+            if not text:
+                await finish(line)
+                continue
+            result.read += 1
+            try:
+                task, generated = parse_task(text, make_id(line))
+            except ValueError as e:
+                result.invalid += 1
+                result.add_error(line, str(e))
+                await finish(line)
+                continue
+            # Waits here while the writers are behind
+            await queue.put((line, task, generated))
+        for _ in writers:
+            await queue.put(None)
+        await asyncio.gather(*writers)
+    finally:
+        for worker in writers:
+            worker.cancel()
+
+    if on_checkpoint is not None and result.checkpoint > reported:
+        await on_checkpoint(result.checkpoint)
+    return result
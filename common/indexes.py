@@ -0,0 +1,210 @@
+"""Secondary indexes kept as keys of their own key-value stores.
+
+An index derives a set of keys from each task and stores them with empty
+values; queries list keys by prefix and never read the index values. Writes
+report each change to the index, which adds and deletes only the keys that
+differ between the old and new copy of the task.
+
+A write whose previous copy is unknown (a blind write) cannot delete the
+old keys. Queries check the tasks they return against the keys that matched
+them and prune the stale ones as they find them; `rebuild` regenerates an
+index from a full scan of the tasks store.
+
+TaskListIndex backs the filtered and sorted forms of GET /tasks. Each task
+has one key per timestamp field, `<field>|<completed>|<timestamp>|<task id>`,
+so the tasks with one completed state share a prefix. Server timestamps are
+fixed-width UTC strings (see common/clock.py), so a time range shares the
+longest common prefix of its bounds, and the newest tasks share a prefix with
+the current time: ranges and newest-first listings scan only the keys of the
+smallest matching window, not the whole index.
+"""
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+from urllib.parse import quote, unquote
+
+from common import clock
+from common.batch import run_bounded
+from common.models import Task
+from common.pagination import encode_cursor
+from common.storage import TaskStore, common_prefix, scan_items, scan_keys
+
+# Name of the key-value store holding the list index
+LIST_INDEX_STORE = "task-list-index"
+
+# Timestamp fields the list index can filter and sort on
+TIME_FIELDS = ("created_at", "updated_at")
+
+# Orders accepted by TaskListIndex.query
+SORTS = TIME_FIELDS + tuple("-" + name for name in TIME_FIELDS)
+
+logger = logging.getLogger("tasks.indexes")
+
+
+class KeyIndex(ABC):
+    """An index whose entries are keys derived from each task"""
+
+    name = "index"
+
+    def __init__(self, store: TaskStore):
+        self._store = store
+
+    @abstractmethod
+    def task_keys(self, task: Optional[Task]) -> set[str]:
+        """The index keys of a task, or none for a missing one"""
+
+    async def update(self, changes: Iterable[tuple[Optional[Task], Optional[Task]]]) -> None:
+        """Apply (previous, current) changes, writing only the keys that differ.
+
+        previous is None for a new task or an unknown previous copy, current
+        is None for a deletion. Index failures are logged rather than raised.
+        """
+        added: set[str] = set()
+        removed: set[str] = set()
+        for previous, current in changes:
+            old, new = self.task_keys(previous), self.task_keys(current)
+            added |= new - old
+            removed |= old - new
+        # A key added by one change and removed by another in the same batch stays
+        removed -= added
+        await self._write(added, removed)
+
+    async def prune(self, keys: set[str]) -> None:
+        """Delete keys a query found to be stale"""
+        if keys:
+            await self._write(set(), keys)
+
+    async def _write(self, added: set[str], removed: set[str]) -> int:
+        batch = await run_bounded(
+            [(key, True) for key in added] + [(key, False) for key in removed],
+            lambda item: self._store.set(item[0], {}) if item[1] else self._store.delete(item[0]),
+        )
+        if batch.errors:
+            logger.warning("Failed to update %d keys of the %s index; rebuild it to repair it: %s",
+                           len(batch.errors), self.name, next(iter(batch.errors.values())))
+        return len(batch.errors)
+
+    async def scan(self, prefix: str) -> list[str]:
+        """List the index keys starting with prefix"""
+        return await scan_keys(self._store, prefix)
+
+    async def rebuild(self, tasks: TaskStore) -> dict[str, Any]:
+        """Regenerate the index from a full scan of the tasks store.
+
+        Existing keys are kept while the scan runs, so queries keep working;
+        only missing keys are written and stale ones deleted.
+        """
+        existing = set(await self.scan(""))
+        indexed = kept = 0
+        added: set[str] = set()
+        async for task_id, record in scan_items(tasks):
+            indexed += 1
+            for key in self.task_keys(Task.from_record(task_id, record)):
+                if key in existing:
+                    existing.discard(key)
+                    kept += 1
+                else:
+                    added.add(key)
+        failed = await self._write(added, existing)
+        return {"tasks": indexed, "keys": kept + len(added), "added": len(added),
+                "removed": len(existing), "failed": failed}
+
+
+def _state(completed: Any) -> str:
+    # Matches the counters: only completed=true counts as completed
+    return "true" if completed is True else "false"
+
+
+@dataclass
+class ListPage:
+    """One page of a filtered task listing"""
+
+    tasks: list = field(default_factory=list)
+    # Tasks whose index keys matched but which could not be read
+    errors: list = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+class TaskListIndex(KeyIndex):
+    """Tasks by completed state and timestamps, for filtered and sorted listing"""
+
+    name = "list"
+
+    def task_keys(self, task: Optional[Task]) -> set[str]:
+        if task is None:
+            return set()
+        state = _state(task.completed)
+        keys = set()
+        for name in TIME_FIELDS:
+            value = getattr(task, name)
+            value = value if isinstance(value, str) else ""
+            # Timestamps of older tasks came from clients, so escape the separator; quoting keeps prefixes
+            keys.add(f"{name}|{state}|{quote(value, safe=':+')}|{task.id}")
+        return keys
+
+    async def query(
+        self,
+        tasks: TaskStore,
+        completed: Optional[bool] = None,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        sort: str = "created_at",
+        offset: int = 0,
+        limit: int = 100,
+    ) -> ListPage:
+        """Read one page of the tasks matching the filters, ordered by a timestamp field.
+
+        sort names the field (created_at or updated_at, descending with a
+        leading -), and after and before are exclusive bounds on it.
+        Timestamps compare as strings. Only the index keys of the matching
+        completed states within the smallest window holding the page are
+        read, plus the tasks on the page.
+        """
+        name = sort.lstrip("-")
+        descending = sort.startswith("-")
+        states = ["true", "false"] if completed is None else [_state(completed)]
+        # Server timestamps are never in the future, so now bounds a range that has no end
+        upper = before if before is not None else clock.now()
+        widest = common_prefix(after, upper) if after is not None else ""
+        # Newest first, the page lies in the latest windows: try the narrowest around the upper bound first
+        windows = [upper[:length] for length in clock.TIME_PREFIXES if length > len(widest)] if descending else []
+        wanted = offset + limit + 1
+
+        for window in windows + [widest]:
+            matches = []
+            for state in states:
+                for key in await self.scan(f"{name}|{state}|{quote(window, safe=':+')}"):
+                    _, _, value, task_id = key.split("|", 3)
+                    value = unquote(value)
+                    if after is not None and not value > after:
+                        continue
+                    if before is not None and not value < before:
+                        continue
+                    matches.append((value, task_id, key))
+            # Everything outside this window is older, so enough matches here are the newest
+            if len(matches) >= wanted:
+                break
+        matches.sort(reverse=descending)
+
+        page = ListPage()
+        selected = matches[offset:offset + limit]
+        if offset + limit < len(matches):
+            page.next_cursor = encode_cursor(offset + limit)
+
+        batch = await tasks.get_many([task_id for _, task_id, _ in selected])
+        stale = set()
+        for index, (_, task_id, key) in enumerate(selected):
+            error = batch.errors.get(index)
+            if error is not None:
+                page.errors.append({"id": task_id, "error": str(error)})
+                continue
+            record = batch.results[index]
+            task = Task.from_record(task_id, record) if record else None
+            # Blind writes can leave keys for an old copy; the current copy has its own keys
+            if key not in self.task_keys(task):
+                stale.add(key)
+                continue
+            page.tasks.append(task)
+        await self.prune(stale)
+        return page
@@ -0,0 +1,267 @@
+"""Request and key-value store instrumentation, exported in Prometheus text format"""
+import json
+import logging
+import sys
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
+
+from nitric.context import HttpContext
+
+from common.batch import BatchResult
+from common.config import env_int
+from common.http import RouteTable
+from common.storage import TaskStore
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1_000)
+
+# Emit one structured log line per request (set TASKS_REQUEST_LOG=0 to disable)
+REQUEST_LOG = env_int("TASKS_REQUEST_LOG", 1, minimum=0) > 0
+
+request_logger = logging.getLogger("tasks.requests")
+if not request_logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    request_logger.addHandler(_handler)
+    request_logger.setLevel(logging.INFO)
+    request_logger.propagate = False
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label set"""
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float]):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            # Per-bucket counts, then the +Inf count and the sum
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, label_names: tuple) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self._series.items()):
+            base = _labels(label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound:g}"}} {cumulative}'
+            cumulative += series[len(self.buckets)]
+            yield f'{self.name}_bucket{{{base}{"," if base else ""}le="+Inf"}} {cumulative}'
+            yield f"{self.name}_sum{{{base}}} {series[-1]:.6f}"
+            yield f"{self.name}_count{{{base}}} {cumulative}"
+
+
+class Counter:
+    """Monotonic counter, one series per label set"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._series: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple, amount: float = 1) -> None:
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self, label_names: tuple) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self._series.items()):
+            yield f"{self.name}{{{_labels(label_names, labels)}}} {value:g}"
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class RequestStats:
+    """Store usage accumulated while serving one request"""
+
+    __slots__ = ("kv_calls", "kv_items", "kv_seconds", "kv_ops")
+
+    def __init__(self):
+        self.kv_calls = 0
+        self.kv_items = 0
+        self.kv_seconds = 0.0
+        self.kv_ops: dict[str, int] = {}
+
+
+# Stats for the request being served; tasks spawned by a handler share it
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+REQUEST_LABELS = ("method", "route", "status")
+KV_LABELS = ("store", "op")
+
+request_duration = Histogram("http_request_duration_seconds", "Time spent serving a request, by route", LATENCY_BUCKETS)
+response_size = Histogram("http_response_size_bytes", "Response body size, by route", SIZE_BUCKETS)
+request_kv_calls = Histogram("http_request_kv_calls", "Key-value store calls made while serving one request", COUNT_BUCKETS)
+request_kv_duration = Histogram("http_request_kv_seconds", "Time spent waiting on the key-value store per request", LATENCY_BUCKETS)
+kv_duration = Histogram("kv_operation_duration_seconds", "Latency of key-value store operations", LATENCY_BUCKETS)
+kv_operations = Counter("kv_operations_total", "Key-value store operations issued")
+kv_items = Counter("kv_items_total", "Keys read, written or deleted by key-value store operations")
+kv_errors = Counter("kv_errors_total", "Key-value store operations that raised an error")
+
+# Extra callables returning exposition lines, e.g. cache counters
+_collectors: list[Callable[[], Iterable[str]]] = []
+
+
+def register_collector(collector: Callable[[], Iterable[str]]) -> None:
+    """Add a callable whose lines are appended to the /metrics output"""
+    _collectors.append(collector)
+
+
+def record_kv(store: str, op: str, seconds: float, items: int = 1, failed: bool = False) -> None:
+    """Record one key-value store operation globally and against the current request"""
+    labels = (store, op)
+    kv_duration.observe(labels, seconds)
+    kv_operations.inc(labels)
+    kv_items.inc(labels, items)
+    if failed:
+        kv_errors.inc(labels)
+    stats = current_request.get()
+    if stats is not None:
+        stats.kv_calls += 1
+        stats.kv_items += items
+        stats.kv_seconds += seconds
+        stats.kv_ops[op] = stats.kv_ops.get(op, 0) + 1
+
+
+def render() -> str:
+    """Render every metric in Prometheus text exposition format"""
+    lines: list[str] = []
+    lines.extend(request_duration.render(REQUEST_LABELS))
+    lines.extend(response_size.render(REQUEST_LABELS))
+    lines.extend(request_kv_calls.render(REQUEST_LABELS))
+    lines.extend(request_kv_duration.render(REQUEST_LABELS))
+    lines.extend(kv_duration.render(KV_LABELS))
+    lines.extend(kv_operations.render(KV_LABELS))
+    lines.extend(kv_items.render(KV_LABELS))
+    lines.extend(kv_errors.render(KV_LABELS))
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+class InstrumentedStore(TaskStore):
+    """Wraps a TaskStore and records the count and latency of every call"""
+
+    def __init__(self, store: TaskStore):
+        self._store = store
+        self.name = store.name
+
+    async def _timed(self, op: str, call, items: int = 1):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await call
+            failed = False
+            return result
+        finally:
+            record_kv(self.name, op, time.perf_counter() - started, items, failed)
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        return await self._timed("get", self._store.get(key))
+
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        await self._timed("set", self._store.set(key, value))
+
+    async def delete(self, key: str) -> None:
+        await self._timed("delete", self._store.delete(key))
+
+    async def keys(self, prefix: str = "") -> AsyncIterator[str]:
+        started = time.perf_counter()
+        count = 0
+        failed = False
+        scan = self._store.keys(prefix)
+        try:
+            async for key in scan:
+                count += 1
+                yield key
+        except GeneratorExit:
+            # The caller stopped reading early, which is not a failure
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            await scan.aclose()
+            record_kv(self.name, "keys", time.perf_counter() - started, count, failed)
+
+    async def get_many(self, keys: Iterable[str], concurrency: Optional[int] = None) -> BatchResult:
+        keys = list(keys)
+        return await self._timed("get_many", self._store.get_many(keys, concurrency), len(keys))
+
+    async def set_many(self, items: Iterable[tuple[str, dict[str, Any]]], concurrency: Optional[int] = None) -> BatchResult:
+        items = list(items)
+        return await self._timed("set_many", self._store.set_many(items, concurrency), len(items))
+
+
+def instrument_store(store: TaskStore) -> TaskStore:
+    """Wrap a store so its calls show up in /metrics and the request log"""
+    return InstrumentedStore(store)
+
+
+def metrics_middleware(route_templates: Callable[[], Iterable[str]]):
+    """Build an API middleware that times requests and reports their store usage.
+
+    `route_templates` returns the API's registered route paths; requests are
+    labelled by template (/tasks/:id) rather than by concrete path.
+    """
+    table: Optional[RouteTable] = None
+
+    async def middleware(ctx: HttpContext, nxt) -> HttpContext:
+        nonlocal table
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            result = await nxt(ctx) if nxt else ctx
+        finally:
+            current_request.reset(token)
+        ctx = result or ctx
+        elapsed = time.perf_counter() - started
+
+        templates = list(route_templates())
+        if table is None or len(table) != len(set(templates)):
+            table = RouteTable(templates)
+        matched = table.match(ctx.req.path)
+        route = matched[0] if matched else "unmatched"
+        size = len(ctx.res.body or b"")
+
+        labels = (ctx.req.method, route, str(ctx.res.status))
+        request_duration.observe(labels, elapsed)
+        response_size.observe(labels, size)
+        request_kv_calls.observe(labels, stats.kv_calls)
+        request_kv_duration.observe(labels, stats.kv_seconds)
+
+        if REQUEST_LOG:
+            request_logger.info(json.dumps({
+                "event": "request",
+                "method": ctx.req.method,
+                "route": route,
+                "path": ctx.req.path,
+                "status": ctx.res.status,
+                "duration_ms": round(elapsed * 1000, 3),
+                "response_bytes": size,
+                "kv_calls": stats.kv_calls,
+                "kv_items": stats.kv_items,
+                "kv_ms": round(stats.kv_seconds * 1000, 3),
+                "kv_ops": stats.kv_ops,
+            }, separators=(",", ":")))
+        return ctx
+
+    return middleware
@@ -0,0 +1,149 @@
+"""The Task model and its JSON encoding.
+
+A Task mirrors one record of the tasks store plus its ID. It is the single
+place that knows the task field set: handlers decode store records with
+Task.from_record, write them back with to_record, and serialise them with
+to_json, which writes JSON straight from the slots without building an
+intermediate dict.
+"""
+import json
+from json.encoder import encode_basestring_ascii
+from typing import Any, Optional
+
+from common.versioning import content_version
+
+# Marks a field that is not present in the stored record
+ABSENT: Any = type("Absent", (), {"__repr__": lambda self: "ABSENT", "__slots__": ()})()
+
+
+def _encode_value(value: Any) -> str:
+    if value.__class__ is str:
+        return encode_basestring_ascii(value)
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if value is None:
+        return "null"
+    return json.dumps(value, separators=(",", ":"))
+
+
+class Task:
+    """A stored task. Fields absent from the record stay ABSENT, so records round-trip unchanged."""
+
+    FIELDS = ("title", "description", "completed", "created_at", "updated_at", "version")
+
+    __slots__ = ("id",) + FIELDS + ("extra",)
+
+    # Precomputed '"name":' fragments used by to_json
+    _JSON_KEYS = tuple((name, "," + encode_basestring_ascii(name) + ":") for name in FIELDS)
+
+    def __init__(self, id: str, title: Any = ABSENT, description: Any = ABSENT, completed: Any = ABSENT,
+                 created_at: Any = ABSENT, updated_at: Any = ABSENT, version: Any = ABSENT,
+                 extra: Optional[dict[str, Any]] = None):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.completed = completed
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.version = version
+        # Fields this version of the service does not know about, kept for round-tripping
+        self.extra = extra
+
+    @classmethod
+    def from_record(cls, task_id: str, record: dict[str, Any]) -> "Task":
+        """Decode a record read from the tasks store"""
+        get = record.get
+        task = cls(
+            task_id,
+            get("title", ABSENT),
+            get("description", ABSENT),
+            get("completed", ABSENT),
+            get("created_at", ABSENT),
+            get("updated_at", ABSENT),
+            get("version", ABSENT),
+        )
+        known = sum(1 for name in cls.FIELDS if name in record)
+        if known != len(record):
+            task.extra = {key: value for key, value in record.items() if key not in cls.FIELDS}
+        return task
+
+    @classmethod
+    def from_input(cls, task_id: str, data: dict[str, Any], timestamp: str) -> "Task":
+        """Build a new task from a TaskInput payload, created and updated at timestamp.
+
+        Timestamps are the server's: created_at and updated_at in the payload are ignored.
+        """
+        return cls(
+            task_id,
+            title=data["title"],
+            description=data.get("description", ""),
+            completed=data.get("completed", False),
+            created_at=timestamp,
+            updated_at=timestamp,
+        )
+
+    def merge(self, data: dict[str, Any], timestamp: str) -> "Task":
+        """Return a copy with a TaskUpdate payload applied, updated at timestamp"""
+        return Task(
+            self.id,
+            title=data.get("title", self.get("title")),
+            description=data.get("description", self.get("description")),
+            completed=data.get("completed", self.get("completed")),
+            created_at=self.get("created_at", ""),
+            updated_at=timestamp,
+        )
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Return a field's value, or default if it is absent from the record"""
+        value = getattr(self, name)
+        return default if value is ABSENT else value
+
+    def to_record(self) -> dict[str, Any]:
+        """Encode the task as the record stored under its ID"""
+        record = {name: value for name in self.FIELDS if (value := getattr(self, name)) is not ABSENT}
+        if self.extra:
+            record.update(self.extra)
+        return record
+
+    def to_dict(self) -> dict[str, Any]:
+        """The task as a plain dict, ID first"""
+        return {"id": self.id, **self.to_record()}
+
+    def current_version(self) -> str:
+        """The stored version, derived from the content for records written before versions existed"""
+        return self.version if self.version is not ABSENT and self.version else content_version(self.to_record())
+
+    def with_version(self) -> "Task":
+        """Return a copy stamped with the version of its current content"""
+        task = Task(self.id, self.title, self.description, self.completed, self.created_at, self.updated_at,
+                    extra=self.extra)
+        task.version = content_version(task.to_record())
+        return task
+
+    @property
+    def etag(self) -> str:
+        """The strong ETag for this task"""
+        return f'"{self.current_version()}"'
+
+    def to_json(self) -> str:
+        """Serialise as a JSON object (ID first) directly from the slots"""
+        parts = ['{"id":', encode_basestring_ascii(self.id)]
+        for name, key in self._JSON_KEYS:
+            value = getattr(self, name)
+            if value is not ABSENT:
+                parts.append(key)
+                parts.append(_encode_value(value))
+        if self.extra:
+            for name, value in self.extra.items():
+                parts.append("," + encode_basestring_ascii(name) + ":")
+                parts.append(_encode_value(value))
+        parts.append("}")
+        return "".join(parts)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Task) and self.id == other.id and self.to_record() == other.to_record()
+
+    def __repr__(self) -> str:
+        return f"Task({self.to_dict()!r})"
@@ -0,0 +1,1250 @@
+"""The OpenAPI document for the task API, and the request validators compiled from it.
+
+The component schemas are the single source of truth for request bodies:
+the service and the maintenance commands validate input with the
+validators below, and /swagger.json serves the same document.
+"""
+from common.validation import component_validator
+
+# OpenAPI 3.0 Specification
+OPENAPI_SPEC = {
+    "openapi": "3.0.0",
+    "info": {
+        "title": "Nitric Python Web API",
+        "version": "1.0.0",
+        "description": "A REST API example with CRUD operations for task management built with Nitric framework",
+        "contact": {
+            "name": "API Support"
+        }
+    },
+    "servers": [
+        {
+            "url": "http://localhost:4001",
+            "description": "Local development server"
+        }
+    ],
+    "paths": {
+        "/": {
+            "get": {
+                "summary": "API information",
+                "description": "Welcome endpoint with API information and available endpoints",
+                "tags": ["General"],
+                "responses": {
+                    "200": {
+                        "description": "API information",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "message": {"type": "string"},
+                                        "version": {"type": "string"},
+                                        "description": {"type": "string"},
+                                        "endpoints": {"type": "object"}
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        "/health": {
+            "get": {
+                "summary": "Health check",
+                "description": "Health check endpoint to verify the API is running",
+                "tags": ["General"],
+                "responses": {
+                    "200": {
+                        "description": "API is healthy",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "status": {"type": "string", "enum": ["healthy", "degraded", "unhealthy"], "description": "degraded while the breaker of a derived-data store (search, list index, changes, snapshot, rate limits) is open"},
+                                        "message": {"type": "string"},
+                                        "cache": {"$ref": "#/components/schemas/CacheStats"},
+                                        "stores": {
+                                            "type": "object",
+                                            "description": "Circuit breaker state and retry counts of each key-value store, by store name",
+                                            "additionalProperties": {"$ref": "#/components/schemas/StoreHealth"}
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "503": {
+                        "description": "Unhealthy - the circuit breaker of the tasks store is open; the body is the same as for 200, with status unhealthy"
+                    }
+                }
+            }
+        },
+        "/metrics": {
+            "get": {
+                "summary": "Metrics",
+                "description": "Per-route latency and response size histograms, key-value store call counts and latencies, and task cache counters for this instance, in Prometheus text format",
+                "tags": ["General"],
+                "responses": {
+                    "200": {
+                        "description": "Prometheus text exposition",
+                        "content": {
+                            "text/plain": {
+                                "schema": {"type": "string"}
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        "/tasks": {
+            "get": {
+                "summary": "Get all tasks",
+                "description": "Retrieve one page of tasks from the key-value store. Pass the returned next_cursor, with the same filters, to fetch the following page. Filtered or sorted listings are served from a secondary index, so they read the index entries of the matching completed state and time range plus the tasks on the page, rather than every task; newest-first listings such as sort=-created_at&limit=20 read only the most recent time window that holds the page. When the service keeps a materialised list snapshot (TASKS_LIST_SNAPSHOT_SHARDS), unfiltered listings are read from its few shard documents in task ID order, falling back to the key scan while the snapshot is missing, stale or expired. A listing keeps the source of its first page: a cursor from a snapshot page answers 410 once the snapshot becomes unavailable, and the listing must restart from the first page.",
+                "tags": ["Tasks"],
+                "parameters": [
+                    {
+                        "name": "limit",
+                        "in": "query",
+                        "required": False,
+                        "description": "Maximum number of tasks to return",
+                        "schema": {"type": "integer", "minimum": 1, "maximum": 1000, "default": 100}
+                    },
+                    {
+                        "name": "cursor",
+                        "in": "query",
+                        "required": False,
+                        "description": "Opaque cursor from a previous response's next_cursor",
+                        "schema": {"type": "string"}
+                    },
+                    {
+                        "name": "completed",
+                        "in": "query",
+                        "required": False,
+                        "description": "Only tasks with this completed state",
+                        "schema": {"type": "string", "enum": ["true", "false"]}
+                    },
+                    {
+                        "name": "created_after",
+                        "in": "query",
+                        "required": False,
+                        "description": "Only tasks whose created_at is later than this. Timestamps compare as strings; server timestamps look like 2024-05-01T12:00:00.000000Z",
+                        "schema": {"type": "string"}
+                    },
+                    {
+                        "name": "created_before",
+                        "in": "query",
+                        "required": False,
+                        "description": "Only tasks whose created_at is earlier than this",
+                        "schema": {"type": "string"}
+                    },
+                    {
+                        "name": "updated_after",
+                        "in": "query",
+                        "required": False,
+                        "description": "Only tasks changed after this timestamp; cannot be combined with the created_at bounds",
+                        "schema": {"type": "string"}
+                    },
+                    {
+                        "name": "updated_before",
+                        "in": "query",
+                        "required": False,
+                        "description": "Only tasks last changed before this timestamp",
+                        "schema": {"type": "string"}
+                    },
+                    {
+                        "name": "sort",
+                        "in": "query",
+                        "required": False,
+                        "description": "Order by created_at or updated_at, ascending or (with -) descending; with a range it must be the field of the range, which is also the default. Without filters or sort, tasks come in the store's scan order, or in task ID order from the list snapshot",
+                        "schema": {"type": "string", "enum": ["created_at", "updated_at", "-created_at", "-updated_at"]}
+                    },
+                    {"$ref": "#/components/parameters/IfNoneMatch"}
+                ],
+                "responses": {
+                    "200": {
+                        "description": "One page of tasks",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "success": {"type": "boolean"},
+                                        "count": {"type": "integer", "description": "Number of tasks in this page"},
+                                        "tasks": {
+                                            "type": "array",
+                                            "items": {"$ref": "#/components/schemas/Task"}
+                                        },
+                                        "next_cursor": {
+                                            "type": "string",
+                                            "nullable": True,
+                                            "description": "Cursor for the next page, or null on the last page"
+                                        },
+                                        "errors": {
+                                            "type": "array",
+                                            "description": "Tasks that could not be read; only present on partial failure",
+                                            "items": {"$ref": "#/components/schemas/ItemError"}
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "304": {
+                        "description": "Not modified - the ETag sent in If-None-Match is still current"
+                    },
+                    "400": {
+                        "description": "Bad request - invalid limit, cursor, filter or sort",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "410": {
+                        "description": "The list snapshot the cursor's listing was read from is no longer available; restart from the first page",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "500": {
+                        "description": "Server error",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "429": {"$ref": "#/components/responses/TooManyRequests"},
+                    "503": {"$ref": "#/components/responses/StoreUnavailable"}
+                }
+            },
+            "post": {
+                "summary": "Create a new task",
+                "description": "Create a new task with title, description, and completion status",
+                "tags": ["Tasks"],
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {"$ref": "#/components/schemas/TaskInput"},
+                            "example": {
+                                "title": "Learn Nitric",
+                                "description": "Complete the Nitric tutorial",
+                                "completed": False
+                            }
+                        }
+                    }
+                },
+                "responses": {
+                    "201": {
+                        "description": "Task created successfully",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "success": {"type": "boolean"},
+                                        "message": {"type": "string"},
+                                        "task": {"$ref": "#/components/schemas/Task"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "400": {
+                        "description": "Bad request - missing required fields",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "500": {
+                        "description": "Server error",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "429": {"$ref": "#/components/responses/TooManyRequests"},
+                    "503": {"$ref": "#/components/responses/StoreUnavailable"}
+                }
+            }
+        },
+        "/tasks/export": {
+            "get": {
+                "summary": "Export tasks as NDJSON",
+                "description": "Return tasks as newline-delimited JSON, one Task object per line. Responses cannot be streamed by the runtime, so the export is paged: while the response carries an X-Next-Cursor header, request the next page with it. The cursor is a position in the key scan, so each page re-reads the keys of every page before it, and tasks created or deleted during the export can shift later pages, skipping or repeating tasks. It is not a consistent backup; for large or consistent exports use python -m common.admin export.",
+                "tags": ["Tasks"],
+                "parameters": [
+                    {
+                        "name": "limit",
+                        "in": "query",
+                        "required": False,
+                        "description": "Maximum number of tasks in this page",
+                        "schema": {"type": "integer", "minimum": 1}
+                    },
+                    {
+                        "name": "cursor",
+                        "in": "query",
+                        "required": False,
+                        "description": "X-Next-Cursor value from the previous page",
+                        "schema": {"type": "string"}
+                    }
+                ],
+                "responses": {
+                    "200": {
+                        "description": "One page of tasks",
+                        "headers": {
+                            "X-Next-Cursor": {
+                                "description": "Cursor for the next page; absent on the last page",
+                                "schema": {"type": "string"}
+                            }
+                        },
+                        "content": {
+                            "application/x-ndjson": {
+                                "schema": {"type": "string"}
+                            }
+                        }
+                    },
+                    "400": {
+                        "description": "Invalid limit or cursor",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "500": {
+                        "description": "Server error",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "429": {"$ref": "#/components/responses/TooManyRequests"},
+                    "503": {"$ref": "#/components/responses/StoreUnavailable"}
+                }
+            }
+        },
+        "/tasks/stats": {
+            "get": {
+                "summary": "Task statistics",
+                "description": "Total, completed and pending task counts, read from counters kept up to date by every write instead of by scanning the tasks. Blind writes, and races between instances, can leave the counters slightly off until they are reconciled (python -m common.admin reconcile-stats).",
+                "tags": ["Tasks"],
+                "responses": {
+                    "200": {
+                        "description": "Current task counters",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "success": {"type": "boolean"},
+                                        "stats": {"$ref": "#/components/schemas/TaskStats"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "500": {
+                        "description": "Server error",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "429": {"$ref": "#/components/responses/TooManyRequests"},
+                    "503": {"$ref": "#/components/responses/StoreUnavailable"}
+                }
+            }
+        },
+        "/tasks/changes": {
+            "get": {
+                "summary": "Task changes since a position",
+                "description": "Incremental sync. Every write appends one entry per changed task to a time-ordered change log: an upsert carrying the new copy of the task, or a tombstone for a deletion. A new client calls without since to get the current position as next_since, reads GET /tasks, then applies the changes after that position in order, calling again with next_since until has_more is false. Entries are served a few seconds after they are written (TASKS_CHANGE_SETTLE_MS) and kept for TASKS_CHANGE_RETENTION_HOURS. A position the log no longer covers answers 410 with resync_required, after which the client re-reads GET /tasks and continues from resync_from.",
+                "tags": ["Tasks"],
+                "parameters": [
+                    {
+                        "name": "since",
+                        "in": "query",
+                        "required": False,
+                        "description": "Position from an earlier next_since or resync_from; omit it to get only the current position",
+                        "schema": {"type": "string", "example": "2024-05-01T12:00:00.000000Z"}
+                    },
+                    {
+                        "name": "limit",
+                        "in": "query",
+                        "required": False,
+                        "description": "Maximum number of changes to return",
+                        "schema": {"type": "integer", "minimum": 1, "maximum": 1000, "default": 100}
+                    }
+                ],
+                "responses": {
+                    "200": {
+                        "description": "The changes after since, oldest first",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "success": {"type": "boolean"},
+                                        "count": {"type": "integer"},
+                                        "changes": {
+                                            "type": "array",
+                                            "items": {"$ref": "#/components/schemas/TaskChange"}
+                                        },
+                                        "next_since": {"type": "string", "description": "Value of since for the next call"},
+                                        "has_more": {"type": "boolean", "description": "True when more changes follow next_since"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "400": {
+                        "description": "Bad request - invalid since or limit",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "410": {
+                        "description": "The log no longer covers since; re-read GET /tasks and continue from resync_from",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "success": {"type": "boolean", "example": False},
+                                        "error": {"type": "string"},
+                                        "resync_required": {"type": "boolean", "example": True},
+                                        "resync_from": {"type": "string", "description": "Position to continue from after re-reading GET /tasks"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "500": {
+                        "description": "Server error",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "429": {"$ref": "#/components/responses/TooManyRequests"},
+                    "503": {"$ref": "#/components/responses/StoreUnavailable"}
+                }
+            }
+        },
+        "/tasks/search": {
+            "get": {
+                "summary": "Search tasks",
+                "description": "Full-text search over task titles and descriptions, ranked best first. Returns the tasks containing every word of q; words in the title and rare words weigh more. Served from an inverted index kept up to date by every write, so a search reads only the index entries of its words and the tasks on the page. Rebuild the index with python -m common.admin rebuild-search.",
+                "tags": ["Tasks"],
+                "parameters": [
+                    {
+                        "name": "q",
+                        "in": "query",
+                        "required": True,
+                        "description": "Words to search for; case is ignored and words shorter than two characters are skipped",
+                        "schema": {"type": "string"}
+                    },
+                    {
+                        "name": "limit",
+                        "in": "query",
+                        "required": False,
+                        "description": "Maximum number of tasks to return",
+                        "schema": {"type": "integer", "minimum": 1, "maximum": 1000, "default": 100}
+                    },
+                    {
+                        "name": "cursor",
+                        "in": "query",
+                        "required": False,
+                        "description": "Opaque cursor from a previous response's next_cursor",
+                        "schema": {"type": "string"}
+                    }
+                ],
+                "responses": {
+                    "200": {
+                        "description": "One page of matching tasks",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "success": {"type": "boolean"},
+                                        "query": {"type": "string"},
+                                        "matches": {"type": "integer", "description": "Number of matching tasks across all pages"},
+                                        "count": {"type": "integer", "description": "Number of tasks in this page"},
+                                        "results": {
+                                            "type": "array",
+                                            "items": {"$ref": "#/components/schemas/SearchHit"}
+                                        },
+                                        "next_cursor": {
+                                            "type": "string",
+                                            "nullable": True,
+                                            "description": "Cursor for the next page, or null on the last page"
+                                        },
+                                        "errors": {
+                                            "type": "array",
+                                            "description": "Tasks that could not be read; only present on partial failure",
+                                            "items": {"$ref": "#/components/schemas/ItemError"}
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "400": {
+                        "description": "Bad request - missing q, or invalid limit or cursor",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "500": {
+                        "description": "Server error",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "429": {"$ref": "#/components/responses/TooManyRequests"},
+                    "503": {"$ref": "#/components/responses/StoreUnavailable"}
+                }
+            }
+        },
+        "/tasks/import": {
+            "post": {
+                "summary": "Import tasks from NDJSON",
+                "description": "Create or overwrite tasks from newline-delimited JSON, one TaskInput (or exported Task) per line. Lines are validated one by one and written with bounded concurrency. An id in a line is kept; other lines get new IDs, derived from import_id when it is given so that resending lines overwrites instead of duplicating. After a failure, resend with resume_after set to the returned checkpoint.",
+                "tags": ["Tasks"],
+                "parameters": [
+                    {
+                        "name": "resume_after",
+                        "in": "query",
+                        "required": False,
+                        "description": "Skip this many lines of the body (the checkpoint of an earlier attempt)",
+                        "schema": {"type": "integer", "minimum": 0}
+                    },
+                    {
+                        "name": "import_id",
+                        "in": "query",
+                        "required": False,
+                        "description": "Client-chosen name for this import, making generated task IDs stable across retries",
+                        "schema": {"type": "string"}
+                    }
+                ],
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/x-ndjson": {
+                            "schema": {"type": "string"}
+                        }
+                    }
+                },
+                "responses": {
+                    "200": {
+                        "description": "Every line was imported",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/ImportResponse"}
+                            }
+                        }
+                    },
+                    "207": {
+                        "description": "Some lines were invalid or could not be written; see errors",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/ImportResponse"}
+                            }
+                        }
+                    },
+                    "400": {
+                        "description": "Invalid query parameters or empty body",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        "/tasks/batch": {
+            "post": {
+                "summary": "Create tasks in bulk",
+                "description": "Create several tasks from an array of TaskInput objects. Every item is validated before anything is written; if any item is invalid the whole batch is rejected.",
+                "tags": ["Tasks"],
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "type": "array",
+                                "minItems": 1,
+                                "maxItems": 500,
+                                "items": {"$ref": "#/components/schemas/TaskInput"}
+                            },
+                            "example": [
+                                {"title": "Learn Nitric", "completed": False},
+                                {"title": "Deploy to AWS", "description": "Run nitric up"}
+                            ]
+                        }
+                    }
+                },
+                "responses": {
+                    "201": {
+                        "description": "All tasks created",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/BatchResponse"}
+                            }
+                        }
+                    },
+                    "207": {
+                        "description": "Some tasks could not be written; see the per-item results",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/BatchResponse"}
+                            }
+                        }
+                    },
+                    "400": {
+                        "description": "Bad request - body is not an array, is too large, or contains invalid tasks",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/BatchResponse"}
+                            }
+                        }
+                    },
+                    "500": {
+                        "description": "Server error",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "429": {"$ref": "#/components/responses/TooManyRequests"},
+                    "503": {"$ref": "#/components/responses/StoreUnavailable"}
+                }
+            },
+            "patch": {
+                "summary": "Update tasks in bulk",
+                "description": "Apply partial updates to several tasks. Each item carries the task ID and the fields to change. Missing tasks are reported per item with status 404.",
+                "tags": ["Tasks"],
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "type": "array",
+                                "minItems": 1,
+                                "maxItems": 500,
+                                "items": {"$ref": "#/components/schemas/TaskBatchUpdate"}
+                            },
+                            "example": [
+                                {"id": "3f1c2e9a-8d4b-4a6e-9c1f-2b7d5e8a0c3d", "completed": True},
+                                {"id": "9a8b7c6d-5e4f-4a3b-8c2d-1e0f9a8b7c6d", "title": "Renamed"}
+                            ]
+                        }
+                    }
+                },
+                "responses": {
+                    "200": {
+                        "description": "All tasks updated",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/BatchResponse"}
+                            }
+                        }
+                    },
+                    "207": {
+                        "description": "Some items failed or were not found; see the per-item results",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/BatchResponse"}
+                            }
+                        }
+                    },
+                    "400": {
+                        "description": "Bad request - body is not an array, is too large, repeats an ID, or has an item without an ID or fields",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "500": {
+                        "description": "Server error",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "429": {"$ref": "#/components/responses/TooManyRequests"},
+                    "503": {"$ref": "#/components/responses/StoreUnavailable"}
+                }
+            },
+            "delete": {
+                "summary": "Delete tasks in bulk",
+                "description": "Delete several tasks by ID. Missing tasks are reported per item with status 404.",
+                "tags": ["Tasks"],
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {"$ref": "#/components/schemas/TaskBatchDelete"},
+                            "example": {
+                                "ids": ["3f1c2e9a-8d4b-4a6e-9c1f-2b7d5e8a0c3d", "9a8b7c6d-5e4f-4a3b-8c2d-1e0f9a8b7c6d"]
+                            }
+                        }
+                    }
+                },
+                "responses": {
+                    "200": {
+                        "description": "All tasks deleted",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/BatchResponse"}
+                            }
+                        }
+                    },
+                    "207": {
+                        "description": "Some items failed or were not found; see the per-item results",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/BatchResponse"}
+                            }
+                        }
+                    },
+                    "400": {
+                        "description": "Bad request - missing, empty, oversized or duplicated list of IDs",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "500": {
+                        "description": "Server error",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "429": {"$ref": "#/components/responses/TooManyRequests"},
+                    "503": {"$ref": "#/components/responses/StoreUnavailable"}
+                }
+            }
+        },
+        "/tasks/{id}": {
+            "get": {
+                "summary": "Get a specific task",
+                "description": "Retrieve a specific task by its ID",
+                "tags": ["Tasks"],
+                "parameters": [
+                    {
+                        "name": "id",
+                        "in": "path",
+                        "required": True,
+                        "description": "Task ID",
+                        "schema": {"type": "string", "format": "uuid"}
+                    },
+                    {"$ref": "#/components/parameters/IfNoneMatch"}
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Task details",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "success": {"type": "boolean"},
+                                        "task": {"$ref": "#/components/schemas/Task"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "304": {
+                        "description": "Not modified - the ETag sent in If-None-Match is still current"
+                    },
+                    "404": {
+                        "description": "Task not found",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "500": {
+                        "description": "Server error",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "429": {"$ref": "#/components/responses/TooManyRequests"},
+                    "503": {"$ref": "#/components/responses/StoreUnavailable"}
+                }
+            },
+            "put": {
+                "summary": "Update a task",
+                "description": "Update an existing task by ID",
+                "tags": ["Tasks"],
+                "parameters": [
+                    {
+                        "name": "id",
+                        "in": "path",
+                        "required": True,
+                        "description": "Task ID",
+                        "schema": {"type": "string", "format": "uuid"}
+                    },
+                    {
+                        "name": "blind",
+                        "in": "query",
+                        "required": False,
+                        "description": "Skip the read that checks the task exists, and write it directly. The body must then be a full TaskInput, and the task is created if it did not exist.",
+                        "schema": {"type": "boolean", "default": False}
+                    },
+                    {"$ref": "#/components/parameters/IfMatch"}
+                ],
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {"$ref": "#/components/schemas/TaskUpdate"},
+                            "example": {
+                                "title": "Learn Nitric - Updated",
+                                "completed": True
+                            }
+                        }
+                    }
+                },
+                "responses": {
+                    "200": {
+                        "description": "Task updated successfully",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "success": {"type": "boolean"},
+                                        "message": {"type": "string"},
+                                        "result": {
+                                            "type": "string",
+                                            "enum": ["upserted"],
+                                            "description": "Blind writes only: the task was created or replaced, which the store cannot tell apart"
+                                        },
+                                        "task": {"$ref": "#/components/schemas/Task"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "404": {
+                        "description": "Task not found",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "400": {
+                        "description": "Bad request",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "412": {
+                        "description": "Precondition failed - the ETag sent in If-Match is no longer current",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "500": {
+                        "description": "Server error",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "429": {"$ref": "#/components/responses/TooManyRequests"},
+                    "503": {"$ref": "#/components/responses/StoreUnavailable"}
+                }
+            },
+            "delete": {
+                "summary": "Delete a task",
+                "description": "Delete a task by ID",
+                "tags": ["Tasks"],
+                "parameters": [
+                    {
+                        "name": "id",
+                        "in": "path",
+                        "required": True,
+                        "description": "Task ID",
+                        "schema": {"type": "string", "format": "uuid"}
+                    },
+                    {
+                        "name": "blind",
+                        "in": "query",
+                        "required": False,
+                        "description": "Skip the read that checks the task exists, and delete it directly. Deleting an unknown ID then succeeds.",
+                        "schema": {"type": "boolean", "default": False}
+                    },
+                    {"$ref": "#/components/parameters/IfMatch"}
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Task deleted successfully",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "success": {"type": "boolean"},
+                                        "message": {"type": "string"},
+                                        "result": {
+                                            "type": "string",
+                                            "enum": ["deleted_if_present"],
+                                            "description": "Blind deletes only: the task is gone, whether or not it existed"
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "404": {
+                        "description": "Task not found",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "412": {
+                        "description": "Precondition failed - the ETag sent in If-Match is no longer current",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "500": {
+                        "description": "Server error",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    },
+                    "429": {"$ref": "#/components/responses/TooManyRequests"},
+                    "503": {"$ref": "#/components/responses/StoreUnavailable"}
+                }
+            }
+        }
+    },
+    "components": {
+        "parameters": {
+            "IfNoneMatch": {
+                "name": "If-None-Match",
+                "in": "header",
+                "required": False,
+                "description": "ETag from a previous response; a 304 with no body is returned if it is still current",
+                "schema": {"type": "string"}
+            },
+            "IfMatch": {
+                "name": "If-Match",
+                "in": "header",
+                "required": False,
+                "description": "Only apply the change if the task's current ETag matches; otherwise 412 is returned",
+                "schema": {"type": "string"}
+            }
+        },
+        "responses": {
+            "TooManyRequests": {
+                "description": "Too many requests - the client's rate limit is spent or the instance is at its in-flight cap",
+                "headers": {
+                    "Retry-After": {
+                        "description": "Seconds until the request would be admitted",
+                        "schema": {"type": "integer"}
+                    }
+                },
+                "content": {
+                    "application/json": {
+                        "schema": {"$ref": "#/components/schemas/Error"}
+                    }
+                }
+            },
+            "StoreUnavailable": {
+                "description": "Service unavailable - a key-value store call timed out or the store's circuit breaker is open",
+                "headers": {
+                    "Retry-After": {
+                        "description": "Seconds to wait before retrying",
+                        "schema": {"type": "integer"}
+                    }
+                },
+                "content": {
+                    "application/json": {
+                        "schema": {"$ref": "#/components/schemas/Error"}
+                    }
+                }
+            }
+        },
+        "schemas": {
+            "Task": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string", "format": "uuid", "description": "Unique task identifier; new tasks get time-ordered UUIDv7 IDs"},
+                    "title": {"type": "string", "description": "Task title"},
+                    "description": {"type": "string", "description": "Task description"},
+                    "completed": {"type": "boolean", "description": "Task completion status"},
+                    "created_at": {"type": "string", "description": "Creation timestamp, set by the server"},
+                    "updated_at": {"type": "string", "description": "Last update timestamp, set by the server"},
+                    "version": {"type": "string", "description": "Content hash of the task, also sent as its ETag"}
+                },
+                "required": ["id", "title"]
+            },
+            "TaskInput": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string", "description": "Task title"},
+                    "description": {"type": "string", "description": "Task description"},
+                    "completed": {"type": "boolean", "description": "Task completion status", "default": False},
+                    "created_at": {"type": "string", "readOnly": True, "description": "Ignored; the server sets the creation time. Only a blind PUT of a task the instance has not cached uses it"}
+                },
+                "required": ["title"]
+            },
+            "TaskUpdate": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string", "description": "Task title"},
+                    "description": {"type": "string", "description": "Task description"},
+                    "completed": {"type": "boolean", "description": "Task completion status"},
+                    "updated_at": {"type": "string", "readOnly": True, "description": "Ignored; the server sets the update time"}
+                },
+                "minProperties": 1
+            },
+            "BatchItemResult": {
+                "type": "object",
+                "properties": {
+                    "index": {"type": "integer", "description": "Position of the item in the request"},
+                    "id": {"type": "string", "description": "Task identifier (update and delete only)"},
+                    "status": {"type": "integer", "description": "HTTP status the item would have had as a single request (update and delete only)"},
+                    "success": {"type": "boolean"},
+                    "task": {"$ref": "#/components/schemas/Task"},
+                    "error": {"type": "string", "description": "Error message when the item failed"}
+                }
+            },
+            "BatchResponse": {
+                "type": "object",
+                "properties": {
+                    "success": {"type": "boolean", "description": "True when every item succeeded"},
+                    "message": {"type": "string"},
+                    "error": {"type": "string"},
+                    "count": {"type": "integer", "description": "Number of items that succeeded"},
+                    "results": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/BatchItemResult"}
+                    }
+                }
+            },
+            "ImportResponse": {
+                "type": "object",
+                "properties": {
+                    "success": {"type": "boolean", "description": "True when every line was imported"},
+                    "read": {"type": "integer", "description": "Non-empty lines read after resume_after"},
+                    "imported": {"type": "integer"},
+                    "invalid": {"type": "integer", "description": "Lines rejected by validation"},
+                    "failed": {"type": "integer", "description": "Valid lines that could not be written"},
+                    "checkpoint": {"type": "integer", "description": "Every line up to this one was handled; resume after it"},
+                    "errors": {
+                        "type": "array",
+                        "description": "The first errors, by line number",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "line": {"type": "integer"},
+                                "error": {"type": "string"}
+                            }
+                        }
+                    }
+                }
+            },
+            "TaskStats": {
+                "type": "object",
+                "properties": {
+                    "total": {"type": "integer", "description": "Number of tasks"},
+                    "completed": {"type": "integer", "description": "Number of completed tasks"},
+                    "pending": {"type": "integer", "description": "Number of tasks not yet completed"},
+                    "reconciled_at": {"type": "string", "nullable": True, "description": "When the counters were last rebuilt from a full scan"}
+                }
+            },
+            "TaskChange": {
+                "type": "object",
+                "properties": {
+                    "position": {"type": "string", "description": "Position of the change in the log: its timestamp and a random suffix"},
+                    "id": {"type": "string", "description": "ID of the changed task"},
+                    "op": {"type": "string", "enum": ["upsert", "delete"]},
+                    "at": {"type": "string", "format": "date-time", "description": "When the change was logged"},
+                    "task": {"$ref": "#/components/schemas/Task", "description": "The new copy of the task; absent for deletions"}
+                }
+            },
+            "SearchHit": {
+                "type": "object",
+                "properties": {
+                    "score": {"type": "number", "description": "Relevance; higher is better"},
+                    "task": {"$ref": "#/components/schemas/Task"}
+                }
+            },
+            "CacheStats": {
+                "type": "object",
+                "description": "Counters for the in-process task cache of this instance",
+                "properties": {
+                    "size": {"type": "integer"},
+                    "maxsize": {"type": "integer"},
+                    "ttl_seconds": {"type": "number"},
+                    "hits": {"type": "integer"},
+                    "misses": {"type": "integer"},
+                    "evictions": {"type": "integer"},
+                    "hit_ratio": {"type": "number"}
+                }
+            },
+            "ItemError": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string", "description": "Task identifier"},
+                    "error": {"type": "string", "description": "Error message"}
+                }
+            },
+            "TaskBatchUpdate": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string", "format": "uuid", "description": "Task identifier"},
+                    "title": {"type": "string", "description": "Task title"},
+                    "description": {"type": "string", "description": "Task description"},
+                    "completed": {"type": "boolean", "description": "Task completion status"},
+                    "updated_at": {"type": "string", "readOnly": True, "description": "Ignored; the server sets the update time"}
+                },
+                "required": ["id"]
+            },
+            "TaskBatchDelete": {
+                "type": "object",
+                "properties": {
+                    "ids": {
+                        "type": "array",
+                        "minItems": 1,
+                        "maxItems": 500,
+                        "items": {"type": "string", "format": "uuid"}
+                    }
+                },
+                "required": ["ids"]
+            },
+            "StoreHealth": {
+                "type": "object",
+                "properties": {
+                    "state": {"type": "string", "enum": ["closed", "open", "half_open"]},
+                    "consecutive_failures": {"type": "integer"},
+                    "times_opened": {"type": "integer"},
+                    "retries": {"type": "integer", "description": "Reads retried after a failure or timeout"},
+                    "hedged_reads": {"type": "integer", "description": "Slow reads raced against a second attempt"}
+                }
+            },
+            "Error": {
+                "type": "object",
+                "properties": {
+                    "success": {"type": "boolean", "example": False},
+                    "error": {"type": "string", "description": "Error message"}
+                }
+            }
+        }
+    },
+    "tags": [
+        {
+            "name": "General",
+            "description": "General API endpoints"
+        },
+        {
+            "name": "Tasks",
+            "description": "Task management operations"
+        }
+    ]
+}
+
+# Request body validators, compiled once from the component schemas above
+validate_task_input = component_validator(OPENAPI_SPEC, "TaskInput")
+validate_task_update = component_validator(OPENAPI_SPEC, "TaskUpdate")
+validate_task_batch_update = component_validator(OPENAPI_SPEC, "TaskBatchUpdate")
+
+# Swagger UI page, loading the specification from /swagger.json
+SWAGGER_UI_HTML = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Nitric Python Web API - Swagger UI</title>
+    <link rel="stylesheet" type="text/css" href="https://unpkg.com/swagger-ui-dist@5.10.5/swagger-ui.css">
+    <link rel="icon" type="image/png" href="https://nitric.io/favicon.ico">
+    <style>
+        html {
+            box-sizing: border-box;
+            overflow: -moz-scrollbars-vertical;
+            overflow-y: scroll;
+        }
+        *, *:before, *:after {
+            box-sizing: inherit;
+        }
+        body {
+            margin: 0;
+            padding: 0;
+        }
+    </style>
+</head>
+<body>
+    <div id="swagger-ui"></div>
+    <script src="https://unpkg.com/swagger-ui-dist@5.10.5/swagger-ui-bundle.js"></script>
+    <script src="https://unpkg.com/swagger-ui-dist@5.10.5/swagger-ui-standalone-preset.js"></script>
+    <script>
+        window.onload = function() {
+            const ui = SwaggerUIBundle({
+                url: "/swagger.json",
+                dom_id: '#swagger-ui',
+                deepLinking: true,
+                presets: [
+                    SwaggerUIBundle.presets.apis,
+                    SwaggerUIStandalonePreset
+                ],
+                plugins: [
+                    SwaggerUIBundle.plugins.DownloadUrl
+                ],
+                layout: "StandaloneLayout"
+            });
+            window.ui = ui;
+        };
+    </script>
+</body>
+</html>
+"""
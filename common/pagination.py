@@ -0,0 +1,97 @@
+"""Opaque cursors and page collection over key-value store key scans"""
+import base64
+import json
+from typing import AsyncIterator, Optional
+
+from common.config import env_int
+
+DEFAULT_PAGE_SIZE = env_int("TASKS_DEFAULT_PAGE_SIZE", 100)
+MAX_PAGE_SIZE = env_int("TASKS_MAX_PAGE_SIZE", 1000)
+
+# Tasks per page of GET /tasks/export, by default and at most
+EXPORT_PAGE_SIZE = env_int("TASKS_EXPORT_PAGE_SIZE", 5000)
+MAX_EXPORT_PAGE_SIZE = env_int("TASKS_MAX_EXPORT_PAGE_SIZE", 20000)
+
+
+def _encode(position: dict) -> str:
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(position, dict):
+        raise ValueError("Invalid cursor")
+    return position
+
+
+def encode_cursor(offset: int) -> str:
+    """Encode a scan position as an opaque, URL-safe cursor"""
+    return _encode({"o": offset})
+
+
+def encode_key_cursor(after: str) -> str:
+    """Encode the last key of a page, for listings in key order that resume after it"""
+    return _encode({"k": after})
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is malformed"""
+    offset, after = decode_list_cursor(cursor)
+    if after is not None:
+        raise ValueError("Invalid cursor")
+    return offset
+
+
+def decode_list_cursor(cursor: Optional[str]) -> tuple[int, Optional[str]]:
+    """Decode a cursor from encode_cursor or encode_key_cursor into (offset, key to resume after)"""
+    if not cursor:
+        return 0, None
+    position = _decode(cursor)
+    if "k" in position:
+        if not isinstance(position["k"], str) or len(position) != 1:
+            raise ValueError("Invalid cursor")
+        return 0, position["k"]
+    offset = position.get("o")
+    if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+        raise ValueError("Invalid cursor")
+    return offset, None
+
+
+def parse_limit(limit: Optional[str], default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    """Parse a page size query value, raising ValueError if it is out of range"""
+    if limit is None or limit == "":
+        return default
+    try:
+        value = int(limit)
+    except ValueError:
+        raise ValueError("limit must be an integer") from None
+    if value < 1 or value > maximum:
+        raise ValueError(f"limit must be between 1 and {maximum}")
+    return value
+
+
+async def collect_page(keys: AsyncIterator[str], offset: int, limit: int) -> tuple[list[str], Optional[str]]:
+    """Read one page of keys from a key scan and return it with the next cursor.
+
+    The scan is closed as soon as the page (plus one look-ahead key) has been
+    read, so later keys are never pulled from the store.
+    """
+    page = []
+    has_more = False
+    position = 0
+    try:
+        async for key in keys:
+            if position >= offset:
+                if len(page) == limit:
+                    has_more = True
+                    break
+                page.append(key)
+            position += 1
+    finally:
+        await keys.aclose()
+    return page, encode_cursor(offset + len(page)) if has_more else None
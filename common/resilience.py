@@ -0,0 +1,289 @@
+"""Deadlines, retries, hedged reads and a circuit breaker around key-value store calls.
+
+ResilientStore wraps a TaskStore so a slow or failing backend costs a
+bounded amount of time:
+
+- every call has a deadline (TASKS_KV_TIMEOUT_MS) and raises StoreTimeout
+  when it passes; batch writes give each item its own deadline and report
+  failures per item, and key scans apply it to each chunk of keys;
+- reads, which are idempotent, are retried with exponential backoff and full
+  jitter (TASKS_KV_READ_RETRIES); writes are not, since a timed-out write may
+  still land after a newer one;
+- with TASKS_KV_HEDGE_MS set, a get still running after that long is raced
+  against a duplicate, and the first answer wins, trimming the latency tail;
+- a circuit breaker opens after TASKS_KV_BREAKER_FAILURES consecutive
+  failures and rejects calls with CircuitOpen for
+  TASKS_KV_BREAKER_RESET_SECONDS, then lets one probe call through and closes
+  again if it succeeds.
+
+Both errors are StoreUnavailable, which handlers answer with 503 and a
+Retry-After header instead of a generic 500.
+"""
+import asyncio
+import math
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from common.batch import BatchResult, run_bounded
+from common.config import (
+    KV_BREAKER_FAILURES,
+    KV_BREAKER_RESET_SECONDS,
+    KV_CONCURRENCY,
+    KV_HEDGE_MS,
+    KV_READ_RETRIES,
+    KV_RETRY_BASE_MS,
+    KV_TIMEOUT_MS,
+)
+from common.storage import TaskStore
+
+# Longest pause between two read attempts
+MAX_BACKOFF_SECONDS = 1.0
+
+# Keys a scan reads under one deadline
+SCAN_CHUNK_KEYS = 500
+
+# Every store wrapped by resilient_store, for the health check
+_stores: list["ResilientStore"] = []
+
+
+class StoreUnavailable(Exception):
+    """The store cannot serve the call now; retry after retry_after seconds"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class StoreTimeout(StoreUnavailable):
+    """A store call did not finish before its deadline"""
+
+
+class CircuitOpen(StoreUnavailable):
+    """The circuit breaker is rejecting calls to a failing store"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe"""
+
+    def __init__(self, name: str, failures: int = KV_BREAKER_FAILURES, reset_seconds: float = KV_BREAKER_RESET_SECONDS):
+        self.name = name
+        self._threshold = failures
+        self._reset = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self._opened_at >= self._reset else "open"
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpen unless a call may go through now; return True if the call is the half-open probe"""
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "half_open" and not self._probing:
+            # One call tests the store; the rest keep failing fast until it answers
+            self._probing = True
+            return True
+        remaining = self._reset - (time.monotonic() - self._opened_at) if state == "open" else 1.0
+        raise CircuitOpen(f"Key-value store '{self.name}' is unavailable", retry_after=max(remaining, 1.0))
+
+    def succeeded(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def probe_ended(self) -> None:
+        """Let another probe through after one that ended without an answer, e.g. by being cancelled"""
+        self._probing = False
+
+    def failed(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self._threshold:
+            if self._opened_at is None or self._probing:
+                self.opened += 1
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+    def stats(self) -> dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self._failures, "times_opened": self.opened}
+
+
+class ResilientStore(TaskStore):
+    """Wraps a TaskStore with deadlines, read retries, hedged gets and a circuit breaker"""
+
+    def __init__(
+        self,
+        store: TaskStore,
+        timeout_ms: float = KV_TIMEOUT_MS,
+        read_retries: int = KV_READ_RETRIES,
+        retry_base_ms: float = KV_RETRY_BASE_MS,
+        hedge_ms: float = KV_HEDGE_MS,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self._store = store
+        self.name = store.name
+        self._timeout = timeout_ms / 1000
+        self._retries = read_retries
+        self._retry_base = retry_base_ms / 1000
+        self._hedge = hedge_ms / 1000
+        self.breaker = breaker or CircuitBreaker(store.name)
+        self.retries = 0
+        self.hedges = 0
+
+    @asynccontextmanager
+    async def _attempt(self, timeout: Optional[float] = None):
+        """Run the block through the breaker and under the deadline"""
+        probe = self.breaker.before_call()
+        timeout = timeout or self._timeout
+        try:
+            async with asyncio.timeout(timeout):
+                yield
+        except TimeoutError:
+            self.breaker.failed()
+            raise StoreTimeout(f"Key-value store '{self.name}' did not answer within {timeout * 1000:.0f}ms") from None
+        except Exception:
+            self.breaker.failed()
+            raise
+        else:
+            self.breaker.succeeded()
+        finally:
+            # A cancelled probe records neither outcome, and must not keep the breaker from probing again
+            if probe:
+                self.breaker.probe_ended()
+
+    async def _call(self, make_call: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Run one attempt through the breaker and under the deadline"""
+        async with self._attempt(timeout):
+            return await make_call()
+
+    async def _read(self, make_call: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Run a read, retrying failures with jittered exponential backoff"""
+        attempt = 0
+        while True:
+            try:
+                return await self._call(make_call, timeout)
+            except CircuitOpen:
+                raise
+            except Exception:
+                if attempt >= self._retries:
+                    raise
+            self.retries += 1
+            await asyncio.sleep(random.uniform(0, min(MAX_BACKOFF_SECONDS, self._retry_base * 2 ** attempt)))
+            attempt += 1
+
+    async def _hedged_get(self, key: str) -> Optional[dict[str, Any]]:
+        first = asyncio.ensure_future(self._store.get(key))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self._hedge)
+            if done:
+                return first.result()
+            self.hedges += 1
+            pending.add(asyncio.ensure_future(self._store.get(key)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        return attempt.result()
+            # Both failed; report the first one's error
+            return first.result()
+        finally:
+            for attempt in pending:
+                attempt.cancel()
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        if self._hedge > 0:
+            return await self._read(lambda: self._hedged_get(key))
+        return await self._read(lambda: self._store.get(key))
+
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        await self._call(lambda: self._store.set(key, value))
+
+    async def delete(self, key: str) -> None:
+        await self._call(lambda: self._store.delete(key))
+
+    async def keys(self, prefix: str = "") -> AsyncIterator[str]:
+        scan = self._store.keys(prefix)
+        try:
+            finished = False
+            while not finished:
+                chunk = []
+                # The deadline applies to each chunk of the scan, not to every key or to the whole of it
+                async with self._attempt():
+                    async for key in scan:
+                        chunk.append(key)
+                        if len(chunk) >= SCAN_CHUNK_KEYS:
+                            break
+                    else:
+                        finished = True
+                for key in chunk:
+                    yield key
+        finally:
+            await scan.aclose()
+
+    def _batch_timeout(self, items: int, concurrency: Optional[int]) -> float:
+        # A batch runs in waves of `concurrency` calls, each of which gets the full deadline
+        return self._timeout * max(1, math.ceil(items / (concurrency or KV_CONCURRENCY)))
+
+    async def get_many(self, keys: Iterable[str], concurrency: Optional[int] = None) -> BatchResult:
+        keys = list(keys)
+        try:
+            batch = await self._call(
+                lambda: self._store.get_many(keys, concurrency), self._batch_timeout(len(keys), concurrency)
+            )
+        except CircuitOpen:
+            raise
+        except Exception:
+            # Fall back to single gets, which have their own retries
+            return await run_bounded(keys, self.get, concurrency)
+        for index in list(batch.errors):
+            try:
+                batch.results[index] = await self.get(keys[index])
+                del batch.errors[index]
+            except Exception as e:
+                batch.errors[index] = e
+        return batch
+
+    async def set_many(self, items: Iterable[tuple[str, dict[str, Any]]], concurrency: Optional[int] = None) -> BatchResult:
+        # Writes are not retried, so one deadline over the batch would fail items that were written;
+        # each item gets its own deadline and its own entry in the errors instead
+        return await run_bounded(items, lambda item: self.set(*item), concurrency)
+
+    def stats(self) -> dict[str, Any]:
+        return {**self.breaker.stats(), "retries": self.retries, "hedged_reads": self.hedges}
+
+
+def resilient_store(store: TaskStore) -> ResilientStore:
+    """Wrap a store with the deadlines, retries, hedging and circuit breaker configured for this service"""
+    wrapped = ResilientStore(store)
+    _stores.append(wrapped)
+    return wrapped
+
+
+def store_health() -> dict[str, dict[str, Any]]:
+    """Breaker state and retry counts of every wrapped store, by store name"""
+    return {store.name: store.stats() for store in _stores}
+
+
+def resilience_metrics():
+    """Expose breaker states, retries and hedged reads on /metrics"""
+    stores = list(_stores)
+    yield "# HELP kv_circuit_breaker_open Whether a store's circuit breaker is rejecting calls (1) or not (0)"
+    yield "# TYPE kv_circuit_breaker_open gauge"
+    for store in stores:
+        yield f'kv_circuit_breaker_open{{store="{store.name}"}} {int(store.breaker.state == "open")}'
+    yield "# HELP kv_read_retries_total Key-value reads retried after a failure or timeout"
+    yield "# TYPE kv_read_retries_total counter"
+    for store in stores:
+        yield f'kv_read_retries_total{{store="{store.name}"}} {store.retries}'
+    yield "# HELP kv_hedged_reads_total Key-value reads raced against a second attempt"
+    yield "# TYPE kv_hedged_reads_total counter"
+    for store in stores:
+        yield f'kv_hedged_reads_total{{store="{store.name}"}} {store.hedges}'
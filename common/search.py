@@ -0,0 +1,151 @@
+"""Full-text search over task titles and descriptions.
+
+The index lives in its own key-value store as one key per posting:
+`<token>:<weight>:<task id>`, with an empty value. Every posting of a token
+shares the `<token>:` prefix, so a search lists the keys of its query tokens
+and nothing else, and ranks from the weights in the keys without reading
+their values. Like the other key indexes (see common/indexes.py), it is
+updated by every write, prunes the stale postings blind writes leave behind
+as searches find them, and is rebuilt from a full scan with
+`python -m common.admin rebuild-search`.
+"""
+import asyncio
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from common.config import env_int
+from common.indexes import KeyIndex
+from common.models import Task
+from common.pagination import encode_cursor
+from common.storage import TaskStore
+
+# Name of the key-value store holding the postings
+SEARCH_STORE = "task-search"
+
+# Most distinct tokens indexed per task, keeping the heaviest; bounds the writes per task
+MAX_TERMS = env_int("TASKS_SEARCH_MAX_TERMS", 100)
+
+# Most distinct tokens used from a query
+MAX_QUERY_TERMS = 8
+
+# A token in the title counts this many times one in the description
+TITLE_WEIGHT = 3
+
+# Tokens shorter than this are not indexed; longer than MAX_TOKEN_LENGTH are cut
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 64
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: Any) -> list[str]:
+    """Split text into lower-case word tokens, in order, with repeats"""
+    if not isinstance(text, str):
+        return []
+    return [word[:MAX_TOKEN_LENGTH] for word in _WORD.findall(text.casefold()) if len(word) >= MIN_TOKEN_LENGTH]
+
+
+def task_terms(task: Task) -> dict[str, int]:
+    """Weight of each token in a task: occurrences in the description plus TITLE_WEIGHT per title occurrence"""
+    weights: dict[str, int] = {}
+    for token in tokenize(task.title):
+        weights[token] = weights.get(token, 0) + TITLE_WEIGHT
+    for token in tokenize(task.description):
+        weights[token] = weights.get(token, 0) + 1
+    if len(weights) > MAX_TERMS:
+        kept = sorted(weights.items(), key=lambda item: (-item[1], item[0]))[:MAX_TERMS]
+        weights = dict(kept)
+    return weights
+
+
+def _parse_posting(key: str) -> tuple[str, int, str]:
+    token, weight, task_id = key.split(":", 2)
+    return token, int(weight), task_id
+
+
+@dataclass
+class SearchPage:
+    """One page of ranked search results"""
+
+    # (task, score) pairs, best first
+    hits: list = field(default_factory=list)
+    # Tasks whose postings matched but which could not be read
+    errors: list = field(default_factory=list)
+    # Tasks matching every query token, before pagination
+    matches: int = 0
+    next_cursor: Optional[str] = None
+
+
+class SearchIndex(KeyIndex):
+    """An inverted index from tokens to task IDs, updated as tasks are written"""
+
+    name = "search"
+
+    def task_keys(self, task: Optional[Task]) -> set[str]:
+        if task is None:
+            return set()
+        return {f"{token}:{weight}:{task.id}" for token, weight in task_terms(task).items()}
+
+    async def _postings(self, token: str) -> dict[str, list[tuple[int, str]]]:
+        """Task ID to (weight, key) of every posting of a token"""
+        postings: dict[str, list[tuple[int, str]]] = {}
+        for key in await self.scan(token + ":"):
+            _, weight, task_id = _parse_posting(key)
+            postings.setdefault(task_id, []).append((weight, key))
+        return postings
+
+    async def search(self, tasks: TaskStore, query: str, offset: int, limit: int, total: int = 0) -> SearchPage:
+        """Rank the tasks containing every token of query and read one page of them.
+
+        Scores add up, over the query tokens, each token's weight in the task
+        times its inverse document frequency among `total` tasks, so rare
+        words count for more. Only the postings of the query tokens and the
+        tasks on the page are read.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        page = SearchPage()
+        if not terms:
+            return page
+
+        postings = await asyncio.gather(*(self._postings(term) for term in terms))
+        # Intersect from the rarest token, so the candidate set only shrinks
+        order = sorted(range(len(terms)), key=lambda index: len(postings[index]))
+        candidates = set(postings[order[0]])
+        for index in order[1:]:
+            candidates &= postings[index].keys()
+
+        documents = max(total, max(len(found) for found in postings), 1)
+        idf = [math.log(1 + documents / max(len(found), 1)) for found in postings]
+        scores = {
+            task_id: sum(
+                # A blind write can leave an old posting beside the new one; trust the heavier until pruned
+                max(weight for weight, _ in found[task_id]) * idf[index]
+                for index, found in enumerate(postings)
+            )
+            for task_id in candidates
+        }
+        ranked = sorted(candidates, key=lambda task_id: (-scores[task_id], task_id))
+        page.matches = len(ranked)
+        selected = ranked[offset:offset + limit]
+        if offset + limit < len(ranked):
+            page.next_cursor = encode_cursor(offset + limit)
+
+        batch = await tasks.get_many(selected)
+        stale: set[str] = set()
+        for index, task_id in enumerate(selected):
+            matched = {key for found in postings for _, key in found[task_id]}
+            error = batch.errors.get(index)
+            if error is not None:
+                page.errors.append({"id": task_id, "error": str(error)})
+                continue
+            record = batch.results[index]
+            task = Task.from_record(task_id, record) if record else None
+            current = self.task_keys(task)
+            stale |= matched - current
+            # Drop tasks that no longer contain every token, or were deleted
+            if task is not None and len(matched & current) == len(terms):
+                page.hits.append((task, round(scores[task_id], 4)))
+        await self.prune(stale)
+        return page
@@ -0,0 +1,73 @@
+"""Coalescing of concurrent identical reads within one process.
+
+When several requests in the same container ask for the same key at once,
+only the first (the leader) calls the store; the others await its result.
+Writes fence a key once their store call has finished: the read in flight is
+detached, so later callers start a fresh read, and its result is not used to
+refill caches since it may predate the write. Callers that joined the read
+before the fence still get its result, which is fine since their read
+overlapped the write.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class _Flight:
+    __slots__ = ("task", "fenced")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.fenced = False
+
+
+class SingleFlight:
+    """Shares one in-flight call per key between concurrent callers"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable[Any]],
+        on_result: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """Return the result of call(), sharing it with concurrent callers for the same key.
+
+        on_result runs once per call, with the leader's result, unless a write
+        fenced the key while the call was in flight.
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.shared += 1
+            return await asyncio.shield(flight.task)
+
+        self.leaders += 1
+        # A task of its own, so a cancelled leader does not cancel the read its followers await
+        flight = self._flights[key] = _Flight(asyncio.ensure_future(call()))
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if on_result is not None and not flight.fenced:
+            on_result(result)
+        return result
+
+    def fence(self, key: Hashable) -> None:
+        """Detach the read in flight for key, after a write to it has completed"""
+        flight = self._flights.pop(key, None)
+        if flight is not None:
+            flight.fenced = True
+
+    def fence_all(self) -> None:
+        """Detach every read in flight"""
+        for flight in self._flights.values():
+            flight.fenced = True
+        self._flights.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {"in_flight": len(self._flights), "leaders": self.leaders, "shared": self.shared}
@@ -0,0 +1,195 @@
+"""A materialised copy of the whole task list, split over a few KV documents.
+
+With TASKS_LIST_SNAPSHOT_SHARDS set, every task is also kept in one of that
+many shard documents of its own key-value store, chosen by a hash of its ID,
+and a meta document records how the snapshot was built. Unfiltered GET /tasks
+then reads the meta and every shard in one batch, so a listing costs
+shards + 1 reads however many tasks there are, instead of a key scan plus a
+read per task.
+
+Writes apply each change to its shard by ID, so unlike the indexes a blind
+write needs no previous copy. Changes go through a GroupCommit per shard,
+and writes from different instances can still race: one
+can overwrite a shard with a copy that lacks the other's change, and nothing
+records it. A snapshot is therefore only served for
+TASKS_LIST_SNAPSHOT_MAX_AGE_SECONDS after the rebuild that produced it, and
+the API service rebuilds it on a schedule at half that interval, so a lost
+update is repaired by the next rebuild and never served for longer than the
+maximum age. A shard write that fails marks the snapshot stale; a stale,
+expired, missing or differently sharded snapshot is ignored and the list
+falls back to the key scan until the next rebuild, or until
+`python -m common.admin rebuild-list-snapshot` regenerates it.
+Each shard is a single KV item (at most 400 KB on DynamoDB), so size the
+shard count to the data.
+"""
+import asyncio
+import logging
+import time
+import zlib
+from typing import Any, Iterable, Optional
+
+from common import clock
+from common.config import env_int
+from common.groupcommit import GroupCommit
+from common.models import Task
+from common.pagination import encode_key_cursor
+from common.storage import TaskStore, scan_items
+
+# Name of the key-value store holding the snapshot
+SNAPSHOT_STORE = "task-list-snapshot"
+
+# Key of the document describing the snapshot
+META_KEY = "meta"
+
+# Number of shard documents; 0 disables the snapshot
+SHARDS = env_int("TASKS_LIST_SNAPSHOT_SHARDS", 0, minimum=0)
+
+# Seconds a snapshot is served after its rebuild started; it is rebuilt every half of this
+MAX_AGE_SECONDS = env_int("TASKS_LIST_SNAPSHOT_MAX_AGE_SECONDS", 1200, minimum=120)
+
+logger = logging.getLogger("tasks.snapshot")
+
+
+def _shard_key(shard: int) -> str:
+    return f"shard-{shard}"
+
+
+class ListSnapshot:
+    """The task list kept in `shards` documents, updated as tasks are written"""
+
+    def __init__(self, store: TaskStore, shards: int = SHARDS, max_age_seconds: int = MAX_AGE_SECONDS):
+        self._store = store
+        self.shards = shards
+        self.max_age_seconds = max_age_seconds
+        # Changes to a shard map task IDs to their new records, or None for a deletion
+        self._commits: GroupCommit[dict[str, Optional[dict[str, Any]]]] = GroupCommit(
+            self._write, lambda first, second: {**first, **second}
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.shards > 0
+
+    def expired(self, meta: dict[str, Any]) -> bool:
+        """Whether a snapshot is too old to serve, however many updates it has received since"""
+        oldest = clock.format_timestamp(time.time_ns() // 1000 - self.max_age_seconds * 1_000_000)
+        # Older built_at values (`...T12:00:00+00:00`) still compare in time order to the second
+        return (meta.get("built_at") or "") < oldest
+
+    def shard_of(self, task_id: str) -> int:
+        return zlib.crc32(task_id.encode("utf-8")) % self.shards
+
+    async def apply(self, changes: Iterable[tuple[str, Optional[Task]]]) -> None:
+        """Apply (task ID, current copy) changes; a current copy of None is a deletion.
+
+        Failures mark the snapshot stale rather than raising.
+        """
+        if not self.enabled:
+            return
+        updates: dict[int, dict[str, Optional[dict[str, Any]]]] = {}
+        for task_id, current in changes:
+            updates.setdefault(self.shard_of(task_id), {})[task_id] = current.to_record() if current is not None else None
+        await asyncio.gather(*(self._commits.commit(shard, shard_updates) for shard, shard_updates in updates.items()))
+
+    async def _write(self, shard: int, updates: dict[str, Optional[dict[str, Any]]]) -> None:
+        try:
+            document = await self._store.get(_shard_key(shard))
+            if document is None:
+                # Not built yet; the rebuild will pick these tasks up from the store
+                return
+            tasks = document["tasks"]
+            for task_id, record in updates.items():
+                if record is None:
+                    tasks.pop(task_id, None)
+                else:
+                    tasks[task_id] = record
+            await self._store.set(_shard_key(shard), document)
+        except Exception as e:
+            logger.warning("Failed to update list snapshot shard %d: %s", shard, e)
+            await self._mark_stale(f"Shard {shard} update failed: {e}")
+
+    async def _mark_stale(self, reason: str) -> None:
+        try:
+            meta = await self._store.get(META_KEY)
+            if meta is not None:
+                meta.update(stale=True, stale_reason=reason)
+                await self._store.set(META_KEY, meta)
+        except Exception as e:
+            logger.warning("Failed to mark the list snapshot stale: %s", e)
+
+    async def read_page(self, after: Optional[str], limit: int) -> Optional[tuple[list[Task], Optional[str]]]:
+        """Return one page of tasks in ID order after the ID after, and the next cursor, or None when the snapshot cannot be used.
+
+        The cursor is the last ID of the page, so pages stay in step across
+        writes and rebuilds, which keep the same order.
+        """
+        if not self.enabled:
+            return None
+        keys = [META_KEY] + [_shard_key(shard) for shard in range(self.shards)]
+        batch = await self._store.get_many(keys)
+        meta, documents = batch.results[0], batch.results[1:]
+        if batch.errors or not meta or meta.get("stale") or meta.get("shards") != self.shards or self.expired(meta):
+            return None
+        if any(document is None for document in documents):
+            return None
+        records = {}
+        for document in documents:
+            records.update(document["tasks"])
+        ids = sorted(task_id for task_id in records if after is None or task_id > after)
+        page = [Task.from_record(task_id, records[task_id]) for task_id in ids[:limit]]
+        return page, encode_key_cursor(page[-1].id) if len(ids) > limit else None
+
+    async def status(self) -> dict[str, Any]:
+        """Describe the stored snapshot"""
+        meta = await self._store.get(META_KEY) or {}
+        return {
+            "enabled": self.enabled,
+            "shards": meta.get("shards"),
+            "built_at": meta.get("built_at"),
+            "stale": bool(meta.get("stale")),
+            "stale_reason": meta.get("stale_reason"),
+            "expired": bool(meta) and self.expired(meta),
+        }
+
+    async def rebuild(self, tasks: TaskStore) -> dict[str, Any]:
+        """Regenerate every shard from a full scan of the tasks store.
+
+        Writes made while the scan runs may be missed, so the snapshot's age
+        counts from the start of the scan and the next rebuild picks them up.
+        """
+        if not self.enabled:
+            raise ValueError("The list snapshot is disabled; set TASKS_LIST_SNAPSHOT_SHARDS")
+        built_at = clock.now()
+        shards: list[dict[str, Any]] = [{} for _ in range(self.shards)]
+        async for task_id, record in scan_items(tasks):
+            shards[self.shard_of(task_id)][task_id] = record
+
+        async def write(shard: int) -> None:
+            # Held so that no update read before the rebuild writes its older copy over this one
+            async with self._commits.lock(shard):
+                # Changes queued meanwhile are full copies, at least as new as the scan's
+                for task_id, record in (self._commits.discard(shard) or {}).items():
+                    if record is None:
+                        shards[shard].pop(task_id, None)
+                    else:
+                        shards[shard][task_id] = record
+                await self._store.set(_shard_key(shard), {"tasks": shards[shard]})
+
+        await asyncio.gather(*(write(shard) for shard in range(self.shards)))
+        count = sum(len(records) for records in shards)
+        await self._store.set(META_KEY, {
+            "shards": self.shards,
+            "tasks": count,
+            "built_at": built_at,
+            "stale": False,
+        })
+        return {"tasks": count, "shards": self.shards,
+                "largest_shard": max(len(records) for records in shards)}
+
+    async def refresh(self, tasks: TaskStore) -> None:
+        """Rebuild on schedule, logging failures: the current snapshot then expires and the list falls back to the scan"""
+        try:
+            report = await self.rebuild(tasks)
+            logger.info("Rebuilt the list snapshot: %s", report)
+        except Exception as e:
+            logger.warning("Failed to rebuild the list snapshot: %s", e)
@@ -0,0 +1,46 @@
+"""Cold-start timing: how long a service spends importing and registering before it serves.
+
+Import this module before anything else in a service so the clock starts as
+early as possible, then call mark() at the end of each startup phase. The
+report breaks the time down by phase and is logged once when the service
+hands over to Nitric (set TASKS_STARTUP_LOG=0 to disable).
+"""
+import json
+import logging
+import os
+import sys
+import time
+
+_started = time.perf_counter()
+_last = _started
+_phases: dict[str, float] = {}
+
+
+def mark(phase: str) -> None:
+    """Record that a startup phase has finished, timing it from the previous mark"""
+    global _last
+    now = time.perf_counter()
+    _phases[phase] = _phases.get(phase, 0.0) + (now - _last)
+    _last = now
+
+
+def report() -> dict:
+    """Return the startup phases and their total, in milliseconds"""
+    return {
+        "phases_ms": {phase: round(seconds * 1000, 3) for phase, seconds in _phases.items()},
+        "total_ms": round((_last - _started) * 1000, 3),
+    }
+
+
+def log_report() -> None:
+    """Write the startup report as one JSON log line, unless TASKS_STARTUP_LOG=0"""
+    if os.environ.get("TASKS_STARTUP_LOG", "1").strip() == "0":
+        return
+    logger = logging.getLogger("tasks.startup")
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    logger.info(json.dumps({"event": "startup", **report()}, separators=(",", ":")))
@@ -0,0 +1,99 @@
+"""Task counters kept in their own key-value store, so reading them costs one get.
+
+Writes report each change to TaskStats, which folds it into the counter
+record through a GroupCommit. Changes from different instances can still
+race, so `reconcile` rebuilds the counters from a full scan of the tasks
+store to correct any drift; run it with `python -m common.admin reconcile-stats`.
+"""
+from typing import Any, Hashable, Iterable, Optional
+
+from common import clock
+from common.groupcommit import GroupCommit
+from common.models import Task
+from common.storage import TaskStore, scan_items
+
+# Name of the key-value store holding the counters
+STATS_STORE = "task-stats"
+
+# Key of the single counter record
+COUNTS_KEY = "counts"
+
+
+def _count(record: dict[str, Any], name: str) -> int:
+    # The Nitric KV store keeps values as protobuf Structs, which return every number as a float
+    return int(record.get(name, 0))
+
+
+def _completed(task: Optional[Task]) -> int:
+    return 1 if task is not None and task.get("completed") is True else 0
+
+
+class TaskStats:
+    """Total and completed task counters, updated as tasks are written"""
+
+    def __init__(self, store: TaskStore):
+        self._store = store
+        # Changes are (total, completed) deltas
+        self._commits: GroupCommit[tuple[int, int]] = GroupCommit(
+            self._write, lambda first, second: (first[0] + second[0], first[1] + second[1])
+        )
+
+    async def read(self) -> dict[str, Any]:
+        """Return the current counters"""
+        record = await self._store.get(COUNTS_KEY) or {}
+        total = _count(record, "total")
+        completed = _count(record, "completed")
+        return {
+            "total": total,
+            "completed": completed,
+            "pending": total - completed,
+            "reconciled_at": record.get("reconciled_at"),
+        }
+
+    async def record(self, previous: Optional[Task], current: Optional[Task]) -> None:
+        """Count a task being created (no previous), updated or deleted (no current)"""
+        await self.record_many([(previous, current)])
+
+    async def record_many(self, changes: Iterable[tuple[Optional[Task], Optional[Task]]]) -> None:
+        """Count several (previous, current) changes with one counter update"""
+        total = completed = 0
+        for previous, current in changes:
+            total += (current is not None) - (previous is not None)
+            completed += _completed(current) - _completed(previous)
+        if total or completed:
+            await self.adjust(total, completed)
+
+    async def adjust(self, total: int = 0, completed: int = 0) -> None:
+        """Add deltas to the counters.
+
+        A failed write keeps its deltas queued for the next one and is not raised.
+        """
+        await self._commits.commit(COUNTS_KEY, (total, completed))
+
+    async def _write(self, key: Hashable, deltas: tuple[int, int]) -> None:
+        total, completed = deltas
+        if not total and not completed:
+            # The queued changes cancelled out
+            return
+        try:
+            record = await self._store.get(key) or {}
+            record["total"] = _count(record, "total") + total
+            record["completed"] = _count(record, "completed") + completed
+            await self._store.set(key, record)
+        except Exception:
+            self._commits.add(key, deltas)
+
+    async def reconcile(self, tasks: TaskStore) -> dict[str, Any]:
+        """Recount every task in the tasks store and overwrite the counters"""
+        total = completed = 0
+        async for task_id, record in scan_items(tasks):
+            total += 1
+            completed += _completed(Task.from_record(task_id, record))
+        async with self._commits.lock(COUNTS_KEY):
+            self._commits.discard(COUNTS_KEY)
+            await self._store.set(COUNTS_KEY, {
+                "total": total,
+                "completed": completed,
+                "reconciled_at": clock.now(),
+            })
+        return await self.read()
@@ -0,0 +1,308 @@
+"""Task storage backends behind a common key-value repository interface.
+
+Handlers talk to a TaskStore rather than to Nitric directly, so the same code
+runs against the deployed Nitric KV store, an in-process dict or a local
+SQLite file. The backend is chosen with TASKS_STORE_BACKEND.
+"""
+import asyncio
+import copy
+import json
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterable, Optional, Union
+
+from common.batch import BatchResult, aiterate, run_bounded
+from common.config import SQLITE_PATH, STORE_BACKEND
+
+if TYPE_CHECKING:
+    import sqlite3
+
+BACKENDS = ("nitric", "memory", "sqlite")
+
+
+class TaskStore(ABC):
+    """A named key-value store holding JSON-compatible dict values"""
+
+    name: str
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Return the value stored under key, or None if the key does not exist"""
+
+    @abstractmethod
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        """Store value under key, replacing any existing value"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Delete key; deleting a missing key is not an error"""
+
+    @abstractmethod
+    def keys(self, prefix: str = "") -> AsyncIterator[str]:
+        """Iterate over the keys starting with prefix"""
+
+    async def get_many(self, keys: Iterable[str], concurrency: Optional[int] = None) -> BatchResult:
+        """Fetch many keys, in key order; missing keys yield None"""
+        return await run_bounded(keys, self.get, concurrency)
+
+    async def set_many(self, items: Iterable[tuple[str, dict[str, Any]]], concurrency: Optional[int] = None) -> BatchResult:
+        """Store many (key, value) pairs, reporting failures per item"""
+        return await run_bounded(items, lambda item: self.set(*item), concurrency)
+
+
+class NitricKVStore(TaskStore):
+    """The deployed Nitric key-value store"""
+
+    def __init__(self, name: str, *permissions: str):
+        # Imported here so the local backends run without a Nitric server
+        from nitric.exception import NotFoundException
+        from nitric.resources import kv
+
+        self.name = name
+        self._not_found = NotFoundException
+        self._ref = kv(name).allow(*(permissions or ("get", "set", "delete")))
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        try:
+            return await self._ref.get(key) or None
+        except self._not_found:
+            return None
+
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        await self._ref.set(key, value)
+
+    async def delete(self, key: str) -> None:
+        await self._ref.delete(key)
+
+    async def keys(self, prefix: str = "") -> AsyncIterator[str]:
+        scan = self._ref.keys(prefix)
+        try:
+            async for key in scan:
+                yield key
+        finally:
+            await scan.aclose()
+
+
+class MemoryStore(TaskStore):
+    """An in-process dict, for local development and benchmarks.
+
+    Values are copied on the way in and out so callers cannot mutate stored
+    state, matching the by-value semantics of a remote store.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._data: dict[str, dict[str, Any]] = {}
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        value = self._data.get(key)
+        return copy.deepcopy(value) if value is not None else None
+
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        self._data[key] = copy.deepcopy(value)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def keys(self, prefix: str = "") -> AsyncIterator[str]:
+        # Snapshot the keys so writes during the scan do not break iteration
+        for key in list(self._data):
+            if key.startswith(prefix):
+                yield key
+
+    async def get_many(self, keys: Iterable[str], concurrency: Optional[int] = None) -> BatchResult:
+        return BatchResult(results=[await self.get(key) for key in keys])
+
+    async def set_many(self, items: Iterable[tuple[str, dict[str, Any]]], concurrency: Optional[int] = None) -> BatchResult:
+        items = list(items)
+        for key, value in items:
+            await self.set(key, value)
+        return BatchResult(results=[None] * len(items))
+
+
+class SQLiteStore(TaskStore):
+    """A table in a local SQLite database, for local runs that keep data between restarts"""
+
+    # Keys fetched per query while scanning, and keys per IN (...) lookup
+    SCAN_CHUNK = 500
+
+    _connections: dict[str, "sqlite3.Connection"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, name: str, path: str = SQLITE_PATH):
+        self.name = name
+        self._db = self._connect(path)
+
+    @classmethod
+    def _connect(cls, path: str) -> "sqlite3.Connection":
+        # Imported here so deployed services, which never use SQLite, do not load it
+        import sqlite3
+
+        # One connection per database file, shared by every store in the process
+        with cls._lock:
+            db = cls._connections.get(path)
+            if db is None:
+                db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS kv ("
+                    " store TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                    " PRIMARY KEY (store, key)) WITHOUT ROWID"
+                )
+                cls._connections[path] = db
+            return db
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        row = self._db.execute("SELECT value FROM kv WHERE store = ? AND key = ?", (self.name, key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO kv (store, key, value) VALUES (?, ?, ?)",
+            (self.name, key, json.dumps(value, separators=(",", ":"))),
+        )
+
+    async def delete(self, key: str) -> None:
+        self._db.execute("DELETE FROM kv WHERE store = ? AND key = ?", (self.name, key))
+
+    async def keys(self, prefix: str = "") -> AsyncIterator[str]:
+        # Keyset pagination keeps each query short and tolerates concurrent writes
+        last = prefix
+        inclusive = True
+        while True:
+            rows = self._db.execute(
+                f"SELECT key FROM kv WHERE store = ? AND key {'>=' if inclusive else '>'} ? ORDER BY key LIMIT ?",
+                (self.name, last, self.SCAN_CHUNK),
+            ).fetchall()
+            for (key,) in rows:
+                if not key.startswith(prefix):
+                    return
+                yield key
+            if len(rows) < self.SCAN_CHUNK:
+                return
+            last, inclusive = rows[-1][0], False
+
+    async def get_many(self, keys: Iterable[str], concurrency: Optional[int] = None) -> BatchResult:
+        keys = list(keys)
+        found: dict[str, dict[str, Any]] = {}
+        for start in range(0, len(keys), self.SCAN_CHUNK):
+            chunk = keys[start:start + self.SCAN_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._db.execute(
+                f"SELECT key, value FROM kv WHERE store = ? AND key IN ({placeholders})",
+                (self.name, *chunk),
+            )
+            found.update((key, json.loads(value)) for key, value in rows)
+        return BatchResult(results=[found.get(key) for key in keys])
+
+    async def set_many(self, items: Iterable[tuple[str, dict[str, Any]]], concurrency: Optional[int] = None) -> BatchResult:
+        rows = [(self.name, key, json.dumps(value, separators=(",", ":"))) for key, value in items]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany("INSERT OR REPLACE INTO kv (store, key, value) VALUES (?, ?, ?)", rows)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return BatchResult(results=[None] * len(rows))
+
+
+_memory_stores: dict[str, MemoryStore] = {}
+
+
+async def read_items(
+    store: TaskStore,
+    keys: Union[Iterable[str], AsyncIterator[str]],
+    chunk: int = 500,
+) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """Iterate over (key, value) pairs for keys, reading values in chunks with get_many.
+
+    The gets for the next chunk are already in flight while the current one
+    is consumed, and at most two chunks are held at a time, so memory stays
+    flat for any number of keys. Keys deleted before their read are skipped;
+    a failed read raises instead of silently dropping the item.
+    """
+
+    async def fetch(chunk_keys: list[str]) -> list[tuple[str, dict[str, Any]]]:
+        batch = await store.get_many(chunk_keys)
+        if batch.errors:
+            index, error = next(iter(batch.errors.items()))
+            raise RuntimeError(f"Failed to read '{chunk_keys[index]}': {error}") from error
+        return [(key, value) for key, value in zip(chunk_keys, batch.results) if value]
+
+    pending: Optional[asyncio.Task] = None
+    buffer: list[str] = []
+    stream = aiterate(keys)
+    try:
+        async for key in stream:
+            buffer.append(key)
+            if len(buffer) < chunk:
+                continue
+            # Start this chunk's gets, then hand out the previous chunk while they run
+            previous, pending = pending, asyncio.ensure_future(fetch(buffer))
+            buffer = []
+            if previous is not None:
+                for item in await previous:
+                    yield item
+        previous, pending = pending, asyncio.ensure_future(fetch(buffer)) if buffer else None
+        for fetched in (previous, pending):
+            if fetched is not None:
+                for item in await fetched:
+                    yield item
+        pending = None
+    finally:
+        # The consumer stopped early or a read failed: drop the prefetch and end the scan
+        if pending is not None and not pending.done():
+            pending.cancel()
+        elif pending is not None and not pending.cancelled():
+            # Mark a failed prefetch as handled; nobody will read its result
+            pending.exception()
+        await stream.aclose()
+        if hasattr(keys, "aclose"):
+            await keys.aclose()
+
+
+async def scan_keys(store: TaskStore, prefix: str = "") -> list[str]:
+    """List every key starting with prefix"""
+    found = []
+    keys = store.keys(prefix)
+    try:
+        async for key in keys:
+            found.append(key)
+    finally:
+        await keys.aclose()
+    return found
+
+
+def common_prefix(first: str, second: str) -> str:
+    """The longest prefix of both strings, which every key between them also starts with"""
+    length = 0
+    for a, b in zip(first, second):
+        if a != b:
+            break
+        length += 1
+    return first[:length]
+
+
+def scan_items(store: TaskStore, prefix: str = "", chunk: int = 500) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """Iterate over every (key, value) pair whose key starts with prefix; see read_items"""
+    return read_items(store, store.keys(prefix), chunk)
+
+
+def open_store(name: str, *permissions: str, backend: Optional[str] = None) -> TaskStore:
+    """Open the named store on the configured backend.
+
+    Permissions only apply to the Nitric backend, where they declare the
+    access this service needs. Memory stores are shared per name within the
+    process, so every caller sees the same data.
+    """
+    backend = (backend or STORE_BACKEND).lower()
+    if backend == "nitric":
+        return NitricKVStore(name, *permissions)
+    if backend == "memory":
+        return _memory_stores.setdefault(name, MemoryStore(name))
+    if backend == "sqlite":
+        return SQLiteStore(name)
+    raise ValueError(f"Unknown TASKS_STORE_BACKEND '{backend}', expected one of: {', '.join(BACKENDS)}")
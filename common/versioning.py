@@ -0,0 +1,28 @@
+"""Content versions for stored tasks and the ETags derived from them"""
+import hashlib
+import json
+from typing import Iterable, Optional
+
+
+def content_version(task: dict) -> str:
+    """Hash a task's fields, excluding its version, into a short stable string"""
+    fields = {key: value for key, value in task.items() if key != "version"}
+    raw = json.dumps(fields, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+
+def list_etag(entries: Iterable[tuple[str, str]], salt: Optional[str] = None) -> str:
+    """Return a strong ETag for a list of (task ID, version) pairs.
+
+    `salt` folds in anything else that changes the representation, such as
+    the next page cursor.
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    for task_id, version in entries:
+        digest.update(task_id.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(version.encode("utf-8"))
+        digest.update(b"\n")
+    if salt:
+        digest.update(salt.encode("utf-8"))
+    return f'"{digest.hexdigest()}"'
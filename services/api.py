@@ -1,390 +1,261 @@
-from nitric.resources import api, kv
+# Imported first so the startup timer covers every other import
+from common import startup
+
+from nitric.resources import api, ApiOptions, schedule
 from nitric.application import Nitric
-from nitric.context import HttpContext
-from uuid import uuid4
+from nitric.context import HttpContext, IntervalContext
+from typing import Optional
+import asyncio
+import io
 import json
 
-# OpenAPI 3.0 Specification
-OPENAPI_SPEC = {
-    "openapi": "3.0.0",
-    "info": {
-        "title": "Nitric Python Web API",
-        "version": "1.0.0",
-        "description": "A REST API example with CRUD operations for task management built with Nitric framework",
-        "contact": {
-            "name": "API Support"
-        }
-    },
-    "servers": [
-        {
-            "url": "http://localhost:4001",
-            "description": "Local development server"
-        }
-    ],
-    "paths": {
-        "/": {
-            "get": {
-                "summary": "API information",
-                "description": "Welcome endpoint with API information and available endpoints",
-                "tags": ["General"],
-                "responses": {
-                    "200": {
-                        "description": "API information",
-                        "content": {
-                            "application/json": {
-                                "schema": {
-                                    "type": "object",
-                                    "properties": {
-                                        "message": {"type": "string"},
-                                        "version": {"type": "string"},
-                                        "description": {"type": "string"},
-                                        "endpoints": {"type": "object"}
-                                    }
-                                }
-                            }
-                        }
-                    }
-                }
-            }
-        },
-        "/health": {
-            "get": {
-                "summary": "Health check",
-                "description": "Health check endpoint to verify the API is running",
-                "tags": ["General"],
-                "responses": {
-                    "200": {
-                        "description": "API is healthy",
-                        "content": {
-                            "application/json": {
-                                "schema": {
-                                    "type": "object",
-                                    "properties": {
-                                        "status": {"type": "string", "example": "healthy"},
-                                        "message": {"type": "string"}
-                                    }
-                                }
-                            }
-                        }
-                    }
-                }
-            }
-        },
-        "/tasks": {
-            "get": {
-                "summary": "Get all tasks",
-                "description": "Retrieve all tasks from the key-value store",
-                "tags": ["Tasks"],
-                "responses": {
-                    "200": {
-                        "description": "List of all tasks",
-                        "content": {
-                            "application/json": {
-                                "schema": {
-                                    "type": "object",
-                                    "properties": {
-                                        "success": {"type": "boolean"},
-                                        "count": {"type": "integer"},
-                                        "tasks": {
-                                            "type": "array",
-                                            "items": {"$ref": "#/components/schemas/Task"}
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    "500": {
-                        "description": "Server error",
-                        "content": {
-                            "application/json": {
-                                "schema": {"$ref": "#/components/schemas/Error"}
-                            }
-                        }
-                    }
-                }
-            },
-            "post": {
-                "summary": "Create a new task",
-                "description": "Create a new task with title, description, and completion status",
-                "tags": ["Tasks"],
-                "requestBody": {
-                    "required": True,
-                    "content": {
-                        "application/json": {
-                            "schema": {"$ref": "#/components/schemas/TaskInput"},
-                            "example": {
-                                "title": "Learn Nitric",
-                                "description": "Complete the Nitric tutorial",
-                                "completed": False
-                            }
-                        }
-                    }
-                },
-                "responses": {
-                    "201": {
-                        "description": "Task created successfully",
-                        "content": {
-                            "application/json": {
-                                "schema": {
-                                    "type": "object",
-                                    "properties": {
-                                        "success": {"type": "boolean"},
-                                        "message": {"type": "string"},
-                                        "task": {"$ref": "#/components/schemas/Task"}
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    "400": {
-                        "description": "Bad request - missing required fields",
-                        "content": {
-                            "application/json": {
-                                "schema": {"$ref": "#/components/schemas/Error"}
-                            }
-                        }
-                    },
-                    "500": {
-                        "description": "Server error",
-                        "content": {
-                            "application/json": {
-                                "schema": {"$ref": "#/components/schemas/Error"}
-                            }
-                        }
-                    }
-                }
-            }
-        },
-        "/tasks/{id}": {
-            "get": {
-                "summary": "Get a specific task",
-                "description": "Retrieve a specific task by its ID",
-                "tags": ["Tasks"],
-                "parameters": [
-                    {
-                        "name": "id",
-                        "in": "path",
-                        "required": True,
-                        "description": "Task ID",
-                        "schema": {"type": "string", "format": "uuid"}
-                    }
-                ],
-                "responses": {
-                    "200": {
-                        "description": "Task details",
-                        "content": {
-                            "application/json": {
-                                "schema": {
-                                    "type": "object",
-                                    "properties": {
-                                        "success": {"type": "boolean"},
-                                        "task": {"$ref": "#/components/schemas/Task"}
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    "404": {
-                        "description": "Task not found",
-                        "content": {
-                            "application/json": {
-                                "schema": {"$ref": "#/components/schemas/Error"}
-                            }
-                        }
-                    },
-                    "500": {
-                        "description": "Server error",
-                        "content": {
-                            "application/json": {
-                                "schema": {"$ref": "#/components/schemas/Error"}
-                            }
-                        }
-                    }
-                }
-            },
-            "put": {
-                "summary": "Update a task",
-                "description": "Update an existing task by ID",
-                "tags": ["Tasks"],
-                "parameters": [
-                    {
-                        "name": "id",
-                        "in": "path",
-                        "required": True,
-                        "description": "Task ID",
-                        "schema": {"type": "string", "format": "uuid"}
-                    }
-                ],
-                "requestBody": {
-                    "required": True,
-                    "content": {
-                        "application/json": {
-                            "schema": {"$ref": "#/components/schemas/TaskUpdate"},
-                            "example": {
-                                "title": "Learn Nitric - Updated",
-                                "completed": True
-                            }
-                        }
-                    }
-                },
-                "responses": {
-                    "200": {
-                        "description": "Task updated successfully",
-                        "content": {
-                            "application/json": {
-                                "schema": {
-                                    "type": "object",
-                                    "properties": {
-                                        "success": {"type": "boolean"},
-                                        "message": {"type": "string"},
-                                        "task": {"$ref": "#/components/schemas/Task"}
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    "404": {
-                        "description": "Task not found",
-                        "content": {
-                            "application/json": {
-                                "schema": {"$ref": "#/components/schemas/Error"}
-                            }
-                        }
-                    },
-                    "400": {
-                        "description": "Bad request",
-                        "content": {
-                            "application/json": {
-                                "schema": {"$ref": "#/components/schemas/Error"}
-                            }
-                        }
-                    },
-                    "500": {
-                        "description": "Server error",
-                        "content": {
-                            "application/json": {
-                                "schema": {"$ref": "#/components/schemas/Error"}
-                            }
-                        }
-                    }
-                }
-            },
-            "delete": {
-                "summary": "Delete a task",
-                "description": "Delete a task by ID",
-                "tags": ["Tasks"],
-                "parameters": [
-                    {
-                        "name": "id",
-                        "in": "path",
-                        "required": True,
-                        "description": "Task ID",
-                        "schema": {"type": "string", "format": "uuid"}
-                    }
-                ],
-                "responses": {
-                    "200": {
-                        "description": "Task deleted successfully",
-                        "content": {
-                            "application/json": {
-                                "schema": {
-                                    "type": "object",
-                                    "properties": {
-                                        "success": {"type": "boolean"},
-                                        "message": {"type": "string"}
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    "404": {
-                        "description": "Task not found",
-                        "content": {
-                            "application/json": {
-                                "schema": {"$ref": "#/components/schemas/Error"}
-                            }
-                        }
-                    },
-                    "500": {
-                        "description": "Server error",
-                        "content": {
-                            "application/json": {
-                                "schema": {"$ref": "#/components/schemas/Error"}
-                            }
-                        }
-                    }
-                }
-            }
-        }
-    },
-    "components": {
-        "schemas": {
-            "Task": {
-                "type": "object",
-                "properties": {
-                    "id": {"type": "string", "format": "uuid", "description": "Unique task identifier"},
-                    "title": {"type": "string", "description": "Task title"},
-                    "description": {"type": "string", "description": "Task description"},
-                    "completed": {"type": "boolean", "description": "Task completion status"},
-                    "created_at": {"type": "string", "description": "Creation timestamp"},
-                    "updated_at": {"type": "string", "description": "Last update timestamp"}
-                },
-                "required": ["id", "title"]
-            },
-            "TaskInput": {
-                "type": "object",
-                "properties": {
-                    "title": {"type": "string", "description": "Task title"},
-                    "description": {"type": "string", "description": "Task description"},
-                    "completed": {"type": "boolean", "description": "Task completion status", "default": False},
-                    "created_at": {"type": "string", "description": "Creation timestamp"}
-                },
-                "required": ["title"]
-            },
-            "TaskUpdate": {
-                "type": "object",
-                "properties": {
-                    "title": {"type": "string", "description": "Task title"},
-                    "description": {"type": "string", "description": "Task description"},
-                    "completed": {"type": "boolean", "description": "Task completion status"},
-                    "updated_at": {"type": "string", "description": "Last update timestamp"}
-                }
-            },
-            "Error": {
-                "type": "object",
-                "properties": {
-                    "success": {"type": "boolean", "example": False},
-                    "error": {"type": "string", "description": "Error message"}
-                }
-            }
-        }
-    },
-    "tags": [
-        {
-            "name": "General",
-            "description": "General API endpoints"
-        },
-        {
-            "name": "Tasks",
-            "description": "Task management operations"
-        }
-    ]
+from common import clock
+from common.admission import RATE_LIMIT_SHARED, RATE_LIMIT_STORE, Admission, TokenBuckets
+from common.assets import LazyAsset
+from common.batch import run_bounded
+from common.cache import TTLCache
+from common.changes import CHANGES_STORE, POSITION as CHANGE_POSITION, ChangeLog, ResyncRequired
+from common.config import MAX_BATCH_SIZE, TASK_CACHE_SIZE, TASK_CACHE_TTL_SECONDS
+from common.http import etag_matches, failure, header, json_response, query_flag, query_param
+from common.indexes import LIST_INDEX_STORE, SORTS, TIME_FIELDS, TaskListIndex
+from common.importer import import_ndjson, random_ids, stable_ids
+from common.metrics import instrument_store, metrics_middleware, register_collector, render as render_metrics
+from common.models import Task
+from common.openapi import (
+    OPENAPI_SPEC, SWAGGER_UI_HTML, validate_task_batch_update, validate_task_input, validate_task_update
+)
+from common.pagination import (
+    EXPORT_PAGE_SIZE, MAX_EXPORT_PAGE_SIZE, collect_page, decode_cursor, decode_list_cursor, parse_limit
+)
+from common.resilience import resilience_metrics, resilient_store, store_health
+from common.search import SEARCH_STORE, SearchIndex
+from common.singleflight import SingleFlight
+from common.snapshot import MAX_AGE_SECONDS as SNAPSHOT_MAX_AGE_SECONDS, SHARDS as SNAPSHOT_SHARDS, SNAPSHOT_STORE, ListSnapshot
+from common.stats import STATS_STORE, TaskStats
+from common.storage import open_store, read_items
+from common.validation import ITEM
+from common.versioning import list_etag
+
+startup.mark("imports")
+
+# Documentation responses are rendered and compressed once per container, on first request
+openapi_asset = LazyAsset(lambda: json.dumps(OPENAPI_SPEC, separators=(",", ":")).encode("utf-8"), "application/json")
+swagger_ui_asset = LazyAsset(lambda: SWAGGER_UI_HTML.encode("utf-8"), "text/html; charset=utf-8")
+
+# Routes that fan out into many key-value store calls, and cost more of a client's rate limit
+HEAVY_ROUTES = {
+    ("GET", "/tasks"),
+    ("GET", "/tasks/export"),
+    ("GET", "/tasks/search"),
+    ("POST", "/tasks/batch"),
+    ("PATCH", "/tasks/batch"),
+    ("DELETE", "/tasks/batch"),
+    ("POST", "/tasks/import"),
 }
 
-# Create an API named "main"
-main_api = api("main")
+# Routes that are never rate limited, so probes and scrapers keep working under load
+EXEMPT_PATHS = {"/", "/health", "/metrics", "/docs", "/swagger.json"}
+
+# Per-client token buckets, shared through their own store when TASKS_RATE_LIMIT_SHARED is set
+rate_limits = TokenBuckets(
+    store=resilient_store(instrument_store(open_store(RATE_LIMIT_STORE, "get", "set"))) if RATE_LIMIT_SHARED else None
+)
+admission = Admission(rate_limits, HEAVY_ROUTES, EXEMPT_PATHS)
+
+# Create an API named "main", timing every request and its key-value store usage,
+# including the requests admission control turns away
+main_api = api("main", opts=ApiOptions(middleware=[
+    metrics_middleware(lambda: (route.path for route in main_api.routes)),
+    admission.middleware()
+]))
+register_collector(admission.metrics)
+
+# Create a key-value store for tasks, on the backend selected by TASKS_STORE_BACKEND.
+# Every store call has a deadline, reads are retried and a failing store trips a circuit breaker
+tasks_store = resilient_store(instrument_store(open_store("tasks", "get", "set", "delete")))
+
+# Read-through cache of recently used tasks, keyed by task ID
+task_cache = TTLCache(TASK_CACHE_SIZE, TASK_CACHE_TTL_SECONDS)
+
+
+def cache_metrics():
+    """Expose the task cache counters on /metrics"""
+    stats = task_cache.stats()
+    yield "# HELP task_cache_requests_total Task cache lookups, by result"
+    yield "# TYPE task_cache_requests_total counter"
+    yield f'task_cache_requests_total{{result="hit"}} {stats["hits"]}'
+    yield f'task_cache_requests_total{{result="miss"}} {stats["misses"]}'
+    yield "# HELP task_cache_evictions_total Entries evicted from the task cache"
+    yield "# TYPE task_cache_evictions_total counter"
+    yield f"task_cache_evictions_total {stats['evictions']}"
+    yield "# HELP task_cache_entries Entries currently held in the task cache"
+    yield "# TYPE task_cache_entries gauge"
+    yield f"task_cache_entries {stats['size']}"
+
+
+register_collector(cache_metrics)
+register_collector(resilience_metrics)
+
+# Concurrent reads of the same task, or of the same page of the list, share one store call
+task_reads = SingleFlight("task")
+page_reads = SingleFlight("page")
+
+
+def single_flight_metrics():
+    """Expose how many reads were coalesced on /metrics"""
+    yield "# HELP single_flight_calls_total Coalesced reads, by whether the caller made the store call or shared one"
+    yield "# TYPE single_flight_calls_total counter"
+    for flights in (task_reads, page_reads):
+        stats = flights.stats()
+        yield f'single_flight_calls_total{{read="{flights.name}",role="leader"}} {stats["leaders"]}'
+        yield f'single_flight_calls_total{{read="{flights.name}",role="shared"}} {stats["shared"]}'
+
+
+register_collector(single_flight_metrics)
+
+# Task counters, kept in their own store so GET /tasks/stats is a single read
+task_stats = TaskStats(resilient_store(instrument_store(open_store(STATS_STORE, "get", "set"))))
+search_index = SearchIndex(resilient_store(instrument_store(open_store(SEARCH_STORE, "get", "set", "delete"))))
+list_index = TaskListIndex(resilient_store(instrument_store(open_store(LIST_INDEX_STORE, "get", "set", "delete"))))
+change_log = ChangeLog(resilient_store(instrument_store(open_store(CHANGES_STORE, "get", "set", "delete"))))
+# Only declared when enabled, so deployments without it get no extra store
+list_snapshot = ListSnapshot(resilient_store(instrument_store(open_store(SNAPSHOT_STORE, "get", "set")))) if SNAPSHOT_SHARDS else None
+
+# Stands in for the previous copy of a task that a blind write could not read
+UNKNOWN = object()
+
+startup.mark("resources")
+
+
+async def load_task(task_id: str, fresh: bool = False) -> Optional[Task]:
+    """Return a task from the cache or the store, or None if it does not exist.
+
+    Only GET serves cached copies, which may be up to TASKS_CACHE_TTL_SECONDS
+    old; writes pass fresh=True so they merge onto, check If-Match against and
+    report as previous the stored copy. Cached tasks are shared, so callers
+    build modified copies instead of changing them in place.
+    """
+    task = None if fresh else task_cache.get(task_id)
+    if task is not None:
+        return task
+
+    async def read():
+        record = await tasks_store.get(task_id)
+        return Task.from_record(task_id, record) if record else None
+
+    def cache(task: Optional[Task]):
+        if task is not None:
+            task_cache.set(task_id, task)
+
+    # A fresh read still joins one in flight: it started after the last write finished
+    return await task_reads.do(task_id, read, on_result=cache)
+
+
+async def tasks_changed(changes: list):
+    """Bring the data derived from the tasks store up to date after writes.
+
+    Each change is a (task ID, previous, current) triple: previous is the
+    copy that was replaced (None for a new task, UNKNOWN when a blind write
+    could not read it) and current is None for a deletion. The task writes
+    have already succeeded, so no derived store raises: each logs its
+    failures and recovers in its own way.
+    """
+    # Reads of the list that began before these writes must not be shared any more
+    page_reads.fence_all()
+    known = [(previous, current) for _, previous, current in changes if previous is not UNKNOWN]
+    # Without the previous copy its index keys cannot be removed; queries prune them later
+    indexed = [(None if previous is UNKNOWN else previous, current) for _, previous, current in changes]
+    written = [(task_id, current) for task_id, _, current in changes]
+    # The derived stores are independent and each logs its own failures, so update them at once
+    updates = [search_index.update(indexed), list_index.update(indexed), change_log.append(written)]
+    if known:
+        updates.append(task_stats.record_many(known))
+    if list_snapshot is not None:
+        updates.append(list_snapshot.apply(written))
+    await asyncio.gather(*updates)
+
+
+async def task_changed(task_id: str, previous, current: Optional[Task]):
+    """Update derived data after a single write; see tasks_changed"""
+    await tasks_changed([(task_id, previous, current)])
+
+
+async def save_task(task: Task, previous=None) -> Task:
+    """Stamp a task with its content version, write it and refresh its cached copy.
+
+    previous is the stored copy being replaced, as described in task_changed.
+    """
+    task = task.with_version()
+    try:
+        await tasks_store.set(task.id, task.to_record())
+    except Exception:
+        # The write may or may not have landed, so stop serving the old copy
+        task_cache.invalidate(task.id)
+        task_reads.fence(task.id)
+        page_reads.fence_all()
+        raise
+    # Fence before caching, so a read that started before the write cannot overwrite the new copy
+    task_reads.fence(task.id)
+    task_cache.set(task.id, task)
+    await task_changed(task.id, previous, task)
+    return task
+
+
+async def remove_task(task_id: str, previous=UNKNOWN):
+    """Delete a task from the store and the cache"""
+    task_cache.invalidate(task_id)
+    try:
+        await tasks_store.delete(task_id)
+    finally:
+        task_reads.fence(task_id)
+        page_reads.fence_all()
+        # A read that finished while the delete was in flight may have cached the task again
+        task_cache.invalidate(task_id)
+    await task_changed(task_id, previous, None)
+
+
+def precondition_failed(ctx: HttpContext, task: Task) -> bool:
+    """Answer 412 if the request's If-Match does not match the task's current ETag"""
+    if_match = header(ctx, "If-Match")
+    if if_match is None or etag_matches(if_match, task.etag, weak=False):
+        return False
+    ctx.res.status = 412
+    ctx.res.headers["ETag"] = task.etag
+    ctx.res.body = {
+        "success": False,
+        "error": "Task has been modified since it was read (If-Match does not match)"
+    }
+    return True
+
+
+def not_modified(ctx: HttpContext, etag: str) -> bool:
+    """Set the ETag and answer 304 if the request's If-None-Match already has it"""
+    ctx.res.headers["ETag"] = etag
+    if not etag_matches(header(ctx, "If-None-Match"), etag):
+        return False
+    ctx.res.status = 304
+    ctx.res.body = b""
+    return True
 
-# Create a key-value store for tasks
-tasks_store = kv("tasks").allow("get", "set", "delete")
 
 # Health check endpoint
 @main_api.get("/health")
 async def health_check(ctx: HttpContext):
     """Health check endpoint to verify the API is running"""
+    stores = store_health()
+    unavailable = sorted(name for name, state in stores.items() if state["state"] == "open")
+    if tasks_store.name in unavailable:
+        # Only the tasks store is critical: every instance shares the derived stores, whose
+        # failures writes already tolerate, so failing health on them would fail every instance at once
+        ctx.res.status = 503
+        status = "unhealthy"
+    else:
+        status = "degraded" if unavailable else "healthy"
     ctx.res.body = {
-        "status": "healthy",
-        "message": "API is running successfully"
+        "status": status,
+        "message": f"Key-value stores unavailable: {', '.join(unavailable)}" if unavailable else "API is running successfully",
+        "cache": task_cache.stats(),
+        "stores": stores
     }
 
 
@@ -405,44 +276,280 @@ async def welcome(ctx: HttpContext):
             "GET /health": "Health check",
             "GET /docs": "Swagger UI documentation",
             "GET /swagger.json": "OpenAPI specification",
-            "GET /tasks": "Get all tasks",
+            "GET /metrics": "Prometheus metrics",
+            "GET /tasks": "Get a page of tasks (?limit=&cursor=&completed=&created_after=&created_before=&updated_after=&updated_before=&sort=)",
+            "GET /tasks/stats": "Task counts (total, completed, pending)",
+            "GET /tasks/export": "Export tasks as NDJSON, one page per request (?limit=&cursor=)",
+            "GET /tasks/changes": "Task changes after a position, for incremental sync (?since=&limit=)",
+            "GET /tasks/search": "Search task titles and descriptions (?q=&limit=&cursor=)",
             "GET /tasks/:id": "Get a specific task by ID",
             "POST /tasks": "Create a new task",
+            "POST /tasks/batch": "Create several tasks at once",
+            "POST /tasks/import": "Import tasks from an NDJSON body (?resume_after=&import_id=)",
+            "PATCH /tasks/batch": "Update several tasks at once",
+            "DELETE /tasks/batch": "Delete several tasks at once",
             "PUT /tasks/:id": "Update a task by ID",
             "DELETE /tasks/:id": "Delete a task by ID"
         }
     }
 
 
+def parse_list_filters(ctx: HttpContext) -> Optional[dict]:
+    """Read the filter and sort parameters of GET /tasks, or None when there are none.
+
+    Raises ValueError with a message for invalid values.
+    """
+    filters = {}
+    completed = query_param(ctx, "completed")
+    if completed is not None:
+        if completed not in ("true", "false"):
+            raise ValueError("completed must be true or false")
+        filters["completed"] = completed == "true"
+
+    # Ranges are on one timestamp field, which is also the one the results are sorted by
+    bounded = set()
+    for name in TIME_FIELDS:
+        prefix = name[:-len("_at")]
+        for bound in ("after", "before"):
+            value = query_param(ctx, f"{prefix}_{bound}")
+            if value is not None:
+                filters[bound] = value
+                bounded.add(name)
+    if len(bounded) > 1:
+        raise ValueError("Filter on either created_at or updated_at, not both")
+
+    sort = query_param(ctx, "sort")
+    if sort is not None:
+        if sort not in SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(SORTS)}")
+        if bounded and sort.lstrip("-") not in bounded:
+            raise ValueError(f"sort must be on {bounded.pop()}, the field being filtered on")
+        filters["sort"] = sort
+    elif bounded:
+        filters["sort"] = bounded.pop()
+    return filters or None
+
+
 # Get all tasks
 @main_api.get("/tasks")
 async def get_all_tasks(ctx: HttpContext):
-    """Retrieve all tasks from the key-value store"""
+    """Retrieve all tasks from the key-value store, optionally filtered and sorted"""
     try:
-        # Get all keys from the store
-        keys = await tasks_store.keys()
-        tasks = []
-        
-        # Retrieve each task
-        for key in keys:
-            task = await tasks_store.get(key)
-            if task:
-                tasks.append({
-                    "id": key,
-                    **task
-                })
-        
+        limit = parse_limit(query_param(ctx, "limit"))
+        offset, after = decode_list_cursor(query_param(ctx, "cursor"))
+        filters = parse_list_filters(ctx)
+        if after is not None and (filters is not None or list_snapshot is None):
+            # Only unfiltered pages from the snapshot carry a task ID
+            raise ValueError("Invalid cursor")
+    except ValueError as e:
+        ctx.res.status = 400
         ctx.res.body = {
+            "success": False,
+            "error": str(e)
+        }
+        return
+
+    async def read_page():
+        if filters is not None:
+            # Filtered and sorted listings read the list index, then only the matching tasks
+            page = await list_index.query(tasks_store, offset=offset, limit=limit, **filters)
+            return page.tasks, page.errors, page.next_cursor
+
+        if list_snapshot is not None and not offset:
+            # A few shard reads instead of a scan, unless the snapshot is missing or stale; a scan
+            # cursor continues on the scan, whose order differs
+            snapshot = await list_snapshot.read_page(after, limit)
+            if snapshot is not None:
+                return snapshot[0], [], snapshot[1]
+            if after is not None:
+                return None
+
+        # Get one page of keys from the store
+        keys, next_cursor = await collect_page(tasks_store.keys(), offset, limit)
+
+        # Retrieve the tasks concurrently, keeping the order of the keys
+        batch = await tasks_store.get_many(keys)
+
+        found = []
+        errors = []
+        for index, key in enumerate(keys):
+            error = batch.errors.get(index)
+            if error is not None:
+                errors.append({"id": key, "error": str(error)})
+                continue
+            record = batch.results[index]
+            # None means the task was deleted between the key scan and the read
+            if record:
+                found.append(Task.from_record(key, record))
+        return found, errors, next_cursor
+
+    try:
+        # Identical list requests in flight at the same time share one scan
+        flight = (offset, after, limit, tuple(sorted((filters or {}).items())))
+        page = await page_reads.do(flight, read_page)
+        if page is None:
+            ctx.res.status = 410
+            ctx.res.body = {
+                "success": False,
+                "error": "The list snapshot this cursor belongs to is unavailable; restart from the first page"
+            }
+            return
+        found, errors, next_cursor = page
+
+        # A page with read errors is incomplete, so it is never reported unchanged
+        if not errors:
+            etag = list_etag(((task.id, task.current_version()) for task in found), next_cursor)
+            if not_modified(ctx, etag):
+                return
+
+        tasks = found
+        body = {
             "success": True,
             "count": len(tasks),
-            "tasks": tasks
+            "tasks": tasks,
+            "next_cursor": next_cursor
+        }
+        if errors:
+            # Report the keys that could not be read instead of failing the whole list
+            body["errors"] = errors
+        json_response(ctx, body)
+    except Exception as e:
+        failure(ctx, "Failed to retrieve tasks", e)
+
+
+# Get task statistics
+@main_api.get("/tasks/stats")
+async def get_task_stats(ctx: HttpContext):
+    """Return task counts from the counters store"""
+    try:
+        ctx.res.body = {
+            "success": True,
+            "stats": await task_stats.read()
+        }
+    except Exception as e:
+        failure(ctx, "Failed to retrieve task statistics", e)
+
+
+# Task changes since a position in the change log
+@main_api.get("/tasks/changes")
+async def get_task_changes(ctx: HttpContext):
+    """Return the task changes logged after `since`, oldest first, or only the current position without it"""
+    since = query_param(ctx, "since")
+    try:
+        if since is not None and not CHANGE_POSITION.fullmatch(since):
+            raise ValueError("since must be a position returned by this endpoint")
+        limit = parse_limit(query_param(ctx, "limit"))
+    except ValueError as e:
+        ctx.res.status = 400
+        ctx.res.body = {
+            "success": False,
+            "error": str(e)
+        }
+        return
+
+    try:
+        if since is None:
+            # A new client notes this position, reads GET /tasks, then syncs from here
+            changes, next_since, has_more = [], await change_log.position(), False
+        else:
+            changes, next_since, has_more = await change_log.read(since, limit)
+        json_response(ctx, {
+            "success": True,
+            "count": len(changes),
+            "changes": changes,
+            "next_since": next_since,
+            "has_more": has_more
+        })
+    except ResyncRequired as e:
+        # 410: the changes this client needs are gone; it has to start over from a full listing
+        ctx.res.status = 410
+        ctx.res.body = {
+            "success": False,
+            "error": str(e),
+            "resync_required": True,
+            "resync_from": e.resync_from
         }
     except Exception as e:
-        ctx.res.status = 500
+        failure(ctx, "Failed to retrieve task changes", e)
+
+
+# Search tasks
+@main_api.get("/tasks/search")
+async def search_tasks(ctx: HttpContext):
+    """Return a ranked page of the tasks containing every word of the query"""
+    query = (query_param(ctx, "q") or "").strip()
+    try:
+        if not query:
+            raise ValueError("q is required")
+        limit = parse_limit(query_param(ctx, "limit"))
+        offset = decode_cursor(query_param(ctx, "cursor"))
+    except ValueError as e:
+        ctx.res.status = 400
         ctx.res.body = {
             "success": False,
-            "error": f"Failed to retrieve tasks: {str(e)}"
+            "error": str(e)
         }
+        return
+
+    try:
+        # The task count weights rare words; the counters cost one read
+        stats = await task_stats.read()
+        page = await search_index.search(tasks_store, query, offset, limit, total=stats["total"])
+
+        body = {
+            "success": True,
+            "query": query,
+            "matches": page.matches,
+            "count": len(page.hits),
+            "results": [{"score": score, "task": task} for task, score in page.hits],
+            "next_cursor": page.next_cursor
+        }
+        if page.errors:
+            body["errors"] = page.errors
+        json_response(ctx, body)
+    except Exception as e:
+        failure(ctx, "Failed to search tasks", e)
+
+
+# Export tasks as NDJSON
+@main_api.get("/tasks/export")
+async def export_tasks(ctx: HttpContext):
+    """Export a page of tasks as newline-delimited JSON, one task per line.
+
+    Nitric sets the response body in one piece rather than streaming it, so
+    a full export is a series of large pages: follow X-Next-Cursor (or the
+    Link header) until it is absent. Each page holds at most `limit` tasks.
+    The cursor is an offset into the key scan, whose order the Nitric KV
+    store does not define, so there is no key to resume after: each page
+    re-reads the earlier keys, and writes during the export shift offsets.
+    """
+    try:
+        limit = parse_limit(query_param(ctx, "limit"), EXPORT_PAGE_SIZE, MAX_EXPORT_PAGE_SIZE)
+        offset = decode_cursor(query_param(ctx, "cursor"))
+    except ValueError as e:
+        ctx.res.status = 400
+        ctx.res.body = {
+            "success": False,
+            "error": str(e)
+        }
+        return
+
+    try:
+        keys, next_cursor = await collect_page(tasks_store.keys(), offset, limit)
+
+        # Records are encoded as they arrive, while the next chunk is being read
+        lines = []
+        async for task_id, record in read_items(tasks_store, keys):
+            lines.append(Task.from_record(task_id, record).to_json())
+        lines.append("")
+
+        ctx.res.headers["Content-Type"] = "application/x-ndjson"
+        if next_cursor:
+            ctx.res.headers["X-Next-Cursor"] = next_cursor
+            ctx.res.headers["Link"] = f'</tasks/export?limit={limit}&cursor={next_cursor}>; rel="next"'
+        ctx.res.body = "\n".join(lines).encode("utf-8")
+    except Exception as e:
+        failure(ctx, "Failed to export tasks", e)
 
 
 # Get a specific task by ID
@@ -460,7 +567,7 @@ async def get_task(ctx: HttpContext):
         return
     
     try:
-        task = await tasks_store.get(task_id)
+        task = await load_task(task_id)
         
         if not task:
             ctx.res.status = 404
@@ -469,20 +576,16 @@ async def get_task(ctx: HttpContext):
                 "error": f"Task with ID '{task_id}' not found"
             }
             return
+
+        if not_modified(ctx, task.etag):
+            return
         
-        ctx.res.body = {
+        json_response(ctx, {
             "success": True,
-            "task": {
-                "id": task_id,
-                **task
-            }
-        }
+            "task": task
+        })
     except Exception as e:
-        ctx.res.status = 500
-        ctx.res.body = {
-            "success": False,
-            "error": f"Failed to retrieve task: {str(e)}"
-        }
+        failure(ctx, "Failed to retrieve task", e)
 
 
 # Create a new task
@@ -493,44 +596,199 @@ async def create_task(ctx: HttpContext):
         # Parse request body
         data = ctx.req.json
         
-        # Validate required fields
-        if not data or "title" not in data:
+        # Validate against the TaskInput schema
+        error = validate_task_input(data)
+        if error:
             ctx.res.status = 400
             ctx.res.body = {
                 "success": False,
-                "error": "Task title is required"
+                "error": error
             }
             return
         
-        # Generate a unique ID
-        task_id = str(uuid4())
+        # Generate a unique, time-ordered ID
+        task_id = clock.new_task_id()
         
         # Create task object
-        task = {
-            "title": data["title"],
-            "description": data.get("description", ""),
-            "completed": data.get("completed", False),
-            "created_at": data.get("created_at", "")
-        }
+        task = Task.from_input(task_id, data, clock.now())
         
         # Save to store
-        await tasks_store.set(task_id, task)
+        task = await save_task(task)
         
-        ctx.res.status = 201
-        ctx.res.body = {
+        ctx.res.headers["ETag"] = task.etag
+        json_response(ctx, {
             "success": True,
             "message": f"Task created successfully",
-            "task": {
-                "id": task_id,
-                **task
-            }
+            "task": task
+        }, status=201)
+    except Exception as e:
+        failure(ctx, "Failed to create task", e)
+
+
+# Create many tasks in one request
+@main_api.post("/tasks/batch")
+async def create_tasks_batch(ctx: HttpContext):
+    """Create several tasks from an array of TaskInput objects"""
+    data = ctx.req.json
+
+    if not isinstance(data, list) or not data:
+        ctx.res.status = 400
+        ctx.res.body = {
+            "success": False,
+            "error": "Request body must be a non-empty array of tasks"
+        }
+        return
+
+    if len(data) > MAX_BATCH_SIZE:
+        ctx.res.status = 400
+        ctx.res.body = {
+            "success": False,
+            "error": f"A batch may contain at most {MAX_BATCH_SIZE} tasks"
+        }
+        return
+
+    # Validate every item before writing anything
+    invalid = [
+        {"index": index, "success": False, "error": error}
+        for index, error in enumerate(validate_task_input(item, ITEM) for item in data)
+        if error
+    ]
+    if invalid:
+        ctx.res.status = 400
+        ctx.res.body = {
+            "success": False,
+            "error": "One or more tasks are invalid; nothing was created",
+            "results": invalid
         }
+        return
+
+    try:
+        tasks = [Task.from_input(clock.new_task_id(), item, clock.now()).with_version() for item in data]
+        batch = await tasks_store.set_many([(task.id, task.to_record()) for task in tasks])
+
+        results = []
+        written = []
+        for index, task in enumerate(tasks):
+            error = batch.errors.get(index)
+            if error is not None:
+                results.append({"index": index, "success": False, "error": str(error)})
+            else:
+                task_reads.fence(task.id)
+                task_cache.set(task.id, task)
+                written.append((task.id, None, task))
+                results.append({"index": index, "success": True, "task": task})
+
+        created = len(written)
+        await tasks_changed(written)
+        # 207 tells the client to inspect the per-item results
+        json_response(ctx, {
+            "success": batch.ok,
+            "message": f"Created {created} of {len(tasks)} tasks",
+            "count": created,
+            "results": results
+        }, status=201 if batch.ok else 207)
     except Exception as e:
-        ctx.res.status = 500
+        failure(ctx, "Failed to create tasks", e)
+
+
+# Import tasks from NDJSON
+@main_api.post("/tasks/import")
+async def import_tasks(ctx: HttpContext):
+    """Create or overwrite tasks from an NDJSON body, one task per line"""
+    resume_after = query_param(ctx, "resume_after") or "0"
+    import_id = query_param(ctx, "import_id")
+
+    if not resume_after.isdigit():
+        ctx.res.status = 400
         ctx.res.body = {
             "success": False,
-            "error": f"Failed to create task: {str(e)}"
+            "error": "resume_after must be a non-negative integer"
         }
+        return
+
+    if not ctx.req.data:
+        ctx.res.status = 400
+        ctx.res.body = {
+            "success": False,
+            "error": "Request body must contain NDJSON lines"
+        }
+        return
+
+    async def imported(task: Task, previous: Optional[Task]):
+        task_cache.invalidate(task.id)
+        task_reads.fence(task.id)
+        await task_changed(task.id, previous, task)
+
+    try:
+        result = await import_ndjson(
+            # Lines are read from the body as the writers keep up, without splitting it up front
+            io.BytesIO(ctx.req.data),
+            tasks_store,
+            make_id=stable_ids(import_id) if import_id else random_ids,
+            start_after=int(resume_after),
+            on_imported=imported
+        )
+        ctx.res.status = 200 if result.ok else 207
+        ctx.res.body = {
+            "success": result.ok,
+            **result.to_dict()
+        }
+    except Exception as e:
+        failure(ctx, "Failed to import tasks", e)
+
+
+async def blind_update_task(ctx: HttpContext, task_id: str):
+    """Replace a task without reading it first, so without checking that it exists.
+
+    This saves the read of the checked PUT; the derived data is then updated
+    as for any write. The body must be a full TaskInput since there is no
+    stored copy to merge into. The store cannot say whether the key existed,
+    so the result is "upserted", and the previous copy is UNKNOWN: a cached
+    copy may be out of date. created_at, which never changes, comes from the
+    cached copy if there is one, else from the body, else it is now.
+    """
+    data = ctx.req.json
+
+    # A full TaskInput, whose updated_at is checked by the TaskUpdate schema
+    error = validate_task_input(data) or validate_task_update(data)
+    if error:
+        ctx.res.status = 400
+        ctx.res.body = {
+            "success": False,
+            "error": f"Blind updates replace the whole task: {error}"
+        }
+        return
+
+    try:
+        cached = task_cache.peek(task_id)
+        timestamp = clock.now()
+        task = Task.from_input(task_id, data, timestamp)
+        task.created_at = cached.get("created_at") if cached is not None else data.get("created_at") or timestamp
+        task = await save_task(task, UNKNOWN)
+        ctx.res.headers["ETag"] = task.etag
+
+        json_response(ctx, {
+            "success": True,
+            "message": "Task written successfully",
+            "result": "upserted",
+            "task": task
+        })
+    except Exception as e:
+        failure(ctx, "Failed to update task", e)
+
+
+async def blind_delete_task(ctx: HttpContext, task_id: str):
+    """Delete a task without reading it first, so without checking that it exists"""
+    try:
+        await remove_task(task_id, UNKNOWN)
+
+        ctx.res.body = {
+            "success": True,
+            "message": f"Task with ID '{task_id}' deleted successfully",
+            "result": "deleted_if_present"
+        }
+    except Exception as e:
+        failure(ctx, "Failed to delete task", e)
 
 
 # Update a task
@@ -547,9 +805,25 @@ async def update_task(ctx: HttpContext):
         }
         return
     
+    # If-Match needs the stored version, so it always takes the checked path
+    if query_flag(ctx, "blind") and header(ctx, "If-Match") is None:
+        await blind_update_task(ctx, task_id)
+        return
+
+    # Reject a malformed body before spending a store round trip on the lookup
+    data = ctx.req.json
+    error = validate_task_update(data)
+    if error:
+        ctx.res.status = 400
+        ctx.res.body = {
+            "success": False,
+            "error": error
+        }
+        return
+
     try:
         # Check if task exists
-        existing_task = await tasks_store.get(task_id)
+        existing_task = await load_task(task_id, fresh=True)
         
         if not existing_task:
             ctx.res.status = 404
@@ -559,43 +833,23 @@ async def update_task(ctx: HttpContext):
             }
             return
         
-        # Parse request body
-        data = ctx.req.json
-        
-        if not data:
-            ctx.res.status = 400
-            ctx.res.body = {
-                "success": False,
-                "error": "Request body is required"
-            }
+        if precondition_failed(ctx, existing_task):
             return
         
         # Update task fields
-        updated_task = {
-            "title": data.get("title", existing_task.get("title")),
-            "description": data.get("description", existing_task.get("description")),
-            "completed": data.get("completed", existing_task.get("completed")),
-            "created_at": existing_task.get("created_at", ""),
-            "updated_at": data.get("updated_at", "")
-        }
+        updated_task = existing_task.merge(data, clock.now())
         
         # Save updated task
-        await tasks_store.set(task_id, updated_task)
+        updated_task = await save_task(updated_task, existing_task)
+        ctx.res.headers["ETag"] = updated_task.etag
         
-        ctx.res.body = {
+        json_response(ctx, {
             "success": True,
             "message": "Task updated successfully",
-            "task": {
-                "id": task_id,
-                **updated_task
-            }
-        }
+            "task": updated_task
+        })
     except Exception as e:
-        ctx.res.status = 500
-        ctx.res.body = {
-            "success": False,
-            "error": f"Failed to update task: {str(e)}"
-        }
+        failure(ctx, "Failed to update task", e)
 
 
 # Delete a task
@@ -612,9 +866,14 @@ async def delete_task(ctx: HttpContext):
         }
         return
     
+    # If-Match needs the stored version, so it always takes the checked path
+    if query_flag(ctx, "blind") and header(ctx, "If-Match") is None:
+        await blind_delete_task(ctx, task_id)
+        return
+
     try:
         # Check if task exists
-        existing_task = await tasks_store.get(task_id)
+        existing_task = await load_task(task_id, fresh=True)
         
         if not existing_task:
             ctx.res.status = 404
@@ -624,83 +883,159 @@ async def delete_task(ctx: HttpContext):
             }
             return
         
+        if precondition_failed(ctx, existing_task):
+            return
+        
         # Delete the task
-        await tasks_store.delete(task_id)
+        await remove_task(task_id, existing_task)
         
         ctx.res.body = {
             "success": True,
             "message": f"Task with ID '{task_id}' deleted successfully"
         }
     except Exception as e:
-        ctx.res.status = 500
+        failure(ctx, "Failed to delete task", e)
+
+
+def parse_batch_ids(data, field: str = None):
+    """Return the task IDs of a batch request body, or an error message.
+
+    Items are plain IDs, or objects holding the ID under `field` when given.
+    """
+    if not isinstance(data, list) or not data:
+        return None, "Request body must be a non-empty array"
+    if len(data) > MAX_BATCH_SIZE:
+        return None, f"A batch may contain at most {MAX_BATCH_SIZE} items"
+    if field is not None:
+        if not all(isinstance(item, dict) for item in data):
+            return None, "Every item must be an object"
+        ids = [item.get(field) for item in data]
+    else:
+        ids = data
+    if not all(isinstance(task_id, str) and task_id for task_id in ids):
+        return None, "Every item must include a task ID"
+    if len(set(ids)) != len(ids):
+        # Concurrent writes to the same key would race each other
+        return None, "Task IDs in a batch must be unique"
+    return ids, None
+
+
+def batch_response(ctx: HttpContext, verb: str, results: list):
+    """Write the shared response shape of the batch update/delete endpoints"""
+    succeeded = sum(1 for result in results if result["success"])
+    ok = succeeded == len(results)
+    json_response(ctx, {
+        "success": ok,
+        "message": f"{verb} {succeeded} of {len(results)} tasks",
+        "count": succeeded,
+        "results": results
+    }, status=200 if ok else 207)
+
+
+# Update many tasks in one request
+@main_api.patch("/tasks/batch")
+async def update_tasks_batch(ctx: HttpContext):
+    """Apply partial updates to several tasks, each item carrying its task ID"""
+    data = ctx.req.json
+    ids, error = parse_batch_ids(data, "id")
+
+    if error is None and not all(len(item) > 1 for item in data):
+        error = "Every item must include at least one field to update"
+
+    if error is None:
+        error = next(
+            (f"Item {index}: {item_error}" for index, item_error in
+             enumerate(validate_task_batch_update(item, ITEM) for item in data) if item_error),
+            None
+        )
+
+    if error is not None:
+        ctx.res.status = 400
+        ctx.res.body = {
+            "success": False,
+            "error": error
+        }
+        return
+
+    async def update(index: int):
+        task_id = ids[index]
+        existing_task = await load_task(task_id, fresh=True)
+        if not existing_task:
+            return {"index": index, "id": task_id, "status": 404, "success": False,
+                    "error": f"Task with ID '{task_id}' not found"}
+        updated_task = await save_task(existing_task.merge(data[index], clock.now()), existing_task)
+        return {"index": index, "id": task_id, "status": 200, "success": True,
+                "task": updated_task}
+
+    try:
+        batch = await run_bounded(range(len(ids)), update)
+        results = [
+            batch.results[index] if index not in batch.errors else
+            {"index": index, "id": ids[index], "status": 500, "success": False,
+             "error": f"Failed to update task: {str(batch.errors[index])}"}
+            for index in range(len(ids))
+        ]
+        batch_response(ctx, "Updated", results)
+    except Exception as e:
+        failure(ctx, "Failed to update tasks", e)
+
+
+# Delete many tasks in one request
+@main_api.delete("/tasks/batch")
+async def delete_tasks_batch(ctx: HttpContext):
+    """Delete several tasks by ID"""
+    data = ctx.req.json
+    ids, error = parse_batch_ids(data.get("ids") if isinstance(data, dict) else None)
+
+    if error is not None:
+        ctx.res.status = 400
         ctx.res.body = {
             "success": False,
-            "error": f"Failed to delete task: {str(e)}"
+            "error": error
         }
+        return
+
+    async def delete(index: int):
+        task_id = ids[index]
+        existing_task = await load_task(task_id, fresh=True)
+        if not existing_task:
+            return {"index": index, "id": task_id, "status": 404, "success": False,
+                    "error": f"Task with ID '{task_id}' not found"}
+        await remove_task(task_id, existing_task)
+        return {"index": index, "id": task_id, "status": 200, "success": True}
+
+    try:
+        batch = await run_bounded(range(len(ids)), delete)
+        results = [
+            batch.results[index] if index not in batch.errors else
+            {"index": index, "id": ids[index], "status": 500, "success": False,
+             "error": f"Failed to delete task: {str(batch.errors[index])}"}
+            for index in range(len(ids))
+        ]
+        batch_response(ctx, "Deleted", results)
+    except Exception as e:
+        failure(ctx, "Failed to delete tasks", e)
+
+
+# Prometheus metrics endpoint
+@main_api.get("/metrics")
+async def metrics(ctx: HttpContext):
+    """Serve request and key-value store metrics in Prometheus text format"""
+    ctx.res.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    ctx.res.body = render_metrics()
 
 
 # Swagger/OpenAPI endpoints
 @main_api.get("/swagger.json")
 async def swagger_spec(ctx: HttpContext):
     """Serve the OpenAPI specification as JSON"""
-    ctx.res.headers["Content-Type"] = "application/json"
-    ctx.res.body = OPENAPI_SPEC
+    openapi_asset.serve(ctx)
 
 
 @main_api.get("/docs")
 async def swagger_ui(ctx: HttpContext):
     """Serve Swagger UI for interactive API documentation"""
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Nitric Python Web API - Swagger UI</title>
-        <link rel="stylesheet" type="text/css" href="https://unpkg.com/swagger-ui-dist@5.10.5/swagger-ui.css">
-        <link rel="icon" type="image/png" href="https://nitric.io/favicon.ico">
-        <style>
-            html {
-                box-sizing: border-box;
-                overflow: -moz-scrollbars-vertical;
-                overflow-y: scroll;
-            }
-            *, *:before, *:after {
-                box-sizing: inherit;
-            }
-            body {
-                margin: 0;
-                padding: 0;
-            }
-        </style>
-    </head>
-    <body>
-        <div id="swagger-ui"></div>
-        <script src="https://unpkg.com/swagger-ui-dist@5.10.5/swagger-ui-bundle.js"></script>
-        <script src="https://unpkg.com/swagger-ui-dist@5.10.5/swagger-ui-standalone-preset.js"></script>
-        <script>
-            window.onload = function() {
-                const ui = SwaggerUIBundle({
-                    url: "/swagger.json",
-                    dom_id: '#swagger-ui',
-                    deepLinking: true,
-                    presets: [
-                        SwaggerUIBundle.presets.apis,
-                        SwaggerUIStandalonePreset
-                    ],
-                    plugins: [
-                        SwaggerUIBundle.plugins.DownloadUrl
-                    ],
-                    layout: "StandaloneLayout"
-                });
-                window.ui = ui;
-            };
-        </script>
-    </body>
-    </html>
-    """
-    ctx.res.headers["Content-Type"] = "text/html"
-    ctx.res.body = html_content
+    swagger_ui_asset.serve(ctx)
 
 
 @main_api.get("/swagger")
@@ -711,5 +1046,23 @@ async def swagger_redirect(ctx: HttpContext):
     ctx.res.body = ""
 
 
+# Delete change log entries past the retention window, off the write path
+@schedule("compact-change-log").every("1 hours")
+async def compact_change_log(ctx: IntervalContext):
+    """Delete the change log entries older than the retention window"""
+    await change_log.compact()
+
+
+if list_snapshot is not None:
+    # Rebuild the list snapshot before it expires, repairing shard updates lost to racing instances
+    @schedule("rebuild-list-snapshot").every(f"{SNAPSHOT_MAX_AGE_SECONDS // 120} minutes")
+    async def rebuild_list_snapshot(ctx: IntervalContext):
+        """Regenerate the materialised task list from a full scan of the tasks store"""
+        await list_snapshot.refresh(tasks_store)
+
+
+startup.mark("routes")
+startup.log_report()
+
 # Start the Nitric application
 Nitric.run()
@@ -0,0 +1,70 @@
+"""Per-client token buckets and the 429 responses they lead to."""
+import asyncio
+import json
+
+from nitric.context import HttpContext, HttpRequest
+
+from common.admission import Admission, TokenBuckets
+
+
+def request(path: str, client: str = "203.0.113.7") -> HttpContext:
+    return HttpContext(HttpRequest(
+        data=b"", method="GET", path=path, params={}, query={}, headers={"x-forwarded-for": [client]},
+    ))
+
+
+def test_a_new_bucket_starts_full_and_refills_at_the_rate():
+    buckets = TokenBuckets(rate=2, burst=4)
+    bucket, wait = buckets._take(None, 4, now=100.0)
+    assert bucket == (0.0, 100.0) and wait == 0
+    # Half a second refills one token
+    bucket, wait = buckets._take(bucket, 1, now=100.5)
+    assert bucket == (0.0, 100.5) and wait == 0
+
+
+def test_a_short_bucket_waits_for_the_missing_tokens_and_keeps_them():
+    buckets = TokenBuckets(rate=2, burst=4)
+    bucket, wait = buckets._take((1.0, 100.0), 3, now=100.0)
+    assert wait == 1.0
+    # A refused request spends nothing
+    assert bucket == (1.0, 100.0)
+
+
+def test_a_clock_going_backwards_does_not_drain_the_bucket():
+    buckets = TokenBuckets(rate=2, burst=4)
+    bucket, wait = buckets._take((2.0, 100.0), 1, now=99.0)
+    assert bucket == (1.0, 99.0) and wait == 0
+
+
+def test_costs_above_the_burst_are_capped_so_they_can_pass():
+    buckets = TokenBuckets(rate=1, burst=5)
+    bucket, wait = buckets._take(None, 10, now=0.0)
+    assert bucket == (0.0, 0.0) and wait == 0
+    assert buckets._take(bucket, 10, now=1.0)[1] == 4.0
+
+
+def test_rejections_carry_a_whole_second_retry_after():
+    admission = Admission(TokenBuckets(rate=4, burst=1), {("GET", "/tasks")}, {"/health"}, heavy_cost=1)
+    middleware = admission.middleware()
+
+    async def run(ctx):
+        return await middleware(ctx, None)
+
+    assert asyncio.run(run(request("/tasks"))).res.status == 200
+    rejected = asyncio.run(run(request("/tasks")))
+    assert rejected.res.status == 429
+    # A quarter of a second to wait is rounded up, never down to 0
+    assert rejected.res.headers["Retry-After"] == "1"
+    assert json.loads(rejected.res.body)["success"] is False
+    # Other clients and exempt paths are unaffected
+    assert asyncio.run(run(request("/tasks", client="198.51.100.1"))).res.status == 200
+    assert asyncio.run(run(request("/health"))).res.status == 200
+    assert admission.rejected == {"rate_limit": 1, "in_flight": 0}
+
+
+def test_retry_after_rounds_longer_waits_up():
+    admission = Admission(TokenBuckets(rate=0.4, burst=1), set(), set())
+    middleware = admission.middleware()
+    asyncio.run(middleware(request("/tasks"), None))
+    rejected = asyncio.run(middleware(request("/tasks"), None))
+    assert rejected.res.headers["Retry-After"] == "3"
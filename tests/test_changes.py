@@ -0,0 +1,50 @@
+"""Change log writes and compaction."""
+import asyncio
+from datetime import datetime, timezone
+
+from common.changes import COMPACT_GRACE_SECONDS, RETENTION_HOURS, ChangeLog, _position
+from common.models import Task
+from common.storage import MemoryStore
+
+WRITE_SECONDS = 0.02
+
+
+def parse(timestamp: str) -> datetime:
+    return datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class SlowStore(MemoryStore):
+    """A MemoryStore whose writes take WRITE_SECONDS, recording when each one lands"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.landed = {}
+
+    async def set(self, key, value):
+        await asyncio.sleep(WRITE_SECONDS)
+        await super().set(key, value)
+        self.landed[key] = datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def test_entries_of_a_large_batch_are_stamped_as_their_own_write_starts():
+    store = SlowStore("changes")
+    changes = [(f"task-{number}", Task.from_record(f"task-{number}", {"title": "Task"})) for number in range(300)]
+    asyncio.run(ChangeLog(store).append(changes))
+    assert len(store.landed) == 300
+    # The batch runs in several waves, yet no entry waits behind an earlier wave once stamped
+    lag = max((landed - parse(key[:27])).total_seconds() for key, landed in store.landed.items())
+    assert lag < 2 * WRITE_SECONDS
+
+
+def test_compaction_deletes_only_entries_past_the_retention_window():
+    async def run():
+        store = MemoryStore("changes")
+        log = ChangeLog(store)
+        old = _position(RETENTION_HOURS * 3600 + COMPACT_GRACE_SECONDS + 60)
+        await store.set(f"{old}-aa", {"id": "old", "op": "delete", "at": old})
+        await log.append([("new", None)])
+        await log.compact()
+        return [key async for key in store.keys("")]
+
+    keys = asyncio.run(run())
+    assert len(keys) == 1 and not keys[0].endswith("-aa")
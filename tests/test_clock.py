@@ -0,0 +1,46 @@
+"""Server timestamps and UUIDv7 task IDs."""
+import time
+from types import SimpleNamespace
+from uuid import UUID
+
+from common import clock
+
+
+def frozen(monkeypatch, nanos: int) -> None:
+    """Stop the clock at nanos, and restore the state of the real clock afterwards"""
+    monkeypatch.setattr(clock, "time", SimpleNamespace(time_ns=lambda: nanos))
+    for name in ("_last_micros", "_last_millis", "_counter"):
+        monkeypatch.setattr(clock, name, getattr(clock, name))
+
+
+def test_task_ids_are_uuid7_with_the_current_millisecond():
+    before = time.time_ns() // 1_000_000
+    value = UUID(clock.new_task_id())
+    after = time.time_ns() // 1_000_000
+    assert value.version == 7
+    assert value.int >> 62 & 0b11 == 0b10
+    assert before <= value.int >> 80 <= after
+
+
+def test_task_ids_sort_in_creation_order_within_a_millisecond(monkeypatch):
+    frozen(monkeypatch, (time.time_ns() // 1_000_000 + 1) * 1_000_000)
+    ids = [clock.new_task_id() for _ in range(5000)]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    # More IDs than the 12-bit counter holds borrow the following milliseconds
+    millis = {UUID(task_id).int >> 80 for task_id in ids}
+    assert len(millis) > 1
+
+
+def test_task_ids_keep_their_order_when_the_clock_steps_back(monkeypatch):
+    frozen(monkeypatch, (time.time_ns() // 1_000_000 + 1) * 1_000_000)
+    first = clock.new_task_id()
+    frozen(monkeypatch, (time.time_ns() // 1_000_000 - 60_000) * 1_000_000)
+    assert clock.new_task_id() > first
+
+
+def test_timestamps_strictly_increase_and_keep_their_width(monkeypatch):
+    frozen(monkeypatch, 1_714_564_800_000_000_000)
+    monkeypatch.setattr(clock, "_last_micros", 0)
+    stamps = [clock.now() for _ in range(3)]
+    assert stamps == ["2024-05-01T12:00:00.000000Z", "2024-05-01T12:00:00.000001Z", "2024-05-01T12:00:00.000002Z"]
+    assert clock.format_timestamp(0) == "1970-01-01T00:00:00.000000Z"
@@ -0,0 +1,39 @@
+"""Changes queued while a write is in flight are written together by the next one."""
+import asyncio
+
+from common.groupcommit import GroupCommit
+
+
+def test_concurrent_commits_share_writes_and_keep_every_change():
+    writes = []
+
+    async def write(key, changes):
+        await asyncio.sleep(0.01)
+        writes.append((key, changes))
+
+    async def run():
+        commits = GroupCommit(write, lambda first, second: first + second)
+        await asyncio.gather(*(commits.commit("counts", 1) for _ in range(20)))
+
+    asyncio.run(run())
+    assert len(writes) <= 2
+    assert sum(changes for _, changes in writes) == 20
+
+
+def test_changes_requeued_by_a_failed_write_go_out_with_the_next_commit():
+    writes = []
+
+    async def run():
+        async def write(key, changes):
+            if not writes:
+                writes.append(None)
+                commits.add(key, changes)
+                return
+            writes.append(changes)
+
+        commits = GroupCommit(write, lambda first, second: first + second)
+        await commits.commit("counts", 2)
+        await commits.commit("counts", 3)
+
+    asyncio.run(run())
+    assert writes == [None, 5]
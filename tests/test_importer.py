@@ -0,0 +1,28 @@
+"""Imported tasks are reported with the copy they replaced, so derived data stays exact."""
+import asyncio
+
+from common.importer import import_ndjson, random_ids, stable_ids
+from common.models import Task
+from common.storage import MemoryStore
+
+
+def run_import(store: MemoryStore, lines: list[str], make_id=random_ids) -> list[tuple[str, object]]:
+    seen = []
+
+    async def imported(task: Task, previous):
+        seen.append((task.title, previous.title if previous is not None else None))
+
+    asyncio.run(import_ndjson(lines, store, make_id=make_id, on_imported=imported))
+    return sorted(seen)
+
+
+def test_lines_with_ids_report_the_task_they_overwrite():
+    store = MemoryStore("tasks")
+    assert run_import(store, ['{"id": "x1", "title": "first"}', '{"title": "new"}']) == [("first", None), ("new", None)]
+    assert run_import(store, ['{"id": "x1", "title": "second"}']) == [("second", "first")]
+
+
+def test_stable_ids_report_the_task_a_rerun_overwrites():
+    store = MemoryStore("tasks")
+    run_import(store, ['{"title": "first"}'], stable_ids("r1"))
+    assert run_import(store, ['{"title": "again"}'], stable_ids("r1")) == [("again", "first")]
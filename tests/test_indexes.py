@@ -0,0 +1,105 @@
+"""Filtered and sorted listing through the list index."""
+import asyncio
+import time
+
+from common import clock
+from common.indexes import TaskListIndex
+from common.models import Task
+from common.storage import MemoryStore
+
+
+class ScanRecordingStore(MemoryStore):
+    """A MemoryStore that records the prefix of every key scan"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.prefixes = []
+
+    def keys(self, prefix=""):
+        self.prefixes.append(prefix)
+        return super().keys(prefix)
+
+
+def timestamp(seconds_ago: float) -> str:
+    return clock.format_timestamp(time.time_ns() // 1000 - int(seconds_ago * 1_000_000))
+
+
+def task(task_id: str, created_at: str, completed: bool = False) -> Task:
+    return Task.from_record(task_id, {
+        "title": task_id, "completed": completed, "created_at": created_at, "updated_at": created_at,
+    })
+
+
+async def indexed(*written: Task) -> tuple[TaskListIndex, ScanRecordingStore, MemoryStore]:
+    store = ScanRecordingStore("index")
+    tasks = MemoryStore("tasks")
+    index = TaskListIndex(store)
+    for current in written:
+        await tasks.set(current.id, current.to_record())
+    await index.update([(None, current) for current in written])
+    store.prefixes.clear()
+    return index, store, tasks
+
+
+def test_newest_first_reads_only_the_latest_window_when_it_holds_the_page():
+    async def run():
+        recent = [task(f"new-{number}", timestamp(number * 0.001)) for number in range(3)]
+        old = [task(f"old-{number}", f"2020-01-0{number + 1}T00:00:00.000000Z") for number in range(3)]
+        index, store, tasks = await indexed(*recent, *old)
+        page = await index.query(tasks, completed=False, sort="-created_at", limit=2)
+        return [found.id for found in page.tasks], page.next_cursor, store.prefixes
+
+    ids, cursor, prefixes = asyncio.run(run())
+    assert ids == ["new-0", "new-1"] and cursor is not None
+    # The search starts at the minute around now, and never needs the whole state's keys
+    assert len(prefixes[0]) == len("created_at|false|") + clock.TIME_PREFIXES[0]
+    assert "created_at|false|" not in prefixes
+
+
+def test_newest_first_widens_the_window_until_the_page_is_full():
+    async def run():
+        written = [task("new", timestamp(0)), task("old", "2020-01-01T00:00:00.000000Z")]
+        index, store, tasks = await indexed(*written)
+        page = await index.query(tasks, completed=False, sort="-created_at", limit=2)
+        return [found.id for found in page.tasks], store.prefixes
+
+    ids, prefixes = asyncio.run(run())
+    assert ids == ["new", "old"]
+    assert prefixes[-1] == "created_at|false|"
+
+
+def test_range_scans_the_common_prefix_of_its_bounds_and_excludes_them():
+    async def run():
+        written = [
+            task("before", "2024-05-01T11:59:59.000000Z"),
+            task("start", "2024-05-01T12:00:00.000000Z"),
+            task("inside", "2024-05-01T12:30:00.000000Z"),
+            task("done", "2024-05-01T12:40:00.000000Z", completed=True),
+            task("end", "2024-05-01T13:00:00.000000Z"),
+        ]
+        index, store, tasks = await indexed(*written)
+        page = await index.query(
+            tasks, after="2024-05-01T12:00:00.000000Z", before="2024-05-01T13:00:00.000000Z",
+        )
+        return [found.id for found in page.tasks], store.prefixes
+
+    ids, prefixes = asyncio.run(run())
+    assert ids == ["inside", "done"]
+    assert sorted(prefixes) == ["created_at|false|2024-05-01T1", "created_at|true|2024-05-01T1"]
+
+
+def test_keys_left_by_a_blind_write_are_pruned_when_a_query_meets_them():
+    async def run():
+        original = task("a", "2024-05-01T12:00:00.000000Z")
+        index, store, tasks = await indexed(original)
+        # A blind write completes the task without knowing its previous copy, so the old keys stay
+        current = task("a", "2024-05-01T12:00:00.000000Z", completed=True)
+        await tasks.set("a", current.to_record())
+        await index.update([(None, current)])
+        pending = await index.query(tasks, completed=False)
+        done = await index.query(tasks, completed=True)
+        return [found.id for found in pending.tasks], [found.id for found in done.tasks], sorted(store._data)
+
+    pending, done, keys = asyncio.run(run())
+    assert pending == [] and done == ["a"]
+    assert "created_at|false|2024-05-01T12:00:00.000000Z|a" not in keys
@@ -0,0 +1,95 @@
+"""Deadlines and circuit breaker behaviour of ResilientStore"""
+import asyncio
+
+import pytest
+
+from common import resilience
+from common.resilience import CircuitBreaker, CircuitOpen, ResilientStore, StoreTimeout
+from common.storage import MemoryStore
+
+
+class SlowStore(MemoryStore):
+    """A MemoryStore whose gets wait until released"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.release = asyncio.Event()
+
+    async def get(self, key):
+        await self.release.wait()
+        return await super().get(key)
+
+
+def test_cancelled_probe_lets_the_next_call_probe():
+    async def run():
+        store = SlowStore("tasks")
+        breaker = CircuitBreaker("tasks", failures=1, reset_seconds=0)
+        resilient = ResilientStore(store, read_retries=0, breaker=breaker)
+        breaker.failed()
+        assert breaker.state == "half_open"
+
+        probe = asyncio.ensure_future(resilient.get("key"))
+        await asyncio.sleep(0)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        store.release.set()
+        # The cancelled probe recorded no outcome; the next call probes and closes the breaker
+        assert await resilient.get("key") is None
+        return breaker.state
+
+    assert asyncio.run(run()) == "closed"
+
+
+def test_open_breaker_rejects_calls():
+    async def run():
+        breaker = CircuitBreaker("tasks", failures=1, reset_seconds=60)
+        resilient = ResilientStore(MemoryStore("tasks"), breaker=breaker)
+        breaker.failed()
+        with pytest.raises(CircuitOpen):
+            await resilient.get("key")
+
+    asyncio.run(run())
+
+
+class HungKeyStore(MemoryStore):
+    """A MemoryStore that never finishes writing one key"""
+
+    async def set(self, key, value):
+        if key == "hung":
+            await asyncio.Event().wait()
+        await super().set(key, value)
+
+
+def test_batch_write_reports_a_hung_item_without_failing_the_rest():
+    async def run():
+        store = HungKeyStore("tasks")
+        resilient = ResilientStore(store, timeout_ms=50, breaker=CircuitBreaker("tasks", failures=100))
+        batch = await resilient.set_many([("k0", {}), ("hung", {}), ("k2", {})])
+        return store, batch
+
+    store, batch = asyncio.run(run())
+    assert list(batch.errors) == [1] and isinstance(batch.errors[1], StoreTimeout)
+    assert sorted(store._data) == ["k0", "k2"]
+
+
+def test_scan_checks_the_breaker_once_per_chunk(monkeypatch):
+    monkeypatch.setattr(resilience, "SCAN_CHUNK_KEYS", 10)
+    calls = []
+
+    class CountingBreaker(CircuitBreaker):
+        def before_call(self):
+            calls.append(1)
+            return super().before_call()
+
+    async def run():
+        store = MemoryStore("tasks")
+        for number in range(25):
+            await store.set(f"k{number:02d}", {})
+        resilient = ResilientStore(store, breaker=CountingBreaker("tasks"))
+        return [key async for key in resilient.keys("k")]
+
+    keys = asyncio.run(run())
+    assert keys == [f"k{number:02d}" for number in range(25)]
+    assert len(calls) == 3
@@ -0,0 +1,99 @@
+"""The materialised task list: its maximum age and its paging."""
+import asyncio
+import time
+
+import pytest
+
+from common import clock
+from common.models import Task
+from common.pagination import decode_cursor, decode_list_cursor, encode_cursor, encode_key_cursor
+from common.snapshot import META_KEY, ListSnapshot
+from common.storage import MemoryStore
+
+
+def build(snapshot: ListSnapshot, count: int = 3) -> None:
+    async def run():
+        tasks = MemoryStore("tasks")
+        for number in range(count):
+            await tasks.set(f"task-{number}", Task.from_record(f"task-{number}", {"title": f"Task {number}"}).to_record())
+        await snapshot.rebuild(tasks)
+    asyncio.run(run())
+
+
+def test_fresh_snapshot_is_served():
+    snapshot = ListSnapshot(MemoryStore("snapshot"), shards=2, max_age_seconds=600)
+    build(snapshot)
+    page, cursor = asyncio.run(snapshot.read_page(None, 10))
+    assert [task.id for task in page] == ["task-0", "task-1", "task-2"]
+    assert cursor is None
+
+
+def test_expired_snapshot_is_ignored_even_without_a_failed_write():
+    store = MemoryStore("snapshot")
+    snapshot = ListSnapshot(store, shards=2, max_age_seconds=600)
+    build(snapshot)
+    meta = asyncio.run(store.get(META_KEY))
+    meta["built_at"] = clock.format_timestamp(time.time_ns() // 1000 - 601 * 1_000_000)
+    asyncio.run(store.set(META_KEY, meta))
+    assert asyncio.run(snapshot.read_page(None, 10)) is None
+    assert asyncio.run(snapshot.status())["expired"]
+
+
+def test_pages_resume_after_the_last_id_across_writes():
+    store = MemoryStore("snapshot")
+    snapshot = ListSnapshot(store, shards=2, max_age_seconds=600)
+    build(snapshot, count=4)
+    first, cursor = asyncio.run(snapshot.read_page(None, 2))
+    assert [task.id for task in first] == ["task-0", "task-1"]
+    # A task sorting before the cursor no longer shifts the following page
+    asyncio.run(snapshot.apply([("task-00", Task.from_record("task-00", {"title": "Inserted"}))]))
+    offset, after = decode_list_cursor(cursor)
+    second, cursor = asyncio.run(snapshot.read_page(after, 2))
+    assert [task.id for task in second] == ["task-2", "task-3"] and cursor is None
+
+
+def test_scan_cursors_and_snapshot_cursors_are_told_apart():
+    assert decode_list_cursor(encode_cursor(5)) == (5, None)
+    assert decode_list_cursor(encode_key_cursor("task-1")) == (0, "task-1")
+    with pytest.raises(ValueError):
+        decode_cursor(encode_key_cursor("task-1"))
+
+
+class HeldShardStore(MemoryStore):
+    """A MemoryStore whose shard reads return what they read only once released"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.hold = False
+        self.release = asyncio.Event()
+
+    async def get(self, key):
+        value = await super().get(key)
+        if self.hold and key.startswith("shard-"):
+            await self.release.wait()
+        return value
+
+
+def test_rebuild_is_not_overwritten_by_an_update_read_before_it():
+    async def run():
+        store = HeldShardStore("snapshot")
+        tasks = MemoryStore("tasks")
+        snapshot = ListSnapshot(store, shards=1, max_age_seconds=600)
+        for task_id in ("a", "b"):
+            await tasks.set(task_id, {"title": task_id})
+        await snapshot.rebuild(tasks)
+        await tasks.set("c", {"title": "c"})
+        await tasks.set("x", {"title": "x"})
+
+        # An update reads the shard as it was before the rebuild, then waits
+        store.hold = True
+        update = asyncio.ensure_future(snapshot.apply([("x", Task.from_record("x", {"title": "x"}))]))
+        await asyncio.sleep(0)
+        rebuild = asyncio.ensure_future(snapshot.rebuild(tasks))
+        await asyncio.sleep(0.01)
+        store.release.set()
+        await asyncio.gather(update, rebuild)
+        page, _ = await snapshot.read_page(None, 10)
+        return [task.id for task in page]
+
+    assert asyncio.run(run()) == ["a", "b", "c", "x"]
@@ -0,0 +1,107 @@
+"""Stores that return numbers the way the deployed Nitric KV store does.
+
+Nitric keeps values as protobuf Structs, so every number written comes back
+as a float. The memory and SQLite backends keep ints, which hides code that
+formats or counts with numbers read back from the store.
+"""
+import asyncio
+
+import pytest
+from nitric.utils import dict_from_struct, struct_from_dict
+
+from common import changes
+from common.changes import ChangeLog, ResyncRequired
+from common.models import Task
+from common.stats import TaskStats
+from common.storage import MemoryStore
+
+
+class StructStore(MemoryStore):
+    """A MemoryStore whose values round-trip through a protobuf Struct"""
+
+    async def set(self, key, value):
+        await super().set(key, dict_from_struct(struct_from_dict(value)))
+
+
+def test_struct_store_returns_floats():
+    store = StructStore("test")
+    asyncio.run(store.set("key", {"count": 5}))
+    assert asyncio.run(store.get("key")) == {"count": 5.0}
+
+
+def test_change_log_appends_and_reads_after_round_trip(monkeypatch):
+    monkeypatch.setattr(changes, "SETTLE_MS", 0)
+
+    async def run():
+        log = ChangeLog(StructStore("changes"))
+        start = await log.position()
+        await log.append([("a", Task.from_record("a", {"title": "first"}))])
+        await log.append([("b", Task.from_record("b", {"title": "second"})), ("a", None)])
+        return await log.read(start, 10)
+
+    entries, next_since, has_more = asyncio.run(run())
+    assert [(entry["id"], entry["op"]) for entry in entries] == [("a", "upsert"), ("b", "upsert"), ("a", "delete")]
+    positions = [entry["position"] for entry in entries]
+    assert positions == sorted(positions) and next_since >= positions[-1]
+    assert not has_more
+
+
+def test_change_log_instances_appending_at_once_keep_every_entry(monkeypatch):
+    monkeypatch.setattr(changes, "SETTLE_MS", 0)
+    store = StructStore("changes")
+
+    async def run():
+        # Two containers share the store but not their memory
+        first, second = ChangeLog(store), ChangeLog(store)
+        start = await first.position()
+        await asyncio.gather(
+            first.append([("a", Task.from_record("a", {"title": "from the first"}))]),
+            second.append([("b", Task.from_record("b", {"title": "from the second"}))]),
+        )
+        return await first.read(start, 10)
+
+    entries, _, _ = asyncio.run(run())
+    assert sorted(entry["id"] for entry in entries) == ["a", "b"]
+
+
+def test_change_log_failed_append_forces_resync(monkeypatch):
+    monkeypatch.setattr(changes, "SETTLE_MS", 0)
+    store = StructStore("changes")
+    log = ChangeLog(store)
+    task = Task.from_record("a", {"title": "first"})
+
+    async def run():
+        start = await log.position()
+        healthy_set = store.set
+
+        async def failing_set(key, value):
+            raise RuntimeError("store down")
+
+        store.set = failing_set
+        await log.append([("a", task)])
+        # Neither the entry nor the resync marker could be written; the next append retries the marker
+        assert log._lost
+        store.set = healthy_set
+        await log.append([("a", task)])
+        assert not log._lost
+        with pytest.raises(ResyncRequired) as resync:
+            await log.read(start, 10)
+        await log.append([("b", task)])
+        return await log.read(resync.value.resync_from, 10)
+
+    entries, _, _ = asyncio.run(run())
+    assert [entry["id"] for entry in entries] == ["b"]
+
+
+def test_task_stats_counts_are_ints_after_round_trip():
+    async def run():
+        stats = TaskStats(StructStore("stats"))
+        done = Task.from_record("a", {"title": "first", "completed": True})
+        await stats.record(None, done)
+        await stats.record(None, Task.from_record("b", {"title": "second"}))
+        await stats.record(done, None)
+        return await stats.read()
+
+    counts = asyncio.run(run())
+    assert (counts["total"], counts["completed"], counts["pending"]) == (1, 0, 1)
+    assert all(type(counts[name]) is int for name in ("total", "completed", "pending"))
@@ -0,0 +1,51 @@
+"""Validators compiled from OpenAPI schemas."""
+import pytest
+
+from common.openapi import OPENAPI_SPEC, validate_task_input
+from common.validation import ITEM, compile_schema, component_validator
+
+
+def test_unknown_keywords_fail_at_compile_time():
+    with pytest.raises(ValueError, match="pattern"):
+        compile_schema({"type": "string", "pattern": "^a"})
+
+
+def test_annotations_are_accepted_and_do_not_constrain():
+    validate = compile_schema({"type": "string", "description": "A name", "example": "x", "format": "uuid"})
+    assert validate("not a uuid") is None
+
+
+def test_booleans_are_not_integers_or_numbers():
+    assert compile_schema({"type": "integer"})(True) == "Request body must be an integer"
+    assert compile_schema({"type": "number"})(False) == "Request body must be a number"
+    assert compile_schema({"type": "number"})(1.5) is None
+    assert compile_schema({"type": "boolean"})(1) == "Request body must be a boolean"
+
+
+def test_null_passes_only_nullable_schemas():
+    schema = {"type": "object", "properties": {"due": {"type": "string", "nullable": True}, "title": {"type": "string"}}}
+    validate = compile_schema(schema)
+    assert validate({"due": None}) is None
+    assert validate({"title": None}) == "title must be a string"
+
+
+def test_messages_name_nested_fields_and_batch_items():
+    schema = {
+        "type": "object",
+        "required": ["tags"],
+        "additionalProperties": False,
+        "properties": {"tags": {"type": "array", "maxItems": 2, "items": {"type": "string", "minLength": 1}}},
+    }
+    validate = compile_schema(schema)
+    assert validate({}) == "tags is required"
+    assert validate({"tags": ["a", ""]}) == "tags[1] must be at least 1 characters long"
+    assert validate({"tags": ["a", "b", "c"]}) == "tags must be at most 2 items long"
+    assert validate({"tags": [], "extra": 1}) == "extra is not a known field"
+    assert validate([], ITEM) == "Item must be an object"
+
+
+def test_references_resolve_against_the_spec_components():
+    assert component_validator(OPENAPI_SPEC, "TaskInput")({"title": "Write tests"}) is None
+    assert validate_task_input({"title": 5}) == "title must be a string"
+    with pytest.raises(ValueError, match="Unresolvable"):
+        compile_schema({"$ref": "#/components/schemas/Missing"})